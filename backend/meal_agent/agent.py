@@ -1,14 +1,47 @@
 """LangGraph agent for meal planning."""
 
-from langgraph.graph import StateGraph, START, END
-from langgraph.prebuilt import ToolNode
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, ToolMessage
-from pydantic import BaseModel, Field
+import asyncio
+import contextvars
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 
-from meal_agent.state import MealPlannerState, MealInfo, IngredientInfo
-from meal_agent.tools import get_recipe_search_tool, search_recipe_image
-from meal_agent.constants import DAYS_OF_WEEK, PANTRY_STAPLES
+from langchain_core.runnables import RunnableConfig, RunnableLambda, ensure_config
+from langgraph.graph import StateGraph, START, END
+from langgraph.types import Send
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from pydantic import BaseModel, Field, ValidationError
+
+from meal_agent.cache import (
+    RecipeCache,
+    RecipeFlights,
+    current_recipe_flights,
+    get_recipe_cache,
+    make_recipe_key,
+)
+from meal_agent.catalog import ingredient_key, resolve_ingredient
+from meal_agent.configuration import Configuration
+from meal_agent.corpus import get_recipe_index
+from meal_agent.deadlines import expired, may_search, search_deadline, time_left, waves_left
+from meal_agent.distill import distill_content
+from meal_agent.metrics import FIRST_VISIBLE, instrumented, record_day, record_prompt, record_retry
+from meal_agent.optimizer import build_pool, inventory_use, plan_menu
+from meal_agent.prompts import (
+    GENERATION_PROMPT, SINGLE_PASS_PROMPT, estimate_tokens, generation_prompt, parse_prompt, week_prompt
+)
+from meal_agent.providers import get_provider, model_provider
+from meal_agent.quantities import add_amount, add_shopping, format_quantity, format_shopping_list
+from meal_agent.scheduler import acall, call, request_tokens
+from meal_agent.similarity import MealIndex
+from meal_agent.streaming import MealStream, finish_meal, meal_stream, retract_meal, streaming_meal
+from meal_agent.state import MealPlannerState, MealInfo, IngredientInfo, ShoppingItem, DayResult, DayTask, ImageTask
+from meal_agent.tools import (
+    LocalRecipeSearchTool,
+    asearch_recipe_image,
+    get_local_recipe_search_tool,
+    search_recipe_image,
+)
+from meal_agent.constants import DAYS_OF_WEEK
 
 
 class RecipeIngredient(BaseModel):
@@ -29,99 +62,596 @@ class ParsedRecipe(BaseModel):
     equipment: list[str] = Field(description="Required equipment. Use: 'stovetop', 'oven', 'air_fryer', 'microwave', 'no_cook'")
 
 
-# Set up tools and LLM
-recipe_search_tool = get_recipe_search_tool()
-tools = [recipe_search_tool]
+class WeekDinner(ParsedRecipe):
+    """A recipe planned for one day of a whole-week request."""
+    day: str = Field(description="Day of the week this dinner is for, e.g. 'monday'")
+
+
+class WeekPlan(BaseModel):
+    """Dinners for every requested day of the week."""
+    dinners: list[WeekDinner] = Field(description="One dinner per requested day")
+
+
+# Single-pass mode: the model answers by calling ParsedRecipe instead of writing prose
+RECIPE_OUTPUT_TOOL = ParsedRecipe.__name__
+
+# Static system prompts by single_pass; they never vary, so providers can cache them
+GENERATION_SYSTEM_PROMPTS = {
+    False: GENERATION_PROMPT,
+    True: GENERATION_PROMPT + SINGLE_PASS_PROMPT.format(tool=RECIPE_OUTPUT_TOOL),
+}
+
+
+def get_search_tool():
+    """The recipe_search tool in use: the local corpus when configured, backed by web search."""
+    web_search = get_provider("recipe_search_tool")
+    corpus_path = Configuration.from_runnable_config(ensure_config()).recipe_corpus_path
+    return get_local_recipe_search_tool(corpus_path, web_search) or web_search
+
+
+def chat_model_spec() -> str:
+    """The run's chat model, e.g. "openai:gpt-4o"."""
+    return Configuration.from_runnable_config(ensure_config()).chat_model
+
+
+def get_chat_model():
+    """The run's chat model, created on first use and shared by every run in the process."""
+    return get_provider("chat_model", chat_model_spec())
+
+
+# (kind, model id, tool id) -> (model, tool, derived runnable); the model and
+# tool are kept alive so their ids cannot be reused by other objects
+_derived_llms: dict[tuple[str, int, int], tuple] = {}
+
+
+def _derived_llm(kind: str):
+    """Tool-bound or structured variant of the current chat model, built once per model."""
+    model = get_chat_model()
+    search_tool = get_search_tool()
+    key = (kind, id(model), id(search_tool))
+    entry = _derived_llms.get(key)
+    if entry is None:
+        if kind == "tools":
+            derived = model.bind_tools([search_tool])
+        elif kind == "recipe_output":
+            derived = model.bind_tools([search_tool, ParsedRecipe])
+        elif kind == "answer":
+            derived = model.bind_tools([search_tool], tool_choice="none")
+        elif kind == "recipe_answer":
+            derived = model.bind_tools([search_tool, ParsedRecipe], tool_choice=RECIPE_OUTPUT_TOOL)
+        elif kind == "recipe_tool":
+            derived = model.bind_tools([ParsedRecipe], tool_choice=RECIPE_OUTPUT_TOOL)
+        elif kind == "week":
+            derived = model.with_structured_output(WeekPlan)
+        else:
+            derived = model.with_structured_output(ParsedRecipe)
+        entry = _derived_llms[key] = (model, search_tool, derived)
+    return entry[2]
+
+
+def get_structured_llm():
+    """Chat model that parses recipe text into a ParsedRecipe."""
+    return _derived_llm("structured")
+
+
+def get_generation_llm(config: RunnableConfig | None, searching: bool = True):
+    """Tool-calling model for the configured generation mode.
+
+    With `searching` off the model has to answer now: it writes the recipe,
+    or in single-pass mode calls ParsedRecipe, instead of searching again.
+    """
+    single_pass = Configuration.from_runnable_config(config).generation_mode == "single_pass"
+    if searching:
+        return _derived_llm("recipe_output" if single_pass else "tools")
+    return _derived_llm("recipe_answer" if single_pass else "answer")
+
+
+def invoke_model(operation: str, model, messages: list):
+    """Call the chat model through the process-wide provider scheduler."""
+    provider = model_provider(chat_model_spec())
+    return call(provider, operation, lambda: model.invoke(messages), request_tokens(messages))
+
+
+async def ainvoke_model(operation: str, model, messages: list):
+    """Async version of invoke_model."""
+    provider = model_provider(chat_model_spec())
+    return await acall(provider, operation, lambda: model.ainvoke(messages), request_tokens(messages))
 
-llm = ChatOpenAI(model="gpt-4o", temperature=0.7)
-llm_with_tools = llm.bind_tools(tools)
-structured_llm = llm.with_structured_output(ParsedRecipe)
 
+def stream_model(operation: str, model, messages: list):
+    """invoke_model, streamed into the day's partial meal when partial meals are on."""
+    stream = streaming_meal()
+    if stream is None:
+        return invoke_model(operation, model, messages)
+    provider = model_provider(chat_model_spec())
+    return call(provider, operation, lambda: stream.consume(model.stream(messages)), request_tokens(messages))
 
+
+async def astream_model(operation: str, model, messages: list):
+    """Async version of stream_model."""
+    stream = streaming_meal()
+    if stream is None:
+        return await ainvoke_model(operation, model, messages)
+    return await acall(
+        model_provider(chat_model_spec()),
+        operation,
+        lambda: stream.aconsume(model.astream(messages)),
+        request_tokens(messages),
+    )
+
+
+def invoke_search(tool_call: dict) -> ToolMessage:
+    """Run a recipe_search call; web searches go through the provider scheduler."""
+    tool = get_search_tool()
+    if isinstance(tool, LocalRecipeSearchTool):
+        # Only its web fallback is a provider call, scheduled by the tool
+        return tool.invoke(tool_call)
+    return call("tavily", "recipe_search", lambda: tool.invoke(tool_call))
+
+
+async def ainvoke_search(tool_call: dict) -> ToolMessage:
+    """Async version of invoke_search."""
+    tool = get_search_tool()
+    if isinstance(tool, LocalRecipeSearchTool):
+        return await tool.ainvoke(tool_call)
+    return await acall("tavily", "recipe_search", lambda: tool.ainvoke(tool_call))
+
+
+# Told to the model for a search that was not run or not waited for
+SEARCH_CUT_OFF = "No time left to search. Write the recipe now from the results you have or from what you know."
+
+# Searches with a deadline run here, so a slow one can be abandoned
+_search_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="recipe-search")
+
+
+def search_cut_off(tool_call: dict, day: str) -> ToolMessage:
+    """Answer to a search call that ran out of the day's search time."""
+    record_day(day, searches_cut_off=1)
+    return ToolMessage(content=SEARCH_CUT_OFF, tool_call_id=tool_call["id"], name=tool_call["name"], status="error")
+
+
+def invoke_search_within(
+    tool_call: dict, day: str, deadline: float | None, config: RunnableConfig | None = None
+) -> ToolMessage:
+    """invoke_search, abandoned when it is still running at `deadline`."""
+    timeout = time_left(deadline, config)
+    if timeout is None:
+        return invoke_search(tool_call)
+    if timeout <= 0:
+        return search_cut_off(tool_call, day)
+    future = _search_pool.submit(contextvars.copy_context().run, invoke_search, tool_call)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        return search_cut_off(tool_call, day)
+
+
+async def ainvoke_search_within(
+    tool_call: dict, day: str, deadline: float | None, config: RunnableConfig | None = None
+) -> ToolMessage:
+    """Async version of invoke_search_within."""
+    timeout = time_left(deadline, config)
+    if timeout is None:
+        return await ainvoke_search(tool_call)
+    if timeout <= 0:
+        return search_cut_off(tool_call, day)
+    try:
+        return await asyncio.wait_for(ainvoke_search(tool_call), timeout)
+    except asyncio.TimeoutError:
+        return search_cut_off(tool_call, day)
+
+
+def distill_search(message: ToolMessage, day: str, time_limit: int) -> ToolMessage:
+    """A recipe_search result reduced to a compact table of recipes within the time limit.
+
+    Error messages and anything else that is not a result list pass through;
+    see meal_agent.distill.
+    """
+    if not Configuration.from_runnable_config(ensure_config()).distill_search_results:
+        return message
+    table = distill_content(message.content, time_limit)
+    if table is None:
+        return message
+    saved = estimate_tokens(str(message.content)) - estimate_tokens(table)
+    record_day(day, search_tokens_saved=max(0, saved))
+    return message.model_copy(update={"content": table})
+
+
+def _day_constraints(day_input: dict) -> tuple[bool, int, int]:
+    return bool(day_input.get("dinner", False)), get_servings(day_input), day_input.get("dinner_time_limit", 60)
+
+
+def kept_days(meal_input: dict, previous_plan: dict | None) -> list[str]:
+    """Days whose meal from `previous_plan` still fits their input and can be kept as-is."""
+    if not previous_plan:
+        return []
+    previous_input = previous_plan.get("meal_input", {})
+    meal_output = previous_plan.get("meal_output", {})
+    day_results = previous_plan.get("day_results", {})
+    return [
+        day for day in DAYS_OF_WEEK
+        if meal_input.get(day, {}).get("dinner", False)
+        and _day_constraints(meal_input[day]) == _day_constraints(previous_input.get(day, {}))
+        # Days that failed to plan have no ingredients and are tried again
+        and meal_output.get(day, {}).get("ingredients")
+        and day in day_results
+    ]
+
+
+@instrumented
 def initialize(state: MealPlannerState) -> dict:
-    """Initialize processing state - build list of days to process."""
+    """Initialize processing state - build list of days to process.
+
+    With a `previous_plan`, only days whose input changed are planned; the
+    other days keep their meal and start the week's shopping totals and
+    inventory with their contributions from the earlier run.
+    """
     meal_input = state.get("meal_input", {})
+    previous_plan = state.get("previous_plan") or {}
+    kept = kept_days(meal_input, previous_plan)
 
     # Build list of days that need meals (in order)
     days_to_process = [
         day for day in DAYS_OF_WEEK
-        if meal_input.get(day, {}).get("dinner", False)
+        if meal_input.get(day, {}).get("dinner", False) and day not in kept
     ]
+    day_results = {day: previous_plan["day_results"][day] for day in kept}
 
     return {
         "days_to_process": days_to_process,
         "current_day_index": 0,
-        "meal_output": {},
+        "meal_output": {day: previous_plan["meal_output"][day] for day in kept},
         "shopping_list": {},
-        "fresh_inventory": {},
-        "messages": [],
+        "shopping_totals": merge_day_shopping(day_results, kept),
+        "fresh_inventory": merge_day_inventory(day_results),
+        "day_results": day_results,
+        "planned_recipes": {},
+        "cached_recipe": None,
+        "rejected_meals": [],
+        "messages": None,  # Drop any conversation left on the thread by an earlier run
+        "started_at": time.time(),
     }
 
 
-def generate_meal(state: MealPlannerState) -> dict:
-    """Generate a meal for the current day - call LLM with tools."""
+def current_day(state: MealPlannerState) -> str:
+    """Day the sequential loop is working on, or "" once every day is done."""
+    days_to_process = state.get("days_to_process", [])
+    current_index = state.get("current_day_index", 0)
+    return days_to_process[current_index] if current_index < len(days_to_process) else ""
+
+
+def get_servings(day_input: dict) -> int:
+    """Leftovers double the recipe."""
+    return 2 if day_input.get("dinner_leftovers", False) else 1
+
+
+def get_configured_recipe_cache(config: RunnableConfig | None) -> RecipeCache | RecipeFlights | None:
+    """Recipe cache for this run, or None when no cache path is configured.
+
+    Inside a batch (see meal_agent.batch) this is the batch's RecipeFlights,
+    layered over the configured cache.
+    """
+    flights = current_recipe_flights()
+    if flights is not None:
+        return flights
+    configuration = Configuration.from_runnable_config(config)
+    return get_recipe_cache(
+        configuration.recipe_cache_path,
+        configuration.recipe_cache_ttl,
+        configuration.recipe_cache_max_entries,
+    )
+
+
+def inline_images(config: RunnableConfig | None) -> bool:
+    """Whether images are searched while parsing instead of in the enrich_image stage."""
+    return Configuration.from_runnable_config(config).image_enrichment == "inline"
+
+
+def day_cache_key(day_input: dict, fresh_inventory: dict[str, float]) -> str:
+    """Recipe cache key for a day's constraints and the inventory it is planned against."""
+    return make_recipe_key(
+        day_input.get("dinner_time_limit", 60), get_servings(day_input), fresh_inventory
+    )
+
+
+def menu_candidates(config: RunnableConfig | None, max_time: int) -> list[dict]:
+    """Recipes the menu optimizer may choose from: cached recipes first, then the local corpus."""
+    configuration = Configuration.from_runnable_config(config)
+    limit = configuration.menu_pool_size
+    candidates = []
+    cache = get_configured_recipe_cache(config)
+    if cache is not None:
+        candidates.extend(
+            recipe for recipe in cache.recipes(limit)
+            if recipe.get("time_estimate") is not None and recipe["time_estimate"] <= max_time
+        )
+    index = get_recipe_index(configuration.recipe_corpus_path)
+    if index is not None and len(candidates) < limit:
+        candidates.extend(index.within(max_time, limit - len(candidates)))
+    return candidates
+
+
+@instrumented
+def optimize_menu(state: MealPlannerState, config: RunnableConfig) -> dict:
+    """Fill as many days as possible from known recipes, without the model."""
+    days_to_process = state.get("days_to_process", [])
+    configuration = Configuration.from_runnable_config(config)
+    if not days_to_process or not configuration.menu_optimizer:
+        return {"planned_recipes": {}}
+
+    meal_input = state.get("meal_input", {})
+    constraints = [
+        (day, meal_input[day].get("dinner_time_limit", 60), get_servings(meal_input[day]))
+        for day in days_to_process
+    ]
+    candidates = menu_candidates(config, max(time_limit for _, time_limit, _ in constraints))
+    pool = build_pool(candidates, configuration.menu_pool_size)
+    # Meals kept from a previous plan are already on the menu, with their fresh ingredients bought
+    kept_meals = list(state.get("meal_output", {}).values())
+    on_hand = inventory_use(state.get("shopping_totals", {}), state.get("fresh_inventory", {}))
+    return {"planned_recipes": plan_menu(constraints, pool, exclude=kept_meals, on_hand=on_hand)}
+
+
+def week_request(state: MealPlannerState) -> list[tuple[str, int, int]]:
+    """(day, time limit, servings) of every day still without a planned recipe."""
+    meal_input = state.get("meal_input", {})
+    planned_recipes = state.get("planned_recipes", {})
+    return [
+        (day, meal_input[day].get("dinner_time_limit", 60), get_servings(meal_input[day]))
+        for day in state.get("days_to_process", [])
+        if day not in planned_recipes
+    ]
+
+
+def build_week_messages(state: MealPlannerState, config: RunnableConfig, days: list[tuple[str, int, int]]) -> list:
+    """Build the prompt asking for every remaining day's dinner at once."""
+    planned_meals = list(dict.fromkeys(
+        [info["name"] for info in state.get("meal_output", {}).values()]
+        + [recipe["name"] for recipe in state.get("planned_recipes", {}).values()]
+    ))
+    prompt = week_prompt(
+        days, state.get("fresh_inventory", {}), planned_meals,
+        Configuration.from_runnable_config(config).prompt_context_tokens,
+    )
+    record_prompt("week", prompt.static_tokens, prompt.context_tokens, prompt.dropped_items)
+    return prompt.messages
+
+
+def accepted_week_dinners(
+    state: MealPlannerState, days: list[tuple[str, int, int]], plan: WeekPlan | None
+) -> dict:
+    """Merge the dinners of a week plan that pass validation into planned_recipes.
+
+    A dinner is kept when it is for a requested day, fits that day's time
+    limit, has ingredients and instructions, and is no near-duplicate of
+    another meal of the week. Rejected or missing days are left to the
+    sequential loop.
+    """
+    limits = {day: time_limit for day, time_limit, _ in days}
+    planned_recipes = dict(state.get("planned_recipes", {}))
+    taken = MealIndex([*state.get("meal_output", {}).values(), *planned_recipes.values()])
+
+    for dinner in plan.dinners if plan is not None else []:
+        day = dinner.day.strip().lower()
+        recipe = dinner.model_dump(exclude={"day"})
+        if (
+            day not in limits
+            or day in planned_recipes
+            or dinner.time_estimate > limits[day]
+            or not dinner.ingredients
+            or not dinner.instructions
+            or taken.duplicate_of(recipe) is not None
+        ):
+            continue
+        planned_recipes[day] = recipe
+        taken.add(recipe)
+
+    for day in limits:
+        if day not in planned_recipes:
+            record_retry(day, "week_fallback")
+    return {"planned_recipes": planned_recipes}
+
+
+@instrumented
+def plan_week(state: MealPlannerState, config: RunnableConfig) -> dict:
+    """Ask for the dinners of every remaining day in a single structured call."""
+    days = week_request(state)
+    if not days:
+        return {}
+    try:
+        plan = invoke_model("week_plan", _derived_llm("week"), build_week_messages(state, config, days))
+    except Exception:
+        # Every day falls back to being planned on its own
+        plan = None
+    return accepted_week_dinners(state, days, plan)
+
+
+@instrumented
+async def aplan_week(state: MealPlannerState, config: RunnableConfig) -> dict:
+    """Async version of plan_week."""
+    days = week_request(state)
+    if not days:
+        return {}
+    try:
+        plan = await ainvoke_model("week_plan", _derived_llm("week"), build_week_messages(state, config, days))
+    except Exception:
+        plan = None
+    return accepted_week_dinners(state, days, plan)
+
+
+def planned_meal_names(state: MealPlannerState, day: str) -> list[str]:
+    """Meals already planned or chosen by the menu optimizer for days other than `day`.
+
+    Recipes rejected for the current day as near-duplicates are included, so
+    the day is not given one of them again.
+    """
+    names = [info["name"] for d, info in state.get("meal_output", {}).items() if d != day]
+    names += [recipe["name"] for d, recipe in state.get("planned_recipes", {}).items() if d != day]
+    if day == current_day(state):
+        names += state.get("rejected_meals", [])
+    return list(dict.fromkeys(names))
+
+
+def duplicate_check(state: MealPlannerState, config: RunnableConfig | None, day: str) -> MealIndex | None:
+    """The other days' meals to check the day's recipe against, or None once its regenerations are used up."""
+    if len(state.get("rejected_meals", [])) >= Configuration.from_runnable_config(config).max_duplicate_retries:
+        return None
+    meals = [info for d, info in state.get("meal_output", {}).items() if d != day]
+    meals += [recipe for d, recipe in state.get("planned_recipes", {}).items() if d != day]
+    return MealIndex(meals)
+
+
+def build_generation_messages(
+    day: str,
+    time_limit: int,
+    servings: int,
+    fresh_inventory: dict[str, float],
+    planned_meals: list[str],
+    single_pass: bool = False,
+    context_budget: int = 400,
+) -> list:
+    """Build the static system prompt and the day's request used to search for its recipe."""
+    prompt = generation_prompt(
+        GENERATION_SYSTEM_PROMPTS[single_pass],
+        day, time_limit, servings, fresh_inventory, planned_meals, context_budget,
+    )
+    record_prompt("generation", prompt.static_tokens, prompt.context_tokens, prompt.dropped_items)
+    return prompt.messages
+
+
+def sequential_days_left(state: MealPlannerState) -> int:
+    """Days from the current one on that the sequential loop still has to generate."""
+    planned_recipes = state.get("planned_recipes", {})
+    days = state.get("days_to_process", [])[state.get("current_day_index", 0):]
+    return sum(1 for day in days if day not in planned_recipes)
+
+
+def deadline_recipe(
+    config: RunnableConfig | None, day: str, day_input: dict, planned_meals: list[str]
+) -> dict | None:
+    """A cached or local-corpus recipe for a day that starts out of time, if one fits."""
+    time_limit = day_input.get("dinner_time_limit", 60)
+    candidates = menu_candidates(config, time_limit)
+    pool = build_pool(candidates, Configuration.from_runnable_config(config).menu_pool_size)
+    recipe = plan_menu([(day, time_limit, get_servings(day_input))], pool, exclude=planned_meals).get(day)
+    if recipe is not None:
+        record_retry(day, "deadline_fallback")
+    return recipe
+
+
+def prepare_generation(
+    state: MealPlannerState, config: RunnableConfig
+) -> tuple[dict | None, list, float | None]:
+    """Build the current day's prompt and search deadline, or return an update that makes the LLM call unnecessary.
+
+    A day that starts with the run out of time takes a cached or local recipe
+    when one fits; otherwise the model writes one without searching.
+    """
     days_to_process = state.get("days_to_process", [])
     current_index = state.get("current_day_index", 0)
 
     if current_index >= len(days_to_process):
-        return {"messages": []}
+        return {"messages": []}, [], None
 
     day = days_to_process[current_index]
     meal_input = state.get("meal_input", {})
     day_input = meal_input.get(day, {})
 
     time_limit = day_input.get("dinner_time_limit", 60)
-    has_leftovers = day_input.get("dinner_leftovers", False)
-    servings = 2 if has_leftovers else 1
+    servings = get_servings(day_input)
 
-    # Get fresh inventory for context
+    planned_meals = planned_meal_names(state, day)
     fresh_inventory = state.get("fresh_inventory", {})
 
-    # Build prompt with context about remaining ingredients
-    inventory_context = ""
-    if fresh_inventory:
-        inventory_items = [f"{name}: {qty:.2f}" for name, qty in fresh_inventory.items() if qty > 0.1]
-        if inventory_items:
-            inventory_context = (
-                "\n\nIMPORTANT - You have these fresh ingredients remaining that should be used up "
-                "to avoid waste. STRONGLY prefer recipes that use these ingredients:\n"
-                + "\n".join(f"- {item}" for item in inventory_items)
-            )
+    # A recipe picked by the menu optimizer needs no search or parsing
+    planned = state.get("planned_recipes", {}).get(day)
+    if planned is not None and planned["name"] not in state.get("rejected_meals", []):
+        return {"cached_recipe": planned, "messages": []}, [], None
+
+    # A cached recipe for the same constraints skips search and parsing entirely
+    cache = get_configured_recipe_cache(config)
+    if cache is not None:
+        cached = cache.get(day_cache_key(day_input, fresh_inventory), exclude=planned_meals)
+        if cached is not None:
+            return {"cached_recipe": cached, "messages": []}, [], None
+
+    deadline = search_deadline(state.get("started_at"), config, sequential_days_left(state))
+    if expired(deadline, config):
+        recipe = deadline_recipe(config, day, day_input, planned_meals)
+        if recipe is not None:
+            return {"cached_recipe": recipe, "messages": []}, [], deadline
+
+    configuration = Configuration.from_runnable_config(config)
+    messages = build_generation_messages(
+        day, time_limit, servings, fresh_inventory, planned_meals,
+        configuration.generation_mode == "single_pass", configuration.prompt_context_tokens,
+    )
+    return None, messages, deadline
+
+
+@instrumented
+def generate_meal(state: MealPlannerState, config: RunnableConfig) -> dict:
+    """Generate a meal for the current day - call LLM with tools."""
+    update, messages, deadline = prepare_generation(state, config)
+    if update is not None:
+        return update
+
+    generation_llm = get_generation_llm(config, may_search(config, 0, deadline))
+    with meal_stream(current_day(state), state.get("started_at"), config) as stream:
+        response = stream_model("generation", generation_llm, messages)
+    return {
+        "cached_recipe": None,
+        "messages": messages + [response],
+        "search_deadline": deadline,
+        **stream.visible_update(),
+    }
 
-    # Get already-planned meals to avoid duplicates
-    meal_output = state.get("meal_output", {})
-    already_planned = ""
-    if meal_output:
-        planned_meals = [info["name"] for info in meal_output.values()]
-        already_planned = (
-            "\n\nIMPORTANT - These meals have already been planned for other days. "
-            "You MUST choose a DIFFERENT recipe:\n"
-            + "\n".join(f"- {meal}" for meal in planned_meals)
-        )
 
-    system_prompt = f"""You are a helpful meal planning assistant. Your task is to find and suggest a dinner recipe.
+@instrumented
+async def agenerate_meal(state: MealPlannerState, config: RunnableConfig) -> dict:
+    """Async version of generate_meal."""
+    shared = await await_shared_recipe(state, config)
+    if shared is not None:
+        return {"cached_recipe": shared, "messages": []}
 
-Requirements:
-- The recipe must take {time_limit} minutes or less total (prep + cooking time)
-- The recipe should serve {servings} person(s)
-- Choose recipes with commonly available ingredients
-- Prefer simple, home-cooked meals{inventory_context}{already_planned}
+    update, messages, deadline = prepare_generation(state, config)
+    if update is not None:
+        return update
 
-Use the recipe_search tool to find a recipe, then provide complete details including:
-- Recipe name
-- Full ingredient list with quantities
-- Step-by-step cooking instructions"""
+    generation_llm = get_generation_llm(config, may_search(config, 0, deadline))
+    with meal_stream(current_day(state), state.get("started_at"), config) as stream:
+        response = await astream_model("generation", generation_llm, messages)
+    return {
+        "cached_recipe": None,
+        "messages": messages + [response],
+        "search_deadline": deadline,
+        **stream.visible_update(),
+    }
 
-    human_prompt = f"""Find a dinner recipe for {day.capitalize()} that takes {time_limit} minutes or less.
-Search for a recipe and provide the complete details."""
 
-    messages = [
-        SystemMessage(content=system_prompt),
-        HumanMessage(content=human_prompt),
-    ]
+async def await_shared_recipe(state: MealPlannerState, config: RunnableConfig) -> dict | None:
+    """In a batch, the recipe of another household's identical generation, waiting while it runs.
+
+    None when the day needs no generation or this household has to generate
+    it; the household's generation then ends in aprocess_recipe.
+    """
+    cache = get_configured_recipe_cache(config)
+    day = current_day(state)
+    if not isinstance(cache, RecipeFlights) or not day or day in state.get("planned_recipes", {}):
+        return None
+    day_input = state.get("meal_input", {}).get(day, {})
+    return await cache.acquire(
+        day_cache_key(day_input, state.get("fresh_inventory", {})), planned_meal_names(state, day)
+    )
 
-    response = llm_with_tools.invoke(messages)
-    return {"messages": messages + [response]}
+
+def needs_search(message) -> bool:
+    """True when a response asks for searches rather than returning a recipe."""
+    tool_calls = getattr(message, "tool_calls", None)
+    if not tool_calls:
+        return False
+    return not any(call["name"] == RECIPE_OUTPUT_TOOL for call in tool_calls)
 
 
 def should_use_tools(state: MealPlannerState) -> str:
@@ -130,162 +660,292 @@ def should_use_tools(state: MealPlannerState) -> str:
     if not messages:
         return "process"
 
-    last_message = messages[-1]
-    if hasattr(last_message, "tool_calls") and last_message.tool_calls:
+    if needs_search(messages[-1]):
         return "tools"
     return "process"
 
 
-def process_tool_response(state: MealPlannerState) -> dict:
-    """After tools run, continue the conversation to get the full recipe."""
-    messages = state.get("messages", [])
-
-    # Continue the conversation to get the full recipe details
-    response = llm_with_tools.invoke(messages)
-    return {"messages": [response]}
+def search_rounds(messages: list) -> int:
+    """Search rounds the current day has made: responses asking for searches since its request."""
+    rounds = 0
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            break
+        rounds += needs_search(message)
+    return rounds
 
 
-def process_recipe(state: MealPlannerState) -> dict:
-    """Process the LLM response to extract and structure the recipe."""
+def continuation_llm(state: MealPlannerState, config: RunnableConfig):
+    """Generation model after a round of searches, or the answer-only model once the day may not search again."""
     messages = state.get("messages", [])
-    days_to_process = state.get("days_to_process", [])
-    current_index = state.get("current_day_index", 0)
+    return get_generation_llm(config, may_search(config, search_rounds(messages), state.get("search_deadline")))
 
-    if current_index >= len(days_to_process):
-        return {}
 
-    day = days_to_process[current_index]
-    meal_input = state.get("meal_input", {})
-    day_input = meal_input.get(day, {})
-    has_leftovers = day_input.get("dinner_leftovers", False)
-    servings = 2 if has_leftovers else 1
+@instrumented
+def process_tool_response(state: MealPlannerState, config: RunnableConfig) -> dict:
+    """After tools run, continue the conversation to get the full recipe."""
+    messages = state.get("messages", [])
+
+    # Continue the conversation to get the full recipe details
+    with meal_stream(current_day(state), state.get("started_at"), config) as stream:
+        response = stream_model("generation", continuation_llm(state, config), messages)
+    return {"messages": [response], **stream.visible_update()}
+
+
+@instrumented
+async def aprocess_tool_response(state: MealPlannerState, config: RunnableConfig) -> dict:
+    """Async version of process_tool_response."""
+    with meal_stream(current_day(state), state.get("started_at"), config) as stream:
+        response = await astream_model("generation", continuation_llm(state, config), state.get("messages", []))
+    return {"messages": [response], **stream.visible_update()}
+
+
+def day_time_limit(state: MealPlannerState, day: str) -> int:
+    return state.get("meal_input", {}).get(day, {}).get("dinner_time_limit", 60)
+
+
+@instrumented
+def run_tools(state: MealPlannerState, config: RunnableConfig) -> dict:
+    """Run the searches requested by the last message."""
+    day = current_day(state)
+    record_day(day, tool_iterations=1)
+    return {"messages": run_tool_calls(
+        state["messages"][-1], day, day_time_limit(state, day), state.get("search_deadline"), config
+    )}
+
+
+@instrumented
+async def arun_tools(state: MealPlannerState, config: RunnableConfig) -> dict:
+    """Async version of run_tools."""
+    day = current_day(state)
+    record_day(day, tool_iterations=1)
+    return {"messages": await arun_tool_calls(
+        state["messages"][-1], day, day_time_limit(state, day), state.get("search_deadline"), config
+    )}
+
+
+def build_parse_prompt(recipe_text: str, servings: int) -> list:
+    """Messages asking the structured LLM to turn recipe prose into a ParsedRecipe."""
+    prompt = parse_prompt(recipe_text, servings)
+    record_prompt("parse", prompt.static_tokens, prompt.context_tokens)
+    return prompt.messages
+
+
+def parse_recipe(recipe_text: str, servings: int) -> ParsedRecipe:
+    """Parse recipe prose with the structured LLM.
+
+    When partial meals are streamed the model is made to call ParsedRecipe
+    instead, so its arguments can be streamed as they are written.
+    """
+    messages = build_parse_prompt(recipe_text, servings)
+    if streaming_meal() is None:
+        return invoke_model("parse", get_structured_llm(), messages)
+    response = stream_model("parse", _derived_llm("recipe_tool"), messages)
+    return ParsedRecipe.model_validate(find_structured_recipe([response]))
+
+
+async def aparse_recipe(recipe_text: str, servings: int) -> ParsedRecipe:
+    """Async version of parse_recipe."""
+    messages = build_parse_prompt(recipe_text, servings)
+    if streaming_meal() is None:
+        return await ainvoke_model("parse", get_structured_llm(), messages)
+    response = await astream_model("parse", _derived_llm("recipe_tool"), messages)
+    return ParsedRecipe.model_validate(find_structured_recipe([response]))
+
+
+def find_structured_recipe(messages: list) -> dict | None:
+    """Arguments of the model's ParsedRecipe call in its final message, if it made one."""
+    if not messages or not isinstance(messages[-1], AIMessage):
+        return None
+    for call in messages[-1].tool_calls:
+        if call["name"] == RECIPE_OUTPUT_TOOL:
+            return call["args"]
+    return None
+
+
+def extract_recipe(messages: list) -> tuple[ParsedRecipe | None, str | None]:
+    """Find the day's answer: a valid single-pass recipe, or else the text to parse."""
+    # Single-pass answers arrive already structured; only invalid ones need parsing
+    structured_args = find_structured_recipe(messages)
+    if structured_args is not None:
+        try:
+            return ParsedRecipe.model_validate(structured_args), None
+        except ValidationError as e:
+            print(f"Structured recipe failed validation ({e.error_count()} errors), re-parsing")
+            return None, json.dumps(structured_args)
 
     # Get the last AI message (the recipe response)
-    last_ai_message = None
     for msg in reversed(messages):
         if isinstance(msg, AIMessage) and msg.content:
-            last_ai_message = msg
-            break
+            return None, msg.content
+    return None, None
 
-    if not last_ai_message:
-        # Create a fallback meal if no response
-        meal_info: MealInfo = {
-            "name": f"Simple dinner for {day}",
-            "ingredients": {"chicken_breast": "1 lb", "vegetables": "mixed"},
-            "instructions": ["Season and cook chicken", "Serve with vegetables"],
-        }
-        return {
-            "meal_output": {day: meal_info},
-            "shopping_list": {"chicken_breast": 1.0},
-        }
 
-    # Use structured output to parse the recipe
-    parse_prompt = f"""Parse the following recipe information into a structured format.
-Scale all ingredient quantities for {servings} serving(s).
-
-Recipe text:
-{last_ai_message.content}
-
-Extract:
-1. Recipe name
-2. All ingredients with precise quantities, PROPER UNITS, and category
-3. Step-by-step instructions
-4. Mark each ingredient as fresh (spoils within a week) or not
-5. Total time estimate in minutes (prep + cooking)
-6. Required equipment (choose from: 'stovetop', 'oven', 'air_fryer', 'microwave', 'no_cook')
-
-CRITICAL - Unit formatting rules:
-- Meats/proteins: use weight (lb or oz). Example: "0.5 lb chicken_breast", "4 oz salmon"
-- Garlic: use "clove" not whole heads. Example: "2 clove garlic"
-- Onions/peppers/tomatoes: use "medium" or "large" or weight. Example: "1 medium onion"
-- Liquids: use volume (cup, tbsp, tsp). Example: "0.25 cup soy_sauce"
-- Cheese: use weight or volume. Example: "0.25 cup parmesan" or "2 oz cheddar"
-- Herbs: use "tbsp" for chopped or "sprig" for whole. Example: "2 tbsp cilantro"
-- Pasta/rice/grains: use weight or volume. Example: "4 oz pasta" or "0.5 cup rice"
-
-CRITICAL - Ingredient categories:
-- produce: vegetables, fruits (spinach, tomato, lemon, bell_pepper)
-- protein: meats, fish, tofu, eggs (chicken_breast, ground_beef, salmon, eggs)
-- dairy: milk, cheese, butter, cream (parmesan, cheddar, butter, heavy_cream)
-- grains: pasta, rice, bread, flour (pasta, rice, bread_crumbs)
-- pantry: canned goods, sauces, condiments (soy_sauce, chicken_broth, olive_oil)
-- aromatics: garlic, onion, ginger, shallot, herbs (garlic, onion, ginger, basil)
-
-For ingredient names, use lowercase with underscores (e.g., 'ground_beef', 'bell_pepper', 'garlic').
-Common fresh items: meat, poultry, fish, vegetables, fruits, dairy, eggs, fresh herbs.
-Non-fresh: canned goods, pasta, rice, dried spices, condiments."""
+def no_response_update(day: str) -> dict:
+    """Fallback meal when the model produced no recipe at all."""
+    meal_info: MealInfo = {
+        "name": f"Simple dinner for {day}",
+        "ingredients": {"chicken_breast": {"quantity": "1 lb", "category": "protein"}},
+        "instructions": ["Season and cook chicken", "Serve with vegetables"],
+    }
+    amounts: dict[str, float] = {}
+    add_amount(amounts, 1, "lb")
+    return {
+        "meal_output": {day: meal_info},
+        "shopping_totals": {"chicken_breast": {"amounts": amounts, "category": "protein"}},
+    }
 
-    try:
-        parsed: ParsedRecipe = structured_llm.invoke(parse_prompt)
-    except Exception as e:
-        # If parsing fails, create a simple fallback
-        print(f"Recipe parsing failed: {e}")
-        meal_info = {
-            "name": f"Dinner for {day}",
-            "ingredients": {},
-            "instructions": ["See recipe details above"],
-        }
-        return {"meal_output": {day: meal_info}}
 
+def parse_failed_update(day: str, error: Exception) -> dict:
+    """Fallback meal when the recipe text could not be parsed.
+
+    Re-raises `error` instead when the run does not degrade failed days.
+    """
+    if not Configuration.from_runnable_config(ensure_config()).degrade_failed_days:
+        raise error
+    print(f"Recipe parsing failed: {error}")
+    meal_info: MealInfo = {
+        "name": f"Dinner for {day}",
+        "ingredients": {},
+        "instructions": ["See recipe details above"],
+    }
+    return {"meal_output": {day: meal_info}}
+
+
+def rejected_update(day: str, name: str, duplicate_of: str) -> dict:
+    """Update rejecting a day's recipe as a near-duplicate of another day's meal, so it is generated again."""
+    print(f"Recipe {name!r} for {day} is too close to {duplicate_of!r}, generating another")
+    record_retry(day, "near_duplicate")
+    return {"rejected_meals": [name]}
+
+
+def build_recipe_update(
+    day: str,
+    servings: int,
+    messages: list,
+    current_inventory: dict[str, float],
+    cache: RecipeCache | None = None,
+    cache_key: str = "",
+    search_image: bool = True,
+    cached: dict | None = None,
+    exclude: MealIndex | None = None,
+) -> dict:
+    """Parse the day's final recipe message into meal, shopping and inventory updates.
+
+    A `cached` recipe from the recipe cache is used as-is instead of the messages.
+    A recipe that is a near-duplicate of a meal in `exclude` is rejected
+    before it is cached or its image is looked up, and any partial meal
+    streamed for it is withdrawn: the update then holds only `rejected_meals`.
+    """
+    if cached:
+        parsed = ParsedRecipe.model_validate(cached)
+        recipe_text = None
+    else:
+        parsed, recipe_text = extract_recipe(messages)
+    if parsed is None:
+        if not recipe_text:
+            return no_response_update(day)
+        if find_structured_recipe(messages) is not None:
+            record_retry(day, "reparse")
+
+        # Use structured output to parse the recipe
+        try:
+            parsed = parse_recipe(recipe_text, servings)
+        except Exception as e:
+            return parse_failed_update(day, e)
+
+    duplicate_of = exclude.duplicate_of(parsed.model_dump()) if exclude is not None else None
+    if duplicate_of is not None:
+        retract_meal()
+        return rejected_update(day, parsed.name, duplicate_of)
+    if cache is not None and not cached:
+        cache.put(cache_key, parsed.model_dump())
+    finish_meal(parsed.model_dump())
+
+    # Search for a relevant recipe image, unless enrich_image resolves it later
+    image_url = search_recipe_image(parsed.name) if search_image else None
+    return build_meal_update(day, parsed, current_inventory, image_url)
+
+
+async def abuild_recipe_update(
+    day: str,
+    servings: int,
+    messages: list,
+    current_inventory: dict[str, float],
+    cache: RecipeCache | None = None,
+    cache_key: str = "",
+    search_image: bool = True,
+    cached: dict | None = None,
+    exclude: MealIndex | None = None,
+) -> dict:
+    """Async version of build_recipe_update."""
+    if cached:
+        parsed = ParsedRecipe.model_validate(cached)
+        recipe_text = None
+    else:
+        parsed, recipe_text = extract_recipe(messages)
+    if parsed is None:
+        if not recipe_text:
+            return no_response_update(day)
+        if find_structured_recipe(messages) is not None:
+            record_retry(day, "reparse")
+        try:
+            parsed = await aparse_recipe(recipe_text, servings)
+        except Exception as e:
+            return parse_failed_update(day, e)
+
+    duplicate_of = exclude.duplicate_of(parsed.model_dump()) if exclude is not None else None
+    if duplicate_of is not None:
+        retract_meal()
+        return rejected_update(day, parsed.name, duplicate_of)
+    if cache is not None and not cached:
+        cache.put(cache_key, parsed.model_dump())
+    finish_meal(parsed.model_dump())
+
+    image_url = await asearch_recipe_image(parsed.name) if search_image else None
+    return build_meal_update(day, parsed, current_inventory, image_url)
+
+
+def build_meal_update(
+    day: str,
+    parsed: ParsedRecipe,
+    current_inventory: dict[str, float],
+    image_url: str | None = None,
+) -> dict:
+    """Turn a parsed recipe into meal, shopping totals and fresh inventory updates."""
     # Build the meal info
     ingredients_dict: dict[str, IngredientInfo] = {}
-    shopping_updates = {}
+    shopping_updates: dict[str, ShoppingItem] = {}
     fresh_updates = {}
-    current_inventory = dict(state.get("fresh_inventory", {}))
-
-    # Track units and categories separately for proper shopping list formatting
-    ingredient_units = {}
-    ingredient_categories = {}
 
     for ing in parsed.ingredients:
-        ing_name = ing.name.lower().replace(" ", "_")
+        ing_name = ingredient_key(ing.name)
 
         # Skip pantry staples
-        if ing_name in PANTRY_STAPLES or any(staple in ing_name for staple in PANTRY_STAPLES):
+        entry = resolve_ingredient(ing_name)
+        if entry is not None and entry.is_staple:
             continue
 
-        # Store as IngredientInfo with quantity and category
-        quantity_str = f"{ing.quantity} {ing.unit}"
-        if ing.quantity == int(ing.quantity):
-            quantity_str = f"{int(ing.quantity)} {ing.unit}"
+        # Shopping and inventory use the catalog name, so "red_bell_pepper" and
+        # "bell_pepper" are bought together; the meal keeps the recipe's name
+        key = entry.name if entry is not None else ing_name
+        is_fresh = entry.is_fresh if entry is not None and entry.is_fresh is not None else ing.is_fresh
 
+        # Store as IngredientInfo with quantity and category
         ingredients_dict[ing_name] = {
-            "quantity": quantity_str,
+            "quantity": format_quantity(ing.quantity, ing.unit),
             "category": ing.category,
         }
 
-        # Update shopping list - aggregate quantities and track units
-        current_qty = shopping_updates.get(ing_name, 0)
-        shopping_updates[ing_name] = current_qty + ing.quantity
-        ingredient_units[ing_name] = ing.unit  # Store the unit
-        ingredient_categories[ing_name] = ing.category  # Store category for shopping list
+        # Update shopping totals - quantities are summed in canonical units
+        item = shopping_updates.setdefault(key, {"amounts": {}, "category": ing.category})
+        add_amount(item["amounts"], ing.quantity, ing.unit)
 
         # Track fresh ingredients
-        if ing.is_fresh:
-            if ing_name not in current_inventory:
-                # First time using this ingredient - "buy" a standard unit
-                # For simplicity, we'll track what's been used
-                fresh_updates[ing_name] = ing.quantity
-            else:
-                # Already have some, add to usage
-                fresh_updates[ing_name] = current_inventory[ing_name] + ing.quantity
-
-    # Format shopping list with units and categories
-    formatted_shopping = {}
-    for ing_name, qty in shopping_updates.items():
-        unit = ingredient_units.get(ing_name, "")
-        category = ingredient_categories.get(ing_name, "pantry")
-        if qty == int(qty):
-            quantity_str = f"{int(qty)} {unit}".strip()
-        else:
-            quantity_str = f"{qty:.2g} {unit}".strip()
-        formatted_shopping[ing_name] = {
-            "quantity": quantity_str,
-            "category": category,
-        }
-
-    # Search for a relevant recipe image
-    image_url = search_recipe_image(parsed.name)
+        if is_fresh:
+            # For simplicity, we track what's been used so far this week
+            used = fresh_updates.get(key, current_inventory.get(key, 0))
+            fresh_updates[key] = used + ing.quantity
 
     meal_info: MealInfo = {
         "name": parsed.name,
@@ -300,18 +960,119 @@ Non-fresh: canned goods, pasta, rice, dried spices, condiments."""
 
     return {
         "meal_output": {day: meal_info},
-        "shopping_list": formatted_shopping,
+        "shopping_totals": shopping_updates,
         "fresh_inventory": fresh_updates,
-        "messages": [],  # Clear messages for next day
     }
 
 
+def recipe_update_args(state: MealPlannerState, config: RunnableConfig) -> tuple | None:
+    """Arguments for build_recipe_update for the current day, or None when all days are done."""
+    days_to_process = state.get("days_to_process", [])
+    current_index = state.get("current_day_index", 0)
+
+    if current_index >= len(days_to_process):
+        return None
+
+    day = days_to_process[current_index]
+    day_input = state.get("meal_input", {}).get(day, {})
+    fresh_inventory = dict(state.get("fresh_inventory", {}))
+    return (
+        day,
+        get_servings(day_input),
+        state.get("messages", []),
+        fresh_inventory,
+        get_configured_recipe_cache(config),
+        day_cache_key(day_input, fresh_inventory),
+        inline_images(config),
+        state.get("cached_recipe"),
+    )
+
+
+def sequential_day_result(day: str, update: dict, current_inventory: dict[str, float]) -> dict[str, DayResult]:
+    """The day's own shopping and inventory use, as parallel branches report it, for later re-plans."""
+    if "shopping_totals" not in update:
+        return {}
+    fresh_used = {
+        name: qty - current_inventory.get(name, 0) for name, qty in update.get("fresh_inventory", {}).items()
+    }
+    return {day: {"shopping_totals": update["shopping_totals"], "fresh_inventory": fresh_used}}
+
+
+def running_shopping_list(state: MealPlannerState, update: dict) -> dict[str, IngredientInfo]:
+    """Formatted week-to-date entries for the ingredients a day's update touches."""
+    delta = update.get("shopping_totals", {})
+    totals = state.get("shopping_totals", {})
+    touched = {name: totals[name] for name in delta if name in totals}
+    return format_shopping_list(add_shopping(touched, delta))
+
+
+def finish_day_update(state: MealPlannerState, args: tuple, update: dict, stream: MealStream) -> dict:
+    """Complete process_recipe's update from the day's recipe update, discarding the day's conversation.
+
+    A recipe rejected as a near-duplicate is added to `rejected_meals`, and
+    route_after_recipe sends the day back to generate_meal.
+    """
+    day, current_inventory = args[0], args[3]
+    if "rejected_meals" in update:
+        return {
+            "rejected_meals": state.get("rejected_meals", []) + update["rejected_meals"],
+            "cached_recipe": None,
+            "messages": None,
+            **stream.visible_update(),
+        }
+    update["day_results"] = sequential_day_result(day, update, current_inventory)
+    update["shopping_list"] = running_shopping_list(state, update)
+    update["cached_recipe"] = None
+    update["rejected_meals"] = []
+    update["messages"] = None  # Discard the day's conversation (see day_messages)
+    update.update(stream.visible_update(update))
+    return update
+
+
+@instrumented
+def process_recipe(state: MealPlannerState, config: RunnableConfig) -> dict:
+    """Process the LLM response to extract and structure the recipe."""
+    args = recipe_update_args(state, config)
+    if args is None:
+        return {}
+
+    with meal_stream(args[0], state.get("started_at"), config) as stream:
+        update = build_recipe_update(*args, exclude=duplicate_check(state, config, args[0]))
+    return finish_day_update(state, args, update, stream)
+
+
+@instrumented
+async def aprocess_recipe(state: MealPlannerState, config: RunnableConfig) -> dict:
+    """Async version of process_recipe."""
+    args = recipe_update_args(state, config)
+    if args is None:
+        return {}
+
+    cache, cache_key = args[4], args[5]
+    try:
+        with meal_stream(args[0], state.get("started_at"), config) as stream:
+            update = await abuild_recipe_update(*args, exclude=duplicate_check(state, config, args[0]))
+    finally:
+        if isinstance(cache, RecipeFlights):
+            cache.release(cache_key)
+    return finish_day_update(state, args, update, stream)
+
+
+@instrumented
 def advance_day(state: MealPlannerState) -> dict:
     """Move to the next day in the processing queue."""
     current_index = state.get("current_day_index", 0)
     return {"current_day_index": current_index + 1}
 
 
+def route_after_recipe(state: MealPlannerState) -> str:
+    """Generate the current day again when its recipe was rejected as a near-duplicate."""
+    day = current_day(state)
+    if day and state.get("rejected_meals") and day not in state.get("meal_output", {}):
+        return "regenerate"
+    return "advance"
+
+
 def should_continue(state: MealPlannerState) -> str:
     """Determine if there are more days to process."""
     days_to_process = state.get("days_to_process", [])
@@ -322,28 +1083,531 @@ def should_continue(state: MealPlannerState) -> str:
     return "end"
 
 
+# Parallel planning: one branch per day, then a reconcile step
+
+
+def run_tool_calls(
+    response: AIMessage,
+    day: str,
+    time_limit: int,
+    deadline: float | None = None,
+    config: RunnableConfig | None = None,
+) -> list[ToolMessage]:
+    """Execute the search calls on a response, reporting tool errors back to the model.
+
+    Results reach the model distilled for the day's time limit (see
+    distill_search); searches still running at `deadline` are abandoned.
+    """
+    tool_messages = []
+    for tool_call in response.tool_calls:
+        if tool_call["name"] == RECIPE_OUTPUT_TOOL:
+            continue
+        try:
+            tool_messages.append(distill_search(invoke_search_within(tool_call, day, deadline, config), day, time_limit))
+        except Exception as e:
+            tool_messages.append(ToolMessage(
+                content=f"Error: {e!r}\n Please fix your mistakes.",
+                tool_call_id=tool_call["id"],
+                name=tool_call["name"],
+                status="error",
+            ))
+    return tool_messages
+
+
+async def arun_tool_calls(
+    response: AIMessage,
+    day: str,
+    time_limit: int,
+    deadline: float | None = None,
+    config: RunnableConfig | None = None,
+) -> list[ToolMessage]:
+    """Async version of run_tool_calls; searches run concurrently."""
+    async def run(tool_call) -> ToolMessage:
+        try:
+            return distill_search(await ainvoke_search_within(tool_call, day, deadline, config), day, time_limit)
+        except Exception as e:
+            return ToolMessage(
+                content=f"Error: {e!r}\n Please fix your mistakes.",
+                tool_call_id=tool_call["id"],
+                name=tool_call["name"],
+                status="error",
+            )
+
+    return list(await asyncio.gather(*(
+        run(tool_call) for tool_call in response.tool_calls
+        if tool_call["name"] != RECIPE_OUTPUT_TOOL
+    )))
+
+
+def plan_single_day(
+    day: str,
+    day_input: dict,
+    planned_meals: list[str],
+    fresh_inventory: dict[str, float],
+    config: RunnableConfig | None = None,
+    recipe: dict | None = None,
+    deadline: float | None = None,
+) -> dict:
+    """Run the full generate -> tools -> parse chain for one day outside the main loop.
+
+    A `recipe` chosen by the menu optimizer is used as-is, skipping the model.
+    The day may search until `deadline` (see meal_agent.deadlines). A recipe
+    that is a near-duplicate of one of `planned_meals` is generated again
+    without it, up to `max_duplicate_retries` times.
+    """
+    retries = Configuration.from_runnable_config(config).max_duplicate_retries
+    rejected: list[str] = []
+    while True:
+        exclude = MealIndex(planned_meals) if len(rejected) < retries else None
+        update = _plan_day_once(
+            day, day_input, planned_meals + rejected, fresh_inventory, config, recipe, deadline, exclude
+        )
+        if "rejected_meals" not in update:
+            return _as_day_result(day, update)
+        rejected += update["rejected_meals"]
+        recipe = None
+
+
+def _plan_day_once(
+    day: str,
+    day_input: dict,
+    planned_meals: list[str],
+    fresh_inventory: dict[str, float],
+    config: RunnableConfig | None,
+    recipe: dict | None,
+    deadline: float | None,
+    exclude: MealIndex | None,
+) -> dict:
+    """One generate -> tools -> parse chain for a day; its recipe update, or a rejection of a near-duplicate."""
+    cached, messages, recipe_args = _single_day_setup(
+        day, day_input, planned_meals, fresh_inventory, config, recipe, deadline
+    )
+    if cached is None:
+        time_limit = day_input.get("dinner_time_limit", 60)
+        rounds = 0
+        response = stream_model("generation", get_generation_llm(config, may_search(config, 0, deadline)), messages)
+        messages.append(response)
+        while needs_search(response):
+            rounds += 1
+            record_day(day, tool_iterations=1)
+            messages.extend(run_tool_calls(response, day, time_limit, deadline, config))
+            generation_llm = get_generation_llm(config, may_search(config, rounds, deadline))
+            response = stream_model("generation", generation_llm, messages)
+            messages.append(response)
+
+    return build_recipe_update(*recipe_args, cached=cached, exclude=exclude)
+
+
+async def aplan_single_day(
+    day: str,
+    day_input: dict,
+    planned_meals: list[str],
+    fresh_inventory: dict[str, float],
+    config: RunnableConfig | None = None,
+    recipe: dict | None = None,
+    deadline: float | None = None,
+) -> dict:
+    """Async version of plan_single_day.
+
+    In a batch, an identical generation by another household is awaited and
+    reused instead of generating again.
+    """
+    retries = Configuration.from_runnable_config(config).max_duplicate_retries
+    rejected: list[str] = []
+    while True:
+        exclude = MealIndex(planned_meals) if len(rejected) < retries else None
+        update = await _aplan_day_once(
+            day, day_input, planned_meals + rejected, fresh_inventory, config, recipe, deadline, exclude
+        )
+        if "rejected_meals" not in update:
+            return _as_day_result(day, update)
+        rejected += update["rejected_meals"]
+        recipe = None
+
+
+async def _aplan_day_once(
+    day: str,
+    day_input: dict,
+    planned_meals: list[str],
+    fresh_inventory: dict[str, float],
+    config: RunnableConfig | None,
+    recipe: dict | None,
+    deadline: float | None,
+    exclude: MealIndex | None,
+) -> dict:
+    """Async version of _plan_day_once."""
+    flights = get_configured_recipe_cache(config)
+    if recipe is None and isinstance(flights, RecipeFlights):
+        recipe = await flights.acquire(day_cache_key(day_input, fresh_inventory), planned_meals)
+
+    cached, messages, recipe_args = _single_day_setup(
+        day, day_input, planned_meals, fresh_inventory, config, recipe, deadline
+    )
+    try:
+        if cached is None:
+            time_limit = day_input.get("dinner_time_limit", 60)
+            rounds = 0
+            generation_llm = get_generation_llm(config, may_search(config, 0, deadline))
+            response = await astream_model("generation", generation_llm, messages)
+            messages.append(response)
+            while needs_search(response):
+                rounds += 1
+                record_day(day, tool_iterations=1)
+                messages.extend(await arun_tool_calls(response, day, time_limit, deadline, config))
+                generation_llm = get_generation_llm(config, may_search(config, rounds, deadline))
+                response = await astream_model("generation", generation_llm, messages)
+                messages.append(response)
+
+        return await abuild_recipe_update(*recipe_args, cached=cached, exclude=exclude)
+    finally:
+        if isinstance(flights, RecipeFlights):
+            flights.release(recipe_args[5])
+
+
+def _single_day_setup(
+    day: str,
+    day_input: dict,
+    planned_meals: list[str],
+    fresh_inventory: dict[str, float],
+    config: RunnableConfig | None,
+    recipe: dict | None = None,
+    deadline: float | None = None,
+) -> tuple[dict | None, list, tuple]:
+    """Planned or cached recipe (if any), initial prompt messages and build_recipe_update arguments for one day.
+
+    A day that starts past its search `deadline` takes a cached or local recipe when one fits.
+    """
+    time_limit = day_input.get("dinner_time_limit", 60)
+    servings = get_servings(day_input)
+    cache = get_configured_recipe_cache(config)
+    cache_key = day_cache_key(day_input, fresh_inventory)
+    configuration = Configuration.from_runnable_config(config)
+
+    messages = []
+    cached = recipe
+    if cached is None and cache is not None:
+        cached = cache.get(cache_key, exclude=planned_meals)
+    if cached is None and expired(deadline, config):
+        cached = deadline_recipe(config, day, day_input, planned_meals)
+    if cached is None:
+        messages = build_generation_messages(
+            day, time_limit, servings, fresh_inventory, planned_meals,
+            configuration.generation_mode == "single_pass", configuration.prompt_context_tokens,
+        )
+
+    # Inventory is tracked per day here; reconcile sums the days afterwards
+    recipe_args = (day, servings, messages, {}, cache, cache_key, inline_images(config))
+    return cached, messages, recipe_args
+
+
+def _as_day_result(day: str, update: dict) -> dict:
+    """Move a day's shopping and inventory updates into day_results for reconcile."""
+    day_result: DayResult = {
+        "shopping_totals": update.get("shopping_totals", {}),
+        "fresh_inventory": update.get("fresh_inventory", {}),
+    }
+    return {
+        "meal_output": update["meal_output"],
+        "day_results": {day: day_result},
+    }
+
+
+def merge_day_inventory(day_results: dict[str, DayResult]) -> dict[str, float]:
+    """Sum the fresh ingredient usage of every planned day."""
+    inventory: dict[str, float] = {}
+    for result in day_results.values():
+        for name, qty in result.get("fresh_inventory", {}).items():
+            inventory[name] = inventory.get(name, 0) + qty
+    return inventory
+
+
+def merge_day_shopping(day_results: dict[str, DayResult], days: list[str]) -> dict[str, ShoppingItem]:
+    """Sum per-day shopping totals in day order."""
+    shopping: dict[str, ShoppingItem] = {}
+    for day in days:
+        shopping = add_shopping(shopping, day_results.get(day, {}).get("shopping_totals"))
+    return shopping
+
+
+def _wave(state: MealPlannerState, config: RunnableConfig | None) -> list[str]:
+    """Days handled by the next parallel wave, capped by max_parallel_days."""
+    days_to_process = state.get("days_to_process", [])
+    current_index = state.get("current_day_index", 0)
+    cap = max(1, Configuration.from_runnable_config(config).max_parallel_days)
+    return days_to_process[current_index:current_index + cap]
+
+
+def fan_out_days(state: MealPlannerState, config: RunnableConfig) -> list[Send] | str:
+    """Send each day of the next wave to its own plan_day branch."""
+    wave = _wave(state, config)
+    if not wave:
+        return "reconcile"
+
+    planned_recipes = state.get("planned_recipes", {})
+    fresh_inventory = merge_day_inventory(state.get("day_results", {}))
+    # Each wave gets an equal share of the time left
+    days_left = state.get("days_to_process", [])[state.get("current_day_index", 0):]
+    waves = waves_left(days_left, Configuration.from_runnable_config(config).max_parallel_days)
+    deadline = search_deadline(state.get("started_at"), config, waves)
+    return [
+        Send("plan_day", {
+            "day": day,
+            "meal_input": state.get("meal_input", {}),
+            "planned_meals": planned_meal_names(state, day),
+            "fresh_inventory": fresh_inventory,
+            "planned_recipe": planned_recipes.get(day),
+            "started_at": state.get("started_at"),
+            "search_deadline": deadline,
+        })
+        for day in wave
+    ]
+
+
+def route_planning_mode(state: MealPlannerState, config: RunnableConfig) -> list[Send] | str:
+    """Pick the sequential day loop, the parallel fan-out or the whole-week call based on configuration."""
+    planning_mode = Configuration.from_runnable_config(config).planning_mode
+    if planning_mode == "parallel":
+        return fan_out_days(state, config)
+    if planning_mode == "week":
+        return "plan_week"
+    return "generate_meal"
+
+
+@instrumented
+def plan_day(task: DayTask, config: RunnableConfig) -> dict:
+    """Plan one day in a parallel branch."""
+    day = task["day"]
+    day_input = task.get("meal_input", {}).get(day, {})
+    with meal_stream(day, task.get("started_at"), config) as stream:
+        update = plan_single_day(
+            day,
+            day_input,
+            task.get("planned_meals", []),
+            task.get("fresh_inventory", {}),
+            config,
+            task.get("planned_recipe"),
+            task.get("search_deadline"),
+        )
+    return {**update, **stream.visible_update(update)}
+
+
+@instrumented
+async def aplan_day(task: DayTask, config: RunnableConfig) -> dict:
+    """Async version of plan_day."""
+    day = task["day"]
+    day_input = task.get("meal_input", {}).get(day, {})
+    with meal_stream(day, task.get("started_at"), config) as stream:
+        update = await aplan_single_day(
+            day,
+            day_input,
+            task.get("planned_meals", []),
+            task.get("fresh_inventory", {}),
+            config,
+            task.get("planned_recipe"),
+            task.get("search_deadline"),
+        )
+    return {**update, **stream.visible_update(update)}
+
+
+@instrumented
+def collect_days(state: MealPlannerState, config: RunnableConfig) -> dict:
+    """Advance past the wave of days that just finished."""
+    current_index = state.get("current_day_index", 0)
+    return {"current_day_index": current_index + len(_wave(state, config))}
+
+
+def next_duplicate_day(days: list[str], meal_output: dict[str, MealInfo], retried: set[str]) -> str | None:
+    """First day whose meal is a near-duplicate of an earlier day's and has not been re-planned yet."""
+    seen = MealIndex()
+    for day in days:
+        if day not in meal_output:
+            continue
+        if day not in retried and seen.duplicate_of(meal_output[day]) is not None:
+            return day
+        seen.add(meal_output[day])
+    return None
+
+
+def _replan_args(day: str, state: MealPlannerState, meal_output: dict, day_results: dict) -> tuple:
+    """plan_single_day arguments that exclude every other day's meal and inventory."""
+    planned_meals = [info["name"] for d, info in meal_output.items() if d != day]
+    fresh_inventory = merge_day_inventory({d: r for d, r in day_results.items() if d != day})
+    return day, state.get("meal_input", {}).get(day, {}), planned_meals, fresh_inventory
+
+
+def week_days(state: MealPlannerState, day_results: dict) -> list[str]:
+    """Days kept from a previous plan, then the days planned in this run.
+
+    Kept days come first so a duplicate between the two is re-planned on
+    the new day.
+    """
+    days_to_process = state.get("days_to_process", [])
+    kept = [day for day in DAYS_OF_WEEK if day in day_results and day not in days_to_process]
+    return kept + days_to_process
+
+
+def _reconciled(state: MealPlannerState, meal_output: dict, day_results: dict) -> dict:
+    # Days kept from a previous plan are already in the state's totals, so
+    # only this run's days are added
+    shopping_totals = merge_day_shopping(day_results, state.get("days_to_process", []))
+    return {
+        "meal_output": meal_output,
+        "day_results": day_results,
+        "shopping_totals": shopping_totals,
+        "shopping_list": format_shopping_list(add_shopping(state.get("shopping_totals", {}), shopping_totals)),
+        "fresh_inventory": merge_day_inventory(day_results),
+    }
+
+
+@instrumented
+def reconcile(state: MealPlannerState, config: RunnableConfig) -> dict:
+    """Re-plan duplicate meals, then merge per-day shopping lists and inventory."""
+    meal_output = dict(state.get("meal_output", {}))
+    day_results = dict(state.get("day_results", {}))
+    days = week_days(state, day_results)
+
+    # Parallel branches cannot see each other, so keep the earliest day of any
+    # duplicate and regenerate the later ones once with the full exclusion list
+    retried: set[str] = set()
+    while (day := next_duplicate_day(days, meal_output, retried)) is not None:
+        retried.add(day)
+        record_retry(day, "duplicate_replan")
+        deadline = search_deadline(state.get("started_at"), config, 1)
+        update = plan_single_day(*_replan_args(day, state, meal_output, day_results), config, deadline=deadline)
+        meal_output.update(update["meal_output"])
+        day_results.update(update["day_results"])
+
+    return _reconciled(state, meal_output, day_results)
+
+
+@instrumented
+async def areconcile(state: MealPlannerState, config: RunnableConfig) -> dict:
+    """Async version of reconcile."""
+    meal_output = dict(state.get("meal_output", {}))
+    day_results = dict(state.get("day_results", {}))
+    days = week_days(state, day_results)
+
+    retried: set[str] = set()
+    while (day := next_duplicate_day(days, meal_output, retried)) is not None:
+        retried.add(day)
+        record_retry(day, "duplicate_replan")
+        deadline = search_deadline(state.get("started_at"), config, 1)
+        update = await aplan_single_day(
+            *_replan_args(day, state, meal_output, day_results), config, deadline=deadline
+        )
+        meal_output.update(update["meal_output"])
+        day_results.update(update["day_results"])
+
+    return _reconciled(state, meal_output, day_results)
+
+
+# Deferred image enrichment: meals stream out first, images follow per day
+
+
+def fan_out_images(state: MealPlannerState, config: RunnableConfig) -> list[Send] | str:
+    """Send every planned meal still missing an image to its own enrich_image branch."""
+    if Configuration.from_runnable_config(config).image_enrichment != "deferred":
+        return "format_output"
+
+    meal_output = state.get("meal_output", {})
+    sends = [
+        Send("enrich_image", {"day": day, "meal": meal_output[day]})
+        for day in state.get("days_to_process", [])
+        if day in meal_output and not meal_output[day].get("image_url")
+    ]
+    return sends or "format_output"
+
+
+def route_after_day(state: MealPlannerState, config: RunnableConfig) -> list[Send] | str:
+    """Continue the sequential loop, or move on to image enrichment after the last day."""
+    if should_continue(state) == "continue":
+        return "generate_meal"
+    return fan_out_images(state, config)
+
+
+@instrumented
+def enrich_image(task: ImageTask, config: RunnableConfig) -> dict:
+    """Look up an image for one planned meal and re-emit the meal with it.
+
+    The meal keeps no image when the lookup takes longer than
+    `image_enrichment_timeout`. The lookup has its own budget rather than
+    what is left of `run_deadline`, so a slow week still gets its images.
+    """
+    meal = task["meal"]
+    timeout = Configuration.from_runnable_config(config).image_enrichment_timeout
+    if not timeout:
+        image_url = search_recipe_image(meal["name"])
+    else:
+        future = _search_pool.submit(contextvars.copy_context().run, search_recipe_image, meal["name"])
+        try:
+            image_url = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            image_url = None
+        future.cancel()
+    if not image_url:
+        return {}
+    return {"meal_output": {task["day"]: {**meal, "image_url": image_url}}}
+
+
+@instrumented
+async def aenrich_image(task: ImageTask, config: RunnableConfig) -> dict:
+    """Async version of enrich_image."""
+    meal = task["meal"]
+    timeout = Configuration.from_runnable_config(config).image_enrichment_timeout or None
+    try:
+        image_url = await asyncio.wait_for(asearch_recipe_image(meal["name"]), timeout)
+    except asyncio.TimeoutError:
+        image_url = None
+    if not image_url:
+        return {}
+    return {"meal_output": {task["day"]: {**meal, "image_url": image_url}}}
+
+
+@instrumented
 def format_output(state: MealPlannerState) -> dict:
-    """Format the final output - shopping list is already formatted with units."""
-    # Shopping list is already formatted as "quantity unit" strings
-    # Just pass through as-is
-    return {}
+    """Format the final shopping list from the week's numeric totals."""
+    if state.get("first_visible_s") is not None:
+        FIRST_VISIBLE.observe((), state["first_visible_s"])
+    # Quantities are rounded up to purchase packages only here, after every
+    # day has been summed
+    return {"shopping_list": format_shopping_list(state.get("shopping_totals", {}))}
 
 
 # Build the graph
-builder = StateGraph(MealPlannerState)
+builder = StateGraph(MealPlannerState, config_schema=Configuration)
 
-# Add nodes
+# Add nodes. Nodes that wait on the network have native async versions, used
+# when the graph runs with ainvoke/astream (as under the LangGraph server).
 builder.add_node("initialize", initialize)
-builder.add_node("generate_meal", generate_meal)
-builder.add_node("tools", ToolNode(tools))
-builder.add_node("process_tool_response", process_tool_response)
-builder.add_node("process_recipe", process_recipe)
+builder.add_node("optimize_menu", optimize_menu)
+builder.add_node("generate_meal", RunnableLambda(generate_meal, afunc=agenerate_meal))
+builder.add_node("tools", RunnableLambda(run_tools, afunc=arun_tools))
+builder.add_node("process_tool_response", RunnableLambda(process_tool_response, afunc=aprocess_tool_response))
+builder.add_node("process_recipe", RunnableLambda(process_recipe, afunc=aprocess_recipe))
 builder.add_node("advance_day", advance_day)
+builder.add_node("plan_week", RunnableLambda(plan_week, afunc=aplan_week))
+builder.add_node("plan_day", RunnableLambda(plan_day, afunc=aplan_day))
+builder.add_node("collect_days", collect_days)
+builder.add_node("reconcile", RunnableLambda(reconcile, afunc=areconcile))
+builder.add_node("enrich_image", RunnableLambda(enrich_image, afunc=aenrich_image))
 builder.add_node("format_output", format_output)
 
 # Add edges
 builder.add_edge(START, "initialize")
-builder.add_edge("initialize", "generate_meal")
+builder.add_edge("initialize", "optimize_menu")
+
+# Sequential mode walks the days one by one; parallel mode fans out per day;
+# week mode asks for the whole week first
+builder.add_conditional_edges(
+    "optimize_menu",
+    route_planning_mode,
+    ["generate_meal", "plan_week", "plan_day", "reconcile"],
+)
+
+# The week's dinners become planned recipes, which the sequential loop turns
+# into meals without further calls; days the week plan got wrong are
+# generated there one by one
+builder.add_edge("plan_week", "generate_meal")
 
 # After generate_meal, check if tools need to be called
 builder.add_conditional_edges(
@@ -368,19 +1632,29 @@ builder.add_conditional_edges(
     }
 )
 
-# After processing recipe, advance day
-builder.add_edge("process_recipe", "advance_day")
-
-# After advancing day, check if we should continue or end
+# After processing recipe, advance day, or plan it again when its recipe was rejected
 builder.add_conditional_edges(
-    "advance_day",
-    should_continue,
+    "process_recipe",
+    route_after_recipe,
     {
-        "continue": "generate_meal",
-        "end": "format_output",
+        "regenerate": "generate_meal",
+        "advance": "advance_day",
     }
 )
 
+# After advancing day, continue with the next day or resolve images for the week
+builder.add_conditional_edges(
+    "advance_day",
+    route_after_day,
+    ["generate_meal", "enrich_image", "format_output"],
+)
+
+# Parallel branches join in collect_days, which starts the next wave or reconciles
+builder.add_edge("plan_day", "collect_days")
+builder.add_conditional_edges("collect_days", fan_out_days, ["plan_day", "reconcile"])
+builder.add_conditional_edges("reconcile", fan_out_images, ["enrich_image", "format_output"])
+builder.add_edge("enrich_image", "format_output")
+
 builder.add_edge("format_output", END)
 
 # Compile the graph
@@ -0,0 +1,99 @@
+"""Batch planning of many households' weeks in one process.
+
+Each household's `meal_input` is planned by its own run of `graph`, with the
+runs sharing a RecipeFlights table: when several households ask for a day
+under the same constraints (time limit, servings and inventory signature),
+one of them generates the recipe and the rest reuse it, so identical
+requests cost one set of model and Tavily calls instead of one per household.
+Each household still gets distinct recipes across its own week, and its
+provider calls are scheduled below interactive runs (meal_agent.scheduler).
+
+    from meal_agent.batch import plan_batch
+
+    report = plan_batch({"household-1": meal_input, "household-2": other_input})
+    report["plans_per_minute"]
+"""
+
+import asyncio
+import time
+
+from langchain_core.runnables import RunnableConfig
+
+from meal_agent.agent import get_configured_recipe_cache, graph
+from meal_agent.cache import RecipeFlights, household_scope
+from meal_agent.metrics import merge_metrics
+from meal_agent.scheduler import priority_scope
+
+# Households planned at the same time by default
+DEFAULT_CONCURRENCY = 32
+
+
+async def _plan_household(
+    household: str,
+    meal_input: dict,
+    flights: RecipeFlights,
+    config: RunnableConfig | None,
+    semaphore: asyncio.Semaphore,
+) -> dict:
+    async with semaphore:
+        # Interactive runs in the same process are served first
+        with household_scope(flights, household), priority_scope("batch"):
+            try:
+                result = await graph.ainvoke({"meal_input": meal_input}, config)
+            except Exception as e:
+                return {"error": f"{type(e).__name__}: {e}"}
+            finally:
+                # Waiters on a failed or abandoned generation go on to generate their own
+                flights.release_household(household)
+    return {
+        "meal_output": result.get("meal_output", {}),
+        "shopping_list": result.get("shopping_list", {}),
+        "metrics": result.get("metrics", {}),
+    }
+
+
+async def aplan_batch(
+    households: dict[str, dict],
+    config: RunnableConfig | None = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> dict:
+    """Plan every household's meal_input, sharing identical recipe generations.
+
+    Returns the per-household results (meal_output, shopping_list and metrics,
+    or an error message), the merged metrics, and the batch's throughput:
+    plans per minute, and how many recipes were generated versus reused from
+    another household's generation.
+    """
+    flights = RecipeFlights(get_configured_recipe_cache(config))
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        _plan_household(household, meal_input, flights, config, semaphore)
+        for household, meal_input in households.items()
+    ))
+    wall_time = time.perf_counter() - start
+
+    plans = dict(zip(households, results))
+    metrics: dict = {}
+    for result in results:
+        metrics = merge_metrics(metrics, result.get("metrics"))
+    planned = sum(1 for result in results if "error" not in result)
+    return {
+        "households": plans,
+        "plans": planned,
+        "failed": len(results) - planned,
+        "wall_time_s": round(wall_time, 3),
+        "plans_per_minute": round(planned / wall_time * 60, 1) if wall_time > 0 else 0.0,
+        "generated_recipes": flights.generated,
+        "coalesced_recipes": flights.coalesced,
+        "metrics": metrics,
+    }
+
+
+def plan_batch(
+    households: dict[str, dict],
+    config: RunnableConfig | None = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> dict:
+    """Sync version of aplan_batch; must not be called from a running event loop."""
+    return asyncio.run(aplan_batch(households, config, concurrency))
@@ -0,0 +1,485 @@
+"""Offline benchmark of the compiled meal planner graph.
+
+Drives `graph` with synthetic weeks against the fakes in meal_agent.fakes,
+so it needs no network and no API keys:
+
+    python -m meal_agent.bench --weeks 20 --mode parallel --latency 0.2
+
+Reports per-node latency, LLM calls and tokens, end-to-end p50/p95 and the
+time until each run's first meal was visible (--stream-partial-meals shows
+partial meals while they are written). Runs are streamed as a client would
+stream them, and the report includes the size of the state at each step as
+a checkpoint would store it (meal_agent.checkpoints) and the JSON bytes of
+the updates and custom events streamed per run.
+With --max-p95 the command exits non-zero when the end-to-end p95 exceeds
+the budget, which makes it usable as a CI regression check.
+
+--cold-start N instead imports meal_agent.agent in N fresh interpreters
+without API keys, as a LangGraph server worker starts, and fails when the
+median import takes longer than COLD_START_BUDGET_S (or --max-import-seconds)
+or loads a provider SDK.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from meal_agent.agent import graph
+from meal_agent.batch import aplan_batch
+from meal_agent.checkpoints import checkpoint_bytes
+from meal_agent.constants import DAYS_OF_WEEK
+from meal_agent.fakes import use_fake_providers
+from meal_agent.scheduler import scheduler_stats
+from meal_agent.tools import get_image_caches
+
+TIME_LIMITS = [15, 20, 30, 45, 60]
+
+# Seconds a cold import of meal_agent.agent may take (median of fresh
+# interpreters); it was about 4s while the providers were built at import
+COLD_START_BUDGET_S = 2.0
+
+# Modules a cold import must not load: the providers are created on first use
+PROVIDER_SDKS = ("langchain_openai", "langchain_anthropic", "tavily", "langchain_community.tools.tavily_search")
+
+_COLD_IMPORT = f"""
+import json, sys, time
+start = time.perf_counter()
+import meal_agent.agent
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "sdks": [m for m in {PROVIDER_SDKS!r} if m in sys.modules]}}))
+"""
+
+
+def synthetic_week(rng: random.Random) -> dict[str, dict]:
+    """Random meal_input with at least one dinner."""
+    week = {}
+    for day in DAYS_OF_WEEK:
+        week[day] = {
+            "dinner": rng.random() < 0.75,
+            "dinner_leftovers": rng.random() < 0.3,
+            "dinner_time_limit": rng.choice(TIME_LIMITS),
+        }
+    if not any(day_input["dinner"] for day_input in week.values()):
+        week[rng.choice(DAYS_OF_WEEK)]["dinner"] = True
+    return week
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(pct / 100 * len(ordered))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+class NodeStats(BaseCallbackHandler):
+    """Callback handler attributing wall time, LLM calls and tokens to graph nodes.
+
+    A node run is the outermost run tagged with its own `langgraph_node`;
+    everything started beneath it (models, tools, nested runnables) is
+    charged to that node.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._owner: dict[UUID, UUID] = {}  # run id -> node run id
+        self._node_runs: dict[UUID, tuple[str, float]] = {}  # node run id -> (node, start)
+        self.durations: dict[str, list[float]] = {}
+        self.llm_calls: dict[str, int] = {}
+        self.input_tokens: dict[str, int] = {}
+        self.output_tokens: dict[str, int] = {}
+        self.first_visible: float | None = None
+        self.state_bytes: list[int] = []  # checkpoint size of the state after each step
+        self.stream_bytes = 0
+
+    def _register(self, run_id: UUID, parent_run_id: UUID | None) -> str | None:
+        """Charge `run_id` to the node its parent belongs to, returning that node."""
+        node_run = self._owner.get(parent_run_id) if parent_run_id else None
+        if node_run is None:
+            return None
+        self._owner[run_id] = node_run
+        return self._node_runs[node_run][0]
+
+    def on_chain_start(
+        self,
+        serialized: dict[str, Any] | None,
+        inputs: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: UUID | None = None,
+        metadata: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        with self._lock:
+            if self._register(run_id, parent_run_id) is not None:
+                return
+            node = (metadata or {}).get("langgraph_node")
+            if node and node == kwargs.get("name"):
+                self._owner[run_id] = run_id
+                self._node_runs[run_id] = (node, time.perf_counter())
+
+    def _finish(self, run_id: UUID) -> None:
+        with self._lock:
+            self._owner.pop(run_id, None)
+            started = self._node_runs.pop(run_id, None)
+            if started is not None:
+                node, start = started
+                self.durations.setdefault(node, []).append(time.perf_counter() - start)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id)
+
+    def on_tool_start(
+        self, serialized: dict[str, Any], input_str: str, *, run_id: UUID, parent_run_id: UUID | None = None, **kwargs: Any
+    ) -> None:
+        with self._lock:
+            self._register(run_id, parent_run_id)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id)
+
+    def on_chat_model_start(
+        self, serialized: dict[str, Any], messages: list, *, run_id: UUID, parent_run_id: UUID | None = None, **kwargs: Any
+    ) -> None:
+        with self._lock:
+            node = self._register(run_id, parent_run_id)
+            if node is not None:
+                self.llm_calls[node] = self.llm_calls.get(node, 0) + 1
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            node_run = self._owner.pop(run_id, None)
+            if node_run is None:
+                return
+            node = self._node_runs[node_run][0]
+            for generations in response.generations:
+                for generation in generations:
+                    usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    self.input_tokens[node] = self.input_tokens.get(node, 0) + usage.get("input_tokens", 0)
+                    self.output_tokens[node] = self.output_tokens.get(node, 0) + usage.get("output_tokens", 0)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id)
+
+
+def _run_config(args: argparse.Namespace, stats: NodeStats) -> dict:
+    return {
+        "configurable": {
+            "planning_mode": args.mode,
+            "generation_mode": args.generation_mode,
+            "image_enrichment": args.image_enrichment,
+            "stream_partial_meals": args.stream_partial_meals,
+            "run_deadline": args.run_deadline,
+            # Keep runs independent of any recipe cache configured in the environment
+            "recipe_cache_path": "",
+            "recipe_corpus_path": args.corpus,
+        },
+        "callbacks": [stats],
+    }
+
+
+def _clear_image_caches(args: argparse.Namespace) -> None:
+    if not args.warm_caches:
+        for cache in get_image_caches():
+            cache.clear()
+
+
+# What a client streams, plus the state after each step for its checkpoint size
+STREAM_MODES = ["updates", "custom", "values"]
+
+
+def _json_default(value: Any) -> Any:
+    dump = getattr(value, "model_dump", None)
+    return dump() if dump is not None else str(value)
+
+
+def _observe(stats: NodeStats, mode: str, chunk: Any) -> None:
+    if mode == "values":
+        stats.state_bytes.append(checkpoint_bytes(chunk))
+        stats.first_visible = chunk.get("first_visible_s")
+    else:
+        stats.stream_bytes += len(json.dumps(chunk, default=_json_default))
+
+
+def _run_week_sync(week: dict, args: argparse.Namespace) -> tuple[float, NodeStats]:
+    stats = NodeStats()
+    start = time.perf_counter()
+    for mode, chunk in graph.stream({"meal_input": week}, _run_config(args, stats), stream_mode=STREAM_MODES):
+        _observe(stats, mode, chunk)
+    return time.perf_counter() - start, stats
+
+
+async def _run_week_async(week: dict, args: argparse.Namespace) -> tuple[float, NodeStats]:
+    stats = NodeStats()
+    start = time.perf_counter()
+    async for mode, chunk in graph.astream({"meal_input": week}, _run_config(args, stats), stream_mode=STREAM_MODES):
+        _observe(stats, mode, chunk)
+    return time.perf_counter() - start, stats
+
+
+def _run_all_sync(weeks: list[dict], args: argparse.Namespace) -> list[tuple[float, NodeStats]]:
+    if args.concurrency <= 1:
+        results = []
+        for week in weeks:
+            _clear_image_caches(args)
+            results.append(_run_week_sync(week, args))
+        return results
+    _clear_image_caches(args)
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        return list(pool.map(lambda week: _run_week_sync(week, args), weeks))
+
+
+async def _run_all_async(weeks: list[dict], args: argparse.Namespace) -> list[tuple[float, NodeStats]]:
+    if args.concurrency <= 1:
+        results = []
+        for week in weeks:
+            _clear_image_caches(args)
+            results.append(await _run_week_async(week, args))
+        return results
+    _clear_image_caches(args)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def run(week: dict) -> tuple[float, NodeStats]:
+        async with semaphore:
+            return await _run_week_async(week, args)
+
+    return await asyncio.gather(*(run(week) for week in weeks))
+
+
+async def _run_batch(weeks: list[dict], args: argparse.Namespace) -> tuple[list[tuple[float, NodeStats]], dict]:
+    """Plan all weeks as one batch of households; per-week latency is not measured."""
+    _clear_image_caches(args)
+    stats = NodeStats()
+    report = await aplan_batch(
+        {f"household-{i}": week for i, week in enumerate(weeks)}, _run_config(args, stats), args.concurrency
+    )
+    return [(report["wall_time_s"], stats)], report
+
+
+def summarize(results: list[tuple[float, NodeStats]], wall_time: float) -> dict:
+    """Aggregate per-run stats into the benchmark report."""
+    durations: dict[str, list[float]] = {}
+    llm_calls: dict[str, int] = {}
+    input_tokens: dict[str, int] = {}
+    output_tokens: dict[str, int] = {}
+    for _, stats in results:
+        for node, values in stats.durations.items():
+            durations.setdefault(node, []).extend(values)
+        for totals, counts in (
+            (llm_calls, stats.llm_calls),
+            (input_tokens, stats.input_tokens),
+            (output_tokens, stats.output_tokens),
+        ):
+            for node, count in counts.items():
+                totals[node] = totals.get(node, 0) + count
+
+    runs = len(results)
+    nodes = {
+        node: {
+            "calls": len(values),
+            "mean_ms": round(statistics.fmean(values) * 1000, 2),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "llm_calls": llm_calls.get(node, 0),
+            "input_tokens": input_tokens.get(node, 0),
+            "output_tokens": output_tokens.get(node, 0),
+        }
+        for node, values in sorted(durations.items())
+    }
+    end_to_end = [elapsed for elapsed, _ in results]
+    first_visible = [stats.first_visible for _, stats in results if stats.first_visible is not None]
+    state_bytes = [size for _, stats in results for size in stats.state_bytes]
+    return {
+        "runs": runs,
+        "wall_time_s": round(wall_time, 3),
+        "e2e_p50_s": round(percentile(end_to_end, 50), 3),
+        "e2e_p95_s": round(percentile(end_to_end, 95), 3),
+        "first_visible_p50_s": round(percentile(first_visible, 50), 3) if first_visible else None,
+        "first_visible_p95_s": round(percentile(first_visible, 95), 3) if first_visible else None,
+        "llm_calls_per_run": round(sum(llm_calls.values()) / max(runs, 1), 2),
+        "input_tokens_per_run": round(sum(input_tokens.values()) / max(runs, 1)),
+        "output_tokens_per_run": round(sum(output_tokens.values()) / max(runs, 1)),
+        "state_bytes_p50": round(percentile(state_bytes, 50)) if state_bytes else None,
+        "state_bytes_max": max(state_bytes) if state_bytes else None,
+        "checkpoint_bytes_per_run": round(sum(state_bytes) / max(runs, 1)),
+        "stream_bytes_per_run": round(sum(stats.stream_bytes for _, stats in results) / max(runs, 1)),
+        "nodes": nodes,
+    }
+
+
+def run_benchmark(args: argparse.Namespace) -> dict:
+    """Plan `args.weeks` synthetic weeks with fake providers and return the report."""
+    rng = random.Random(args.seed)
+    weeks = [synthetic_week(rng) for _ in range(args.weeks)]
+    with use_fake_providers(latency=args.latency, search_latency=args.search_latency, quota=args.quota):
+        start = time.perf_counter()
+        batch = None
+        if args.batch:
+            results, batch = asyncio.run(_run_batch(weeks, args))
+        elif args.sync:
+            results = _run_all_sync(weeks, args)
+        else:
+            results = asyncio.run(_run_all_async(weeks, args))
+        wall_time = time.perf_counter() - start
+    report = summarize(results, wall_time)
+    report["scheduler"] = scheduler_stats()
+    if batch is not None:
+        # One batch of all weeks: count weeks as runs and report throughput
+        report["runs"] = len(weeks)
+        for key in ("llm_calls_per_run", "input_tokens_per_run", "output_tokens_per_run"):
+            report[key] = round(report[key] / max(len(weeks), 1), 2)
+        report["batch"] = {
+            key: batch[key] for key in ("plans", "failed", "plans_per_minute", "generated_recipes", "coalesced_recipes")
+        }
+    return report
+
+
+def measure_cold_start(runs: int) -> dict:
+    """Import meal_agent.agent in `runs` fresh interpreters without API keys."""
+    keys = ("OPENAI_API_KEY", "ANTHROPIC_API_KEY", "TAVILY_API_KEY")
+    env = {key: value for key, value in os.environ.items() if key not in keys}
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+    seconds = []
+    sdks: set[str] = set()
+    for _ in range(max(1, runs)):
+        output = subprocess.run(
+            [sys.executable, "-c", _COLD_IMPORT], env=env, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        seconds.append(result["seconds"])
+        sdks.update(result["sdks"])
+    return {
+        "runs": len(seconds),
+        "import_p50_s": round(statistics.median(seconds), 3),
+        "import_min_s": round(min(seconds), 3),
+        "import_max_s": round(max(seconds), 3),
+        "provider_sdks_loaded": sorted(sdks),
+    }
+
+
+def format_report(report: dict) -> str:
+    lines = [
+        f"{report['runs']} runs in {report['wall_time_s']:.2f}s  "
+        f"e2e p50 {report['e2e_p50_s']:.3f}s  p95 {report['e2e_p95_s']:.3f}s",
+        f"per run: {report['llm_calls_per_run']} LLM calls, "
+        f"{report['input_tokens_per_run']} input / {report['output_tokens_per_run']} output tokens",
+    ]
+    if report["first_visible_p50_s"] is not None:
+        lines.append(
+            f"first meal visible p50 {report['first_visible_p50_s']:.3f}s  p95 {report['first_visible_p95_s']:.3f}s"
+        )
+    if report["state_bytes_p50"] is not None:
+        lines.append(
+            f"state per checkpoint p50 {report['state_bytes_p50']} B  max {report['state_bytes_max']} B  "
+            f"({report['checkpoint_bytes_per_run']} B per run), {report['stream_bytes_per_run']} B streamed per run"
+        )
+    if "batch" in report:
+        batch = report["batch"]
+        lines.append(
+            f"batch: {batch['plans_per_minute']} plans/min, {batch['failed']} failed, "
+            f"{batch['generated_recipes']} recipes generated, {batch['coalesced_recipes']} shared between households"
+        )
+    limited = {provider: stats["rate_limited"] for provider, stats in report.get("scheduler", {}).items()}
+    if any(limited.values()):
+        lines.append(
+            "429s retried: " + ", ".join(f"{provider} {count}" for provider, count in limited.items() if count)
+        )
+    lines += [
+        "",
+        f"{'node':<24}{'calls':>7}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'llm':>7}{'in tok':>9}{'out tok':>9}",
+    ]
+    for node, row in report["nodes"].items():
+        lines.append(
+            f"{node:<24}{row['calls']:>7}{row['mean_ms']:>10.1f}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+            f"{row['llm_calls']:>7}{row['input_tokens']:>9}{row['output_tokens']:>9}"
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the meal planner graph offline.")
+    parser.add_argument("--weeks", type=int, default=10, help="synthetic weeks to plan")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the synthetic weeks")
+    parser.add_argument("--mode", choices=["sequential", "parallel", "week"], default="sequential")
+    parser.add_argument("--generation-mode", choices=["two_pass", "single_pass"], default="two_pass")
+    parser.add_argument("--image-enrichment", choices=["deferred", "inline", "off"], default="deferred")
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated seconds per LLM call")
+    parser.add_argument("--search-latency", type=float, default=0.05, help="simulated seconds per Tavily call")
+    parser.add_argument("--quota", type=int, default=0, help="concurrent LLM calls before the fake returns 429")
+    parser.add_argument("--concurrency", type=int, default=1, help="weeks planned at the same time")
+    parser.add_argument("--batch", action="store_true", help="plan all weeks as one batch (meal_agent.batch)")
+    parser.add_argument(
+        "--stream-partial-meals", action="store_true", help="stream recipes field by field (meal_agent.streaming)"
+    )
+    parser.add_argument(
+        "--run-deadline", type=float, default=180.0, help="seconds each run may take (0 disables the deadline)"
+    )
+    parser.add_argument("--sync", action="store_true", help="use graph.invoke instead of graph.ainvoke")
+    parser.add_argument("--corpus", default="", help="local recipe corpus searched before the fake Tavily search")
+    parser.add_argument("--warm-caches", action="store_true", help="keep image caches between weeks")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--max-p95", type=float, help="fail when the end-to-end p95 exceeds this many seconds")
+    parser.add_argument("--cold-start", type=int, default=0, help="time N cold imports instead of planning weeks")
+    parser.add_argument(
+        "--max-import-seconds",
+        type=float,
+        default=COLD_START_BUDGET_S,
+        help="fail when the median cold import exceeds this many seconds",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    if args.cold_start:
+        report = measure_cold_start(args.cold_start)
+        print(json.dumps(report, indent=2) if args.json else (
+            f"{report['runs']} cold imports: p50 {report['import_p50_s']:.3f}s  "
+            f"min {report['import_min_s']:.3f}s  max {report['import_max_s']:.3f}s  "
+            f"(budget {args.max_import_seconds:.3f}s)"
+        ))
+        if report["provider_sdks_loaded"]:
+            print(f"cold import loaded {', '.join(report['provider_sdks_loaded'])}", file=sys.stderr)
+            return 1
+        if report["import_p50_s"] > args.max_import_seconds:
+            print(
+                f"cold import p50 {report['import_p50_s']:.3f}s exceeds budget {args.max_import_seconds:.3f}s",
+                file=sys.stderr,
+            )
+            return 1
+        return 0
+    report = run_benchmark(args)
+    report = run_benchmark(args)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    if args.max_p95 is not None and report["e2e_p95_s"] > args.max_p95:
+        print(f"e2e p95 {report['e2e_p95_s']:.3f}s exceeds budget {args.max_p95:.3f}s", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,408 @@
+"""Caches for parsed recipes and image lookups, in memory or backed by SQLite."""
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from contextvars import ContextVar
+from typing import Any
+
+
+def inventory_signature(fresh_inventory: dict[str, float]) -> str:
+    """Short stable digest of the fresh ingredients worth using up."""
+    names = sorted(name for name, qty in fresh_inventory.items() if qty > 0.1)
+    if not names:
+        return "-"
+    return hashlib.sha1(",".join(names).encode()).hexdigest()[:12]
+
+
+def make_recipe_key(
+    time_limit: int,
+    servings: int,
+    fresh_inventory: dict[str, float] | None = None,
+    equipment: Iterable[str] = (),
+) -> str:
+    """Normalize the constraints that determine which recipes are acceptable."""
+    equipment_part = ",".join(sorted({e.strip().lower() for e in equipment})) or "any"
+    return f"t{int(time_limit)}|s{int(servings)}|e{equipment_part}|i{inventory_signature(fresh_inventory or {})}"
+
+
+_KEY_SERVINGS = re.compile(r"\|s(\d+)\|")
+
+
+def key_servings(key: str) -> int:
+    """Servings a recipe stored under a make_recipe_key key was scaled for."""
+    match = _KEY_SERVINGS.search(key)
+    return int(match.group(1)) if match else 1
+
+
+def normalize_name(name: str) -> str:
+    """Case- and whitespace-insensitive recipe name used for duplicate checks."""
+    return " ".join(name.lower().split())
+
+
+class RecipeCache:
+    """SQLite store of finished recipes with TTL expiry and LRU eviction.
+
+    Recipes are stored as plain dicts (a ParsedRecipe dump) so the cache does
+    not depend on the agent's models. Safe to share between threads.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 7 * 24 * 3600, max_entries: int = 5000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS recipes (
+                    key TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    recipe TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (key, name)
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS recipes_last_used ON recipes (last_used)")
+
+    def get(self, key: str, exclude: Iterable[str] = ()) -> dict | None:
+        """Return a fresh cached recipe for `key` whose name is not in `exclude`.
+
+        Candidates rotate least-recently-used first so repeated plans vary.
+        """
+        excluded = {normalize_name(name) for name in exclude}
+        now = time.time()
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT name, recipe FROM recipes WHERE key = ? AND created_at >= ? ORDER BY last_used",
+                (key, now - self.ttl_seconds),
+            ).fetchall()
+            for name, recipe in rows:
+                if name in excluded:
+                    continue
+                self._conn.execute(
+                    "UPDATE recipes SET last_used = ? WHERE key = ? AND name = ?", (now, key, name)
+                )
+                return json.loads(recipe)
+        return None
+
+    def put(self, key: str, recipe: dict) -> None:
+        """Store a recipe under `key`, then drop expired and least-recently-used rows."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO recipes (key, name, recipe, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, normalize_name(recipe["name"]), json.dumps(recipe), now, now),
+            )
+            self._conn.execute("DELETE FROM recipes WHERE created_at < ?", (now - self.ttl_seconds,))
+            self._conn.execute(
+                """DELETE FROM recipes WHERE rowid IN (
+                    SELECT rowid FROM recipes ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,),
+            )
+
+    def recipes(self, limit: int = 1000) -> list[dict]:
+        """Distinct fresh recipes, most recently used first, with the `servings` they were scaled for."""
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, name, recipe FROM recipes WHERE created_at >= ? ORDER BY last_used DESC",
+                (now - self.ttl_seconds,),
+            ).fetchall()
+        recipes = []
+        seen: set[str] = set()
+        for key, name, recipe in rows:
+            if name in seen:
+                continue
+            seen.add(name)
+            recipes.append({**json.loads(recipe), "servings": key_servings(key)})
+            if len(recipes) >= limit:
+                break
+        return recipes
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM recipes").fetchone()[0]
+
+    def clear(self) -> None:
+        """Remove every cached recipe."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM recipes")
+
+
+_caches: dict[str, RecipeCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_recipe_cache(path: str, ttl_seconds: float, max_entries: int) -> RecipeCache | None:
+    """Get the process-wide cache for `path`, or None when caching is disabled."""
+    if not path:
+        return None
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = RecipeCache(path, ttl_seconds, max_entries)
+        else:
+            cache.ttl_seconds = ttl_seconds
+            cache.max_entries = max_entries
+        return cache
+
+
+class RecipeFlights:
+    """Single-flight table of the recipes generated while planning a batch of households.
+
+    Households planning a day under the same constraints (the same
+    make_recipe_key key) share one generation: the first claims the key and
+    generates, the others wait for its recipe instead of calling the model
+    and Tavily again. A household never receives a recipe it excludes or
+    already has, and never waits for its own generation, so its duplicate
+    rules still hold; when no shared recipe fits, it generates its own.
+
+    Implements the RecipeCache get/put interface over an optional backing
+    cache, so it can stand in for the run's recipe cache. Used from a single
+    event loop.
+    """
+
+    def __init__(self, backing: RecipeCache | None = None):
+        self.backing = backing
+        self._recipes: dict[str, list[dict]] = {}
+        # household -> normalized names of the recipes it generated or took
+        self._taken: dict[str, set[str]] = {}
+        # key -> [(owning household, future resolved when its generation ends)]
+        self._flights: dict[str, list[tuple[str, asyncio.Future]]] = {}
+        self.generated = 0
+        self.coalesced = 0
+
+    def _take(self, key: str, exclude: Iterable[str]) -> dict | None:
+        taken = self._taken.setdefault(current_household(), set())
+        excluded = {normalize_name(name) for name in exclude}
+        for recipe in self._recipes.get(key, []):
+            name = normalize_name(recipe["name"])
+            if name in taken or name in excluded:
+                continue
+            taken.add(name)
+            self.coalesced += 1
+            return recipe
+        return None
+
+    def get(self, key: str, exclude: Iterable[str] = ()) -> dict | None:
+        """A recipe shared for `key`, else one from the backing cache."""
+        recipe = self._take(key, exclude)
+        if recipe is None and self.backing is not None:
+            recipe = self.backing.get(key, exclude)
+        return recipe
+
+    def put(self, key: str, recipe: dict) -> None:
+        """Share a generated recipe and end the current household's generation for `key`."""
+        if self.backing is not None:
+            self.backing.put(key, recipe)
+        self._recipes.setdefault(key, []).append(recipe)
+        self._taken.setdefault(current_household(), set()).add(normalize_name(recipe["name"]))
+        self.release(key)
+
+    def recipes(self, limit: int = 1000) -> list[dict]:
+        """The backing cache's recipes, for the menu optimizer."""
+        return self.backing.recipes(limit) if self.backing is not None else []
+
+    async def acquire(self, key: str, exclude: Iterable[str] = ()) -> dict | None:
+        """A shared recipe for `key`, waiting for other households' generations in flight.
+
+        Returns None when the caller must generate the recipe itself; it then
+        owns a generation for `key` that put() or release() ends.
+        """
+        exclude = list(exclude)
+        household = current_household()
+        while True:
+            recipe = self._take(key, exclude)
+            if recipe is not None:
+                return recipe
+            others = [future for owner, future in self._flights.get(key, []) if owner != household]
+            if not others:
+                break
+            await asyncio.shield(others[0])
+        self._flights.setdefault(key, []).append((household, asyncio.get_running_loop().create_future()))
+        self.generated += 1
+        return None
+
+    def release(self, key: str) -> None:
+        """End the current household's generation for `key`, if it has one, waking its waiters."""
+        household = current_household()
+        flights = self._flights.get(key, [])
+        for i, (owner, future) in enumerate(flights):
+            if owner == household:
+                del flights[i]
+                if not future.done():
+                    future.set_result(None)
+                break
+        if not flights:
+            self._flights.pop(key, None)
+
+    def release_household(self, household: str) -> None:
+        """End every generation a household still owns, e.g. after its run failed."""
+        for key, flights in list(self._flights.items()):
+            for owner, future in [flight for flight in flights if flight[0] == household]:
+                flights.remove((owner, future))
+                if not future.done():
+                    future.set_result(None)
+            if not flights:
+                del self._flights[key]
+
+
+_recipe_flights: ContextVar[RecipeFlights | None] = ContextVar("meal_planner_recipe_flights", default=None)
+_household: ContextVar[str] = ContextVar("meal_planner_household", default="")
+
+
+def current_recipe_flights() -> RecipeFlights | None:
+    """The batch's recipe flights, when running inside a batch."""
+    return _recipe_flights.get()
+
+
+def current_household() -> str:
+    """Id of the household being planned, "" outside a batch."""
+    return _household.get()
+
+
+@contextlib.contextmanager
+def household_scope(flights: RecipeFlights, household: str) -> Iterator[None]:
+    """Plan as `household` of a batch sharing `flights` for the duration of the block."""
+    flights_token = _recipe_flights.set(flights)
+    household_token = _household.set(household)
+    try:
+        yield
+    finally:
+        _household.reset(household_token)
+        _recipe_flights.reset(flights_token)
+
+
+class TTLCache:
+    """In-memory LRU cache whose entries expire after `ttl_seconds`."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            created_at, value = entry
+            if time.time() - created_at > self.ttl_seconds:
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteTTLCache:
+    """Disk-backed key/value cache with the same interface as TTLCache.
+
+    Values must be JSON-serializable. Several namespaces can share one file.
+    """
+
+    def __init__(self, path: str, namespace: str, max_entries: int = 1024, ttl_seconds: float = 24 * 3600):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS kv (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )"""
+            )
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value FROM kv WHERE namespace = ? AND key = ? AND created_at >= ?",
+                (self.namespace, key, now - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                return default
+            self._conn.execute(
+                "UPDATE kv SET last_used = ? WHERE namespace = ? AND key = ?", (now, self.namespace, key)
+            )
+            return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO kv (namespace, key, value, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM kv WHERE namespace = ? AND created_at < ?", (self.namespace, now - self.ttl_seconds)
+            )
+            self._conn.execute(
+                """DELETE FROM kv WHERE rowid IN (
+                    SELECT rowid FROM kv WHERE namespace = ? ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.namespace, self.max_entries),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM kv WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM kv WHERE namespace = ?", (self.namespace,))
+
+
+_kv_caches: dict[tuple[str, str], TTLCache | SQLiteTTLCache] = {}
+
+
+def get_kv_cache(namespace: str, path: str, ttl_seconds: float, max_entries: int) -> TTLCache | SQLiteTTLCache:
+    """Get the process-wide cache for `namespace`, on disk when `path` is set."""
+    with _caches_lock:
+        cache = _kv_caches.get((namespace, path))
+        if cache is None:
+            if path:
+                cache = SQLiteTTLCache(path, namespace, max_entries, ttl_seconds)
+            else:
+                cache = TTLCache(max_entries, ttl_seconds)
+            _kv_caches[(namespace, path)] = cache
+        cache.ttl_seconds = ttl_seconds
+        cache.max_entries = max_entries
+        return cache
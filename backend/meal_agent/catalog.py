@@ -0,0 +1,169 @@
+"""Canonical ingredient catalog.
+
+Merges PANTRY_STAPLES, NON_PERISHABLES and STANDARD_PURCHASE_UNITS into one
+entry per ingredient and resolves the names the LLM emits ("Fresh Spinach",
+"red_bell_pepper", "extra virgin olive oil") to those entries.
+
+Names are matched on whole words. A name that is not in the catalog may
+drop leading INGREDIENT_MODIFIERS ("fresh", "boneless", "red") until it
+is: "red_bell_pepper" resolves to "bell_pepper" and never to the "pepper"
+staple. Other leading words name a different ingredient, so "sweet_potato"
+and "almond_milk" stay unknown rather than becoming potato and milk with
+their package sizes. Pantry staples are the exception: any name ending in
+one ("all_purpose_flour", "smoked_paprika", "garlic_salt") or joining them
+with "and" ("salt_and_pepper") is that staple, unless it is in NOT_STAPLES,
+so seasonings stay off the shopping list as they always have. The index is built once at import and a lookup is a
+handful of dict probes, proportional to the length of the name.
+"""
+
+import functools
+import re
+from dataclasses import dataclass
+
+from meal_agent.constants import (
+    EXACT_MATCH_ONLY,
+    INGREDIENT_ALIASES,
+    INGREDIENT_CATEGORIES,
+    INGREDIENT_MODIFIERS,
+    NON_PERISHABLES,
+    NOT_STAPLES,
+    PACKAGE_CONTENTS,
+    PANTRY_STAPLES,
+    STANDARD_PURCHASE_UNITS,
+)
+
+
+@dataclass(frozen=True)
+class Ingredient:
+    """A catalog ingredient and what the planner knows about it."""
+
+    name: str
+    # Assumed to be in the kitchen already; never on the shopping list
+    is_staple: bool = False
+    # True for tracked fresh items, False for non-perishables, None when unknown
+    is_fresh: bool | None = None
+    # Typical store package as (unit, quantity), e.g. ("lb", 1.0)
+    purchase_unit: tuple[str, float] | None = None
+    # Contents of one purchase unit as (unit, amount) when not a standard measure
+    package_contents: tuple[str, float] | None = None
+    # Shopping list category, e.g. "produce"
+    category: str = "pantry"
+
+
+_WORD_SPLIT = re.compile(r"[^a-z0-9]+")
+
+
+def ingredient_key(name: str) -> str:
+    """Lowercase, underscore-separated form used for every catalog lookup."""
+    return "_".join(word for word in _WORD_SPLIT.split(name.lower()) if word)
+
+
+def _plural_variants(key: str) -> set[str]:
+    """The key with its last word in singular and plural form."""
+    variants = {key, key + "s", key + "es"}
+    if key.endswith("es"):
+        variants.add(key[:-2])
+    if key.endswith("s"):
+        variants.add(key[:-1])
+    return variants
+
+
+def _build_catalog() -> dict[str, Ingredient]:
+    categories = {name: category for category, names in INGREDIENT_CATEGORIES.items() for name in names}
+    catalog: dict[str, Ingredient] = {}
+    for name in PANTRY_STAPLES:
+        key = ingredient_key(name)
+        catalog[key] = Ingredient(key, is_staple=True, is_fresh=False, category=categories.get(key, "pantry"))
+    for name in NON_PERISHABLES:
+        key = ingredient_key(name)
+        catalog.setdefault(key, Ingredient(key, is_fresh=False, category=categories.get(key, "pantry")))
+    for name, purchase_unit in STANDARD_PURCHASE_UNITS.items():
+        key = ingredient_key(name)
+        catalog[key] = Ingredient(
+            key,
+            is_staple=key in catalog and catalog[key].is_staple,
+            is_fresh=True,
+            purchase_unit=purchase_unit,
+            package_contents=PACKAGE_CONTENTS.get(name),
+            category=categories.get(key, "pantry"),
+        )
+    return catalog
+
+
+CATALOG: dict[str, Ingredient] = _build_catalog()
+
+
+def _build_index() -> tuple[dict[str, Ingredient], dict[str, Ingredient]]:
+    """(exact key -> entry, key that may follow modifiers in a longer name -> entry)."""
+    exact: dict[str, Ingredient] = {}
+    suffix: dict[str, Ingredient] = {}
+    for key, entry in CATALOG.items():
+        for variant in _plural_variants(key):
+            exact.setdefault(variant, entry)
+            if key not in EXACT_MATCH_ONLY:
+                suffix.setdefault(variant, entry)
+    for alias, name in INGREDIENT_ALIASES.items():
+        entry = CATALOG[ingredient_key(name)]
+        for variant in _plural_variants(ingredient_key(alias)):
+            exact[variant] = entry
+            suffix[variant] = entry
+    # Real catalog names win over plural variants of other names
+    exact.update(CATALOG)
+    return exact, suffix
+
+
+_EXACT, _SUFFIX = _build_index()
+
+
+@functools.lru_cache(maxsize=4096)
+def resolve_ingredient(name: str) -> Ingredient | None:
+    """Catalog entry for an ingredient name, or None when it is not in the catalog."""
+    key = ingredient_key(name)
+    entry = _EXACT.get(key)
+    if entry is not None:
+        return entry
+    # Drop leading modifiers one at a time, so the longest matching ending wins
+    words = key.split("_")
+    for start in range(1, len(words)):
+        if words[start - 1] not in INGREDIENT_MODIFIERS:
+            break
+        entry = _SUFFIX.get("_".join(words[start:]))
+        if entry is not None:
+            return entry
+    return _staple_of(key)
+
+
+def _staple_of(key: str) -> Ingredient | None:
+    """The pantry staple an otherwise unknown name is a kind of, if any."""
+    if key in NOT_STAPLES:
+        return None
+    parts = key.split("_and_")
+    if len(parts) > 1:
+        entries = [resolve_ingredient(part) for part in parts]
+        if all(entry is not None and entry.is_staple for entry in entries):
+            return entries[0]
+        return None
+    words = key.split("_")
+    for start in range(1, len(words)):
+        entry = _SUFFIX.get("_".join(words[start:]))
+        if entry is not None and entry.is_staple:
+            return entry
+    return None
+
+
+def canonical_name(name: str) -> str:
+    """Catalog name for an ingredient, or its normalized key when unknown."""
+    entry = resolve_ingredient(name)
+    return entry.name if entry is not None else ingredient_key(name)
+
+
+def ingredient_category(name: str) -> str:
+    """Shopping list category of an ingredient; "pantry" when it is not in the catalog."""
+    entry = resolve_ingredient(name)
+    return entry.category if entry is not None else "pantry"
+
+
+def is_pantry_staple(name: str) -> bool:
+    """Whether the ingredient is assumed to be on hand."""
+    entry = resolve_ingredient(name)
+    return entry is not None and entry.is_staple
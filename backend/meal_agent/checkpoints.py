@@ -0,0 +1,207 @@
+"""Durable, resumable planning runs backed by a local SQLite checkpointer.
+
+`get_checkpointed_graph(path)` compiles the planner graph with a checkpointer
+that writes every step to a SQLite file. Each planned day is persisted as
+soon as it finishes, so when a run fails or is cancelled part way through
+the week (a parse error, a Tavily or image timeout), invoking it again with
+the same `thread_id` picks up after the last finished step instead of
+planning the whole week again:
+
+    from meal_agent.checkpoints import get_checkpointed_graph, run_or_resume
+
+    graph = get_checkpointed_graph("checkpoints.sqlite")
+    result = run_or_resume(graph, {"meal_input": week}, "household-1-2025-w14")
+
+In parallel mode, days of a wave that finished before another day failed
+keep their results too; only the failed branches run again. The time a run
+spent stopped does not count against its `run_deadline`: a resumed run has
+the budget it had left when it stopped.
+
+Parse failures normally become a placeholder meal. Pass
+`degrade_failed_days=False` in the run's configurable to fail the run
+instead, so resuming retries the day.
+
+Checkpoints store meals and shopping state in their compact form
+(meal_agent.compact), and the size of every checkpoint and node write is
+recorded in the `meal_planner_checkpoint_bytes` histogram. Messages hold
+only the day being planned, so a checkpoint grows with the planned meals
+and not with the searches behind them.
+
+The LangGraph server checkpoints thread runs itself; this is for scripts
+and batch jobs that run the graph directly.
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from collections.abc import AsyncIterator, Sequence
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.graph.state import CompiledStateGraph
+from langgraph.types import StateSnapshot
+
+from meal_agent.agent import builder
+from meal_agent.compact import compact_channels, expand_channels
+from meal_agent.metrics import record_checkpoint
+
+
+def _is_checkpoint(obj: Any) -> bool:
+    return isinstance(obj, dict) and "id" in obj and isinstance(obj.get("channel_values"), dict)
+
+
+class CompactSerializer(JsonPlusSerializer):
+    """JsonPlusSerializer that stores checkpoints' channel values compactly and records their size."""
+
+    def __init__(self, record: bool = True):
+        super().__init__()
+        self.record = record
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        checkpoint = _is_checkpoint(obj)
+        if checkpoint:
+            obj = {**obj, "channel_values": compact_channels(obj["channel_values"])}
+        type_, data = super().dumps_typed(obj)
+        if self.record:
+            record_checkpoint("checkpoint" if checkpoint else "write", len(data))
+        return type_, data
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        obj = super().loads_typed(data)
+        if _is_checkpoint(obj):
+            obj["channel_values"] = expand_channels(obj["channel_values"])
+        return obj
+
+
+_sizer = CompactSerializer(record=False)
+
+
+def checkpoint_bytes(values: dict) -> int:
+    """Size of a checkpoint of the state `values`, as SqliteCheckpointer would write it."""
+    return len(_sizer.dumps_typed({"id": "", "channel_values": values})[1])
+
+
+class SqliteCheckpointer(SqliteSaver):
+    """SqliteSaver that can also be used from graph.ainvoke/astream.
+
+    Checkpoints are written with CompactSerializer unless another `serde`
+    is given. The async methods run the synchronous ones in a worker thread;
+    the connection is shared across threads and SqliteSaver serializes
+    access to it with its own lock.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, *, serde: SerializerProtocol | None = None):
+        super().__init__(conn, serde=serde or CompactSerializer())
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        checkpoints = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint in checkpoints:
+            yield checkpoint
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+_graphs: dict[str, CompiledStateGraph] = {}
+_graphs_lock = threading.Lock()
+
+
+def get_checkpointed_graph(path: str) -> CompiledStateGraph:
+    """The planner graph checkpointed to the SQLite file at `path`, shared per path."""
+    with _graphs_lock:
+        graph = _graphs.get(path)
+        if graph is None:
+            conn = sqlite3.connect(path, check_same_thread=False)
+            graph = builder.compile(checkpointer=SqliteCheckpointer(conn))
+            _graphs[path] = graph
+        return graph
+
+
+def _thread_config(thread_id: str, config: RunnableConfig | None) -> RunnableConfig:
+    config = dict(config or {})
+    config["configurable"] = {**(config.get("configurable") or {}), "thread_id": thread_id}
+    return config
+
+
+def _resume_config(snapshot: StateSnapshot, config: RunnableConfig) -> RunnableConfig:
+    """`config` for resuming the run at `snapshot`, with the time it spent stopped in `paused_seconds`.
+
+    The pause adds to those of earlier resumes, which each checkpoint keeps
+    in its metadata.
+    """
+    paused = float((snapshot.metadata or {}).get("paused_seconds") or 0.0)
+    if snapshot.created_at:
+        paused += max(0.0, time.time() - datetime.fromisoformat(snapshot.created_at).timestamp())
+    return {**config, "configurable": {**config["configurable"], "paused_seconds": paused}}
+
+
+def run_or_resume(
+    graph: CompiledStateGraph,
+    input: dict,
+    thread_id: str,
+    config: RunnableConfig | None = None,
+) -> dict:
+    """Run `input` on `thread_id`, or resume it when an earlier run stopped part way.
+
+    A thread whose last run finished is not planned again; its final state
+    is returned. Use a new thread id for a new plan.
+    """
+    config = _thread_config(thread_id, config)
+    snapshot = graph.get_state(config)
+    if snapshot.next:
+        return graph.invoke(None, _resume_config(snapshot, config))
+    if snapshot.values:
+        return snapshot.values
+    return graph.invoke(input, config)
+
+
+async def arun_or_resume(
+    graph: CompiledStateGraph,
+    input: dict,
+    thread_id: str,
+    config: RunnableConfig | None = None,
+) -> dict:
+    """Async version of run_or_resume."""
+    config = _thread_config(thread_id, config)
+    snapshot = await graph.aget_state(config)
+    if snapshot.next:
+        return await graph.ainvoke(None, _resume_config(snapshot, config))
+    if snapshot.values:
+        return snapshot.values
+    return await graph.ainvoke(input, config)
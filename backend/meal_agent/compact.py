@@ -0,0 +1,130 @@
+"""Compact form of planned meals and shopping state, for checkpoints.
+
+A checkpoint holds the whole state after every step, and most of it is
+meals and shopping quantities spelled out as dicts whose keys repeat for
+every ingredient. Checkpoints store them as positional lists instead:
+
+    MealInfo        ["Beef Tacos", [["ground_beef", "1 lb", "protein"], ...],
+                     ["Brown the beef.", ...], 20, ["stovetop"], "https://..."]
+    IngredientInfo  ["1 lb", "protein"]
+    ShoppingItem    ["protein", {"g": 453.6}]
+    DayResult       [{"ground_beef": ["protein", {"g": 453.6}]}, {"onion": 0.5}]
+
+A meal's trailing missing fields are left off. `expand_channels` returns
+values that are already in the full form (e.g. from checkpoints written
+before they were compacted) unchanged.
+"""
+
+from typing import Any
+
+from meal_agent.state import DayResult, IngredientInfo, MealInfo, ShoppingItem
+
+# MealInfo fields in the order of the compact list
+MEAL_FIELDS = ("name", "ingredients", "instructions", "time_estimate", "equipment", "image_url")
+
+
+def compact_meal(meal: MealInfo) -> list:
+    values = []
+    for field in MEAL_FIELDS:
+        value = meal.get(field)
+        if field == "ingredients" and value is not None:
+            value = [[name, info["quantity"], info["category"]] for name, info in value.items()]
+        values.append(value)
+    while values and values[-1] is None:
+        values.pop()
+    return values
+
+
+def expand_meal(data: list | MealInfo) -> MealInfo:
+    if not isinstance(data, list):
+        return data
+    meal: MealInfo = {}
+    for field, value in zip(MEAL_FIELDS, data):
+        if value is None:
+            continue
+        if field == "ingredients":
+            value = {name: {"quantity": quantity, "category": category} for name, quantity, category in value}
+        meal[field] = value
+    return meal
+
+
+def compact_shopping_list(items: dict[str, IngredientInfo]) -> dict[str, list]:
+    return {name: [info["quantity"], info["category"]] for name, info in items.items()}
+
+
+def expand_shopping_list(items: dict[str, list | IngredientInfo]) -> dict[str, IngredientInfo]:
+    return {
+        name: {"quantity": info[0], "category": info[1]} if isinstance(info, list) else info
+        for name, info in items.items()
+    }
+
+
+def compact_shopping_totals(totals: dict[str, ShoppingItem]) -> dict[str, list]:
+    return {name: [item["category"], item["amounts"]] for name, item in totals.items()}
+
+
+def expand_shopping_totals(totals: dict[str, list | ShoppingItem]) -> dict[str, ShoppingItem]:
+    return {
+        name: {"amounts": item[1], "category": item[0]} if isinstance(item, list) else item
+        for name, item in totals.items()
+    }
+
+
+def compact_day_result(result: DayResult) -> list:
+    return [compact_shopping_totals(result.get("shopping_totals", {})), result.get("fresh_inventory", {})]
+
+
+def expand_day_result(data: list | DayResult) -> DayResult:
+    if not isinstance(data, list):
+        return data
+    return {"shopping_totals": expand_shopping_totals(data[0]), "fresh_inventory": data[1]}
+
+
+def _by_day(convert):
+    return lambda values: {day: convert(value) for day, value in values.items()}
+
+
+def compact_previous_plan(plan: dict) -> dict:
+    compacted = dict(plan)
+    if "meal_output" in plan:
+        compacted["meal_output"] = _by_day(compact_meal)(plan["meal_output"])
+    if "day_results" in plan:
+        compacted["day_results"] = _by_day(compact_day_result)(plan["day_results"])
+    return compacted
+
+
+def expand_previous_plan(plan: dict) -> dict:
+    expanded = dict(plan)
+    if "meal_output" in plan:
+        expanded["meal_output"] = _by_day(expand_meal)(plan["meal_output"])
+    if "day_results" in plan:
+        expanded["day_results"] = _by_day(expand_day_result)(plan["day_results"])
+    return expanded
+
+
+# State channel -> (compact, expand) of its value
+CHANNELS = {
+    "meal_output": (_by_day(compact_meal), _by_day(expand_meal)),
+    "shopping_list": (compact_shopping_list, expand_shopping_list),
+    "shopping_totals": (compact_shopping_totals, expand_shopping_totals),
+    "day_results": (_by_day(compact_day_result), _by_day(expand_day_result)),
+    "previous_plan": (compact_previous_plan, expand_previous_plan),
+}
+
+
+def compact_channels(values: dict[str, Any]) -> dict[str, Any]:
+    """A checkpoint's channel values with meals and shopping state in their compact form."""
+    compacted = dict(values)
+    for channel, (compact, _) in CHANNELS.items():
+        if isinstance(values.get(channel), dict):
+            compacted[channel] = compact(values[channel])
+    return compacted
+
+
+def expand_channels(values: dict[str, Any]) -> dict[str, Any]:
+    """Inverse of compact_channels."""
+    expanded = dict(values)
+    for channel, (_, expand) in CHANNELS.items():
+        if isinstance(values.get(channel), dict):
+            expanded[channel] = expand(values[channel])
+    return expanded
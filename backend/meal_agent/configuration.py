@@ -0,0 +1,140 @@
+"""Run configuration for the meal planner agent."""
+
+import os
+from dataclasses import dataclass, fields
+from typing import Any, Literal
+
+from langchain_core.runnables import RunnableConfig
+
+
+@dataclass(kw_only=True)
+class Configuration:
+    """Per-run settings, read from `config["configurable"]` or environment variables.
+
+    Environment variables use the upper-cased field name (e.g. PLANNING_MODE)
+    and override nothing that was passed explicitly for the run.
+    """
+
+    # "sequential" plans one day after another so each day sees the previous
+    # days' inventory; "parallel" fans out one branch per day; "week" asks for
+    # every dinner in one structured call and plans only the days it gets
+    # wrong one by one.
+    planning_mode: Literal["sequential", "parallel", "week"] = "sequential"
+
+    # Maximum number of days generated at the same time in parallel mode
+    max_parallel_days: int = 7
+
+    # Seconds the whole run may take, split across the days still to plan;
+    # a day out of time stops searching and falls back to a known recipe or
+    # one written without tools (see meal_agent.deadlines). 0 disables it.
+    run_deadline: float = 180.0
+
+    # Seconds the run spent stopped before it was resumed; deadlines don't
+    # count them. Set by meal_agent.checkpoints.run_or_resume.
+    paused_seconds: float = 0.0
+
+    # Search rounds a day may make before the model has to write its recipe
+    max_tool_iterations: int = 3
+
+    # Times a day's recipe may be rejected as a near-duplicate of another
+    # day's meal and generated again (see meal_agent.similarity); 0 keeps it
+    max_duplicate_retries: int = 1
+
+    # "two_pass" asks for recipe prose and parses it with a second call;
+    # "single_pass" has the model return a ParsedRecipe directly after searching
+    generation_mode: Literal["two_pass", "single_pass"] = "two_pass"
+
+    # "<provider>:<model>" of the chat model that writes and parses recipes,
+    # and of the fast model that checks image relevance ("openai" or
+    # "anthropic"); each is created on first use and shared within the process
+    chat_model: str = "openai:gpt-4o"
+    validation_model: str = "anthropic:claude-3-haiku-20240307"
+
+    # Estimated tokens allowed for the inventory and planned-meal lists in a
+    # generation prompt; longer lists are summarized or truncated
+    prompt_context_tokens: int = 400
+
+    # Reduce recipe_search results to a compact table of the recipes within
+    # the day's time limit before the model reads them (meal_agent.distill)
+    distill_search_results: bool = True
+
+    # SQLite file for cached parsed recipes; empty disables the cache
+    recipe_cache_path: str = ""
+
+    # Seconds a cached recipe stays eligible (default one week)
+    recipe_cache_ttl: float = 7 * 24 * 3600.0
+
+    # Cached recipes kept before least-recently-used ones are evicted
+    recipe_cache_max_entries: int = 5000
+
+    # File or directory of recipes (JSON, JSON-LD, JSONL or CSV) searched before
+    # Tavily; empty searches the web only
+    recipe_corpus_path: str = ""
+
+    # Fill days from cached and local-corpus recipes chosen to use up fresh
+    # ingredients, before asking the model; days the pool cannot fill still use it
+    menu_optimizer: bool = True
+
+    # Candidate recipes the menu optimizer considers per run
+    menu_pool_size: int = 500
+
+    # SQLite file for image lookups and relevance verdicts; empty keeps them in memory
+    image_cache_path: str = ""
+
+    # Seconds a cached image lookup stays valid (default one day)
+    image_cache_ttl: float = 24 * 3600.0
+
+    # Cached image lookups kept per cache before least-recently-used ones are evicted
+    image_cache_max_entries: int = 2048
+
+    # "deferred" emits meals first and resolves images in a final stage,
+    # "inline" looks up each image before its meal is emitted, "off" skips images
+    image_enrichment: Literal["deferred", "inline", "off"] = "deferred"
+
+    # Seconds to wait for image relevance checks before treating them as misses
+    image_validation_timeout: float = 5.0
+
+    # Seconds each deferred image lookup may take, counted from when it
+    # starts rather than against run_deadline; 0 waits for it
+    image_enrichment_timeout: float = 20.0
+
+    # Give a day whose recipe cannot be parsed a placeholder meal; when off, the
+    # error fails the run instead, so a checkpointed run can resume and retry
+    # that day (see meal_agent.checkpoints)
+    degrade_failed_days: bool = True
+
+    # Stream each recipe's finished fields as "partial_meal" custom events
+    # while the model writes it (see meal_agent.streaming)
+    stream_partial_meals: bool = False
+
+    # Record node timings, model/tool calls and tokens in the `metrics` state key
+    collect_metrics: bool = True
+
+    @classmethod
+    def from_runnable_config(cls, config: RunnableConfig | None = None) -> "Configuration":
+        """Build a Configuration from a RunnableConfig, falling back to env vars."""
+        configurable = (config or {}).get("configurable", {}) or {}
+        values: dict[str, Any] = {}
+        for f in fields(cls):
+            if not f.init:
+                continue
+            value = configurable.get(f.name)
+            if value is None:
+                value = os.environ.get(f.name.upper())
+            if value is None:
+                continue
+            values[f.name] = _coerce(value, f.default)
+        return cls(**values)
+
+
+def _coerce(value: Any, default: Any) -> Any:
+    """Convert env-var strings to the type of the field default."""
+    if not isinstance(value, str) or isinstance(default, str) or default is None:
+        return value
+    if isinstance(default, bool):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, int):
+        return int(value)
+    if isinstance(default, float):
+        return float(value)
+    return value
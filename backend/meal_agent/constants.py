@@ -163,3 +163,201 @@ NON_PERISHABLES = {
     "nuts",
     "dried_fruit",
 }
+
+# Units the quantity engine can convert, mapped to (dimension, amount in the
+# dimension's canonical unit). Mass is kept in grams, volume in milliliters
+# and plain counts in "count". Units not listed here (clove, bunch, can, ...)
+# are their own dimension and only add up with themselves.
+UNIT_CONVERSIONS = {
+    # Mass
+    "g": ("mass", 1.0),
+    "gram": ("mass", 1.0),
+    "kg": ("mass", 1000.0),
+    "oz": ("mass", 28.3495),
+    "ounce": ("mass", 28.3495),
+    "lb": ("mass", 453.592),
+    "pound": ("mass", 453.592),
+
+    # Volume
+    "ml": ("volume", 1.0),
+    "l": ("volume", 1000.0),
+    "liter": ("volume", 1000.0),
+    "tsp": ("volume", 4.92892),
+    "teaspoon": ("volume", 4.92892),
+    "tbsp": ("volume", 14.7868),
+    "tablespoon": ("volume", 14.7868),
+    "fl_oz": ("volume", 29.5735),
+    "cup": ("volume", 236.588),
+    "pint": ("volume", 473.176),
+    "quart": ("volume", 946.353),
+    "gallon": ("volume", 3785.41),
+
+    # Count
+    "": ("count", 1.0),
+    "count": ("count", 1.0),
+    "whole": ("count", 1.0),
+    "small": ("count", 1.0),
+    "medium": ("count", 1.0),
+    "large": ("count", 1.0),
+    "piece": ("count", 1.0),
+    "ear": ("count", 1.0),
+    "dozen": ("count", 12.0),
+}
+
+# Unit spellings the LLM emits, mapped to the keys above
+UNIT_ALIASES = {
+    "grams": "g",
+    "kilogram": "kg",
+    "kilograms": "kg",
+    "ounces": "oz",
+    "lbs": "lb",
+    "pounds": "lb",
+    "milliliter": "ml",
+    "milliliters": "ml",
+    "liters": "l",
+    "teaspoons": "tsp",
+    "tablespoons": "tbsp",
+    "fl oz": "fl_oz",
+    "fluid ounce": "fl_oz",
+    "fluid ounces": "fl_oz",
+    "cups": "cup",
+    "pints": "pint",
+    "quarts": "quart",
+    "gallons": "gallon",
+    "pieces": "piece",
+    "ears": "ear",
+    "cloves": "clove",
+    "slices": "slice",
+    "sprigs": "sprig",
+    "bunches": "bunch",
+    "cans": "can",
+    "heads": "head",
+    "stalks": "stalk",
+    "packages": "package",
+}
+
+# Contents of STANDARD_PURCHASE_UNITS packages that are not a convertible
+# unit themselves, as (unit, amount), so recipe quantities can be rounded up
+# to whole packages
+PACKAGE_CONTENTS = {
+    "bacon": ("oz", 12.0),
+    "garlic": ("clove", 10.0),
+    "broccoli": ("cup", 4.0),
+    "cauliflower": ("cup", 4.0),
+    "lettuce": ("cup", 6.0),
+    "cabbage": ("cup", 8.0),
+    "celery": ("stalk", 8.0),
+    "spinach": ("oz", 5.0),
+    "mushrooms": ("oz", 8.0),
+    "asparagus": ("lb", 1.0),
+    "cilantro": ("cup", 1.0),
+    "parsley": ("cup", 1.0),
+    "basil_fresh": ("cup", 1.0),
+    "mint": ("cup", 1.0),
+    "dill": ("cup", 0.5),
+    "green_onion": ("whole", 6.0),
+    "scallions": ("whole", 6.0),
+    "sour_cream": ("cup", 2.0),
+    "cream_cheese": ("oz", 8.0),
+    "cheddar_cheese": ("oz", 8.0),
+    "mozzarella": ("oz", 8.0),
+    "parmesan": ("oz", 5.0),
+    "yogurt": ("cup", 4.0),
+    "banana": ("whole", 6.0),
+}
+
+# Approximate grams in a cup of fresh ingredients sold by weight but measured
+# by volume in recipes (or the other way round), so both count toward the
+# same package: "2 cups spinach" uses most of a 5 oz bag
+GRAMS_PER_CUP = {
+    "spinach": 30.0,
+    "mushrooms": 70.0,
+    "asparagus": 134.0,
+    "green_beans": 110.0,
+    "broccoli": 91.0,
+    "cauliflower": 107.0,
+    "cabbage": 89.0,
+    "lettuce": 47.0,
+    "cilantro": 16.0,
+    "parsley": 60.0,
+    "basil_fresh": 24.0,
+    "mint": 50.0,
+    "dill": 9.0,
+    "cream_cheese": 232.0,
+    "cheddar_cheese": 113.0,
+    "mozzarella": 112.0,
+    "parmesan": 100.0,
+    "bacon": 150.0,
+    "ground_beef": 225.0,
+    "chicken_breast": 140.0,
+    "shrimp": 145.0,
+}
+
+# Other spellings of catalog ingredients, mapped to the catalog name
+INGREDIENT_ALIASES = {
+    "fresh_basil": "basil_fresh",
+    "basil_leaves": "basil_fresh",
+    "scallion": "green_onion",
+    "spring_onion": "green_onion",
+    "garlic_clove": "garlic",
+    "garlic_cloves": "garlic",
+    "egg": "eggs",
+    "shredded_cheddar": "cheddar_cheese",
+    "cheddar": "cheddar_cheese",
+    "parmesan_cheese": "parmesan",
+    "mozzarella_cheese": "mozzarella",
+    "ground_pepper": "black pepper",
+    "kosher_salt": "salt",
+    "sea_salt": "salt",
+    "evoo": "olive oil",
+    "extra_virgin_olive_oil": "olive oil",
+    "warm_water": "water",
+    "hot_water": "water",
+    "cold_water": "water",
+    "boiling_water": "water",
+    "ice_water": "water",
+    "ice_cubes": "ice",
+}
+
+# Catalog names too generic to match as the last word of a longer name:
+# "jalapeno_pepper" is not the "pepper" pantry staple, "coconut_water" is not water
+EXACT_MATCH_ONLY = {"pepper", "water", "ice"}
+
+# Names that end in a pantry staple but are bought like any other ingredient
+NOT_STAPLES = {"peanut_butter", "almond_butter", "cashew_butter", "apple_butter", "cookie_butter"}
+
+# Shopping list category of catalog ingredients, for recipes that come without
+# one (the local corpus); other catalog names and unknown ingredients are "pantry"
+INGREDIENT_CATEGORIES = {
+    "protein": [
+        "ground_beef", "chicken_breast", "chicken_thighs", "pork_chops", "bacon", "sausage", "steak", "salmon",
+        "shrimp", "eggs",
+    ],
+    "produce": [
+        "tomato", "potato", "carrot", "celery", "broccoli", "cauliflower", "zucchini", "cucumber", "lettuce",
+        "spinach", "mushrooms", "green_beans", "asparagus", "corn", "cabbage", "bell_pepper", "lemon", "lime",
+        "avocado", "apple", "banana",
+    ],
+    "aromatics": [
+        "onion", "yellow_onion", "red_onion", "garlic", "green_onion", "scallions", "cilantro", "parsley",
+        "basil_fresh", "mint", "dill", "basil", "rosemary", "thyme", "oregano", "bay_leaves",
+    ],
+    "dairy": [
+        "milk", "heavy_cream", "sour_cream", "cream_cheese", "cheddar_cheese", "mozzarella", "parmesan", "yogurt",
+        "butter",
+    ],
+    "grains": ["pasta", "rice", "quinoa", "oats", "bread", "tortillas", "crackers"],
+}
+
+# Leading words that describe an ingredient rather than name a different one:
+# "boneless_chicken_breast" is chicken_breast, but "sweet_potato" is not potato
+# and "almond_milk" is not milk, so only these words are dropped when matching.
+# Storage words (frozen, dried, canned, cooked) are left out: "frozen_corn" keeps
+# for weeks and is bought apart from fresh corn, so it must not become "corn"
+INGREDIENT_MODIFIERS = {
+    "fresh", "freshly", "organic", "ripe", "raw",
+    "large", "medium", "small", "jumbo", "baby",
+    "boneless", "skinless", "lean", "extra", "whole", "unsalted", "salted", "low", "reduced", "sodium", "fat", "free",
+    "chopped", "diced", "minced", "sliced", "shredded", "grated", "crushed", "cracked", "ground", "flat", "leaf",
+    "red", "green", "yellow", "orange", "white",
+}
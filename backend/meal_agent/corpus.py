@@ -0,0 +1,414 @@
+"""Local recipe corpus with an inverted index, searched before Tavily.
+
+Recipes are loaded from JSON (a list of ParsedRecipe-shaped dicts or
+schema.org JSON-LD Recipe objects), JSON Lines or CSV files, or a directory
+of them, and indexed by ingredient, name words, category, equipment and
+time. A free-text query such as "30 minute dinner with spinach and
+ground_beef, no oven" is answered from the index without any network call.
+
+A recipe whose time is not given keeps a `time_estimate` of None. It is
+never returned for a query with a time limit, and the menu optimizer does
+not choose it. Ingredients without a category get the catalog's.
+"""
+
+import bisect
+import csv
+import heapq
+import json
+import os
+import re
+import threading
+from collections.abc import Iterable
+from fractions import Fraction
+from typing import Any
+
+from meal_agent.catalog import canonical_name, ingredient_category, ingredient_key, resolve_ingredient
+from meal_agent.constants import UNIT_ALIASES, UNIT_CONVERSIONS
+
+EQUIPMENT = ("stovetop", "oven", "air_fryer", "microwave", "no_cook")
+
+# Instruction keywords used to guess equipment when a recipe does not list it
+_EQUIPMENT_HINTS = {
+    "oven": re.compile(r"\b(oven|bake|baking|roast|broil)\w*", re.I),
+    "air_fryer": re.compile(r"\bair[\s-]?fr(y|ier|yer)", re.I),
+    "microwave": re.compile(r"\bmicrowave", re.I),
+    "stovetop": re.compile(r"\b(skillet|saucepan|pan|pot|saute|sauté|boil|simmer|fry|sear|stir[\s-]?fry|wok)\w*", re.I),
+}
+
+# Units recognized when splitting "2 cups fresh spinach" into quantity, unit and name
+_INGREDIENT_UNITS = (
+    set(UNIT_CONVERSIONS) | set(UNIT_ALIASES)
+    | {"clove", "slice", "sprig", "bunch", "can", "head", "stalk", "package", "pinch", "handful", "fillet"}
+) - {""}
+
+_QUANTITY = r"(?P<qty>\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?|[½⅓⅔¼¾⅛])"
+_INGREDIENT_LINE = re.compile(
+    _QUANTITY + r"?\s*(?P<unit>[a-zA-Z.]+(?:\s+oz)?)?\s*(?P<name>.*)", re.S
+)
+_UNICODE_FRACTIONS = {"½": 0.5, "⅓": 1 / 3, "⅔": 2 / 3, "¼": 0.25, "¾": 0.75, "⅛": 0.125}
+
+# Query words that carry no recipe content; any other unmatched word means
+# the query asks for something the corpus may not have
+_QUERY_STOPWORDS = {
+    "a", "an", "and", "or", "the", "with", "for", "in", "of", "to", "on", "that", "using", "uses", "use", "up",
+    "recipe", "recipes", "dinner", "dinners", "meal", "meals", "dish", "idea", "ideas", "food",
+    "quick", "easy", "simple", "healthy", "weeknight", "homemade", "best", "family", "tasty", "delicious",
+    "min", "mins", "minute", "minutes", "under", "less", "than", "within", "max", "maximum", "total", "time",
+    "ready", "prep", "cook", "cooking", "serves", "serving", "servings", "person", "people", "one", "two",
+    "no", "without", "oven", "stovetop", "stove", "air", "fryer", "microwave", "fresh", "ingredients",
+    "leftover", "leftovers", "remaining", "find", "search",
+}
+
+_ISO_DURATION = re.compile(r"P(?:(?P<d>\d+)D)?T?(?:(?P<h>\d+)H)?(?:(?P<m>\d+)M)?", re.I)
+
+
+def parse_quantity(text: str) -> float:
+    """Numeric value of "1 1/2", "3/4", "0.5" or "½"."""
+    text = text.strip()
+    if text in _UNICODE_FRACTIONS:
+        return _UNICODE_FRACTIONS[text]
+    return float(sum(Fraction(part) for part in text.split()))
+
+
+def parse_ingredient_line(line: str) -> dict:
+    """Split a free-text ingredient such as "2 cups fresh spinach, chopped".
+
+    The name is empty when the line holds no ingredient ("(optional)").
+    """
+    # Drop parenthesized notes first: "1 (14 oz) can diced tomatoes" / "onion (diced)"
+    match = _INGREDIENT_LINE.match(re.sub(r"\([^)]*\)", " ", line).strip())
+    quantity = parse_quantity(match.group("qty")) if match and match.group("qty") else 1.0
+    unit = (match.group("unit") or "").lower().rstrip(".") if match else ""
+    name = match.group("name") if match else line
+    if unit and unit not in _INGREDIENT_UNITS:
+        # Not a unit after all ("2 eggs"): it is the start of the name
+        name = f"{match.group('unit')} {name}"
+        unit = ""
+    # Drop preparation notes: "spinach, chopped"
+    name = name.split(",", 1)[0]
+    entry = resolve_ingredient(name)
+    return {
+        "name": ingredient_key(name),
+        "quantity": quantity,
+        "unit": UNIT_ALIASES.get(unit, unit),
+        # "1 can diced tomatoes" keeps in the pantry whatever the catalog says
+        "is_fresh": bool(entry is not None and entry.is_fresh) and unit != "can",
+        "category": ingredient_category(name),
+    }
+
+
+def _parse_ingredients(items: Iterable[Any]) -> list[dict]:
+    """Ingredient dicts for free-text lines and ingredient records, leaving out nameless ones."""
+    ingredients = []
+    for item in items:
+        if isinstance(item, str):
+            ing = parse_ingredient_line(item)
+        elif isinstance(item, dict):
+            ing = {**item, "category": item.get("category") or ingredient_category(str(item.get("name", "")))}
+        else:
+            continue
+        if ingredient_key(str(ing.get("name", ""))):
+            ingredients.append(ing)
+    return ingredients
+
+
+def parse_duration(value: Any) -> int | None:
+    """Minutes in an ISO 8601 duration ("PT1H30M") or a plain number."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    if not isinstance(value, str) or not value.strip():
+        return None
+    if value.strip().isdigit():
+        return int(value)
+    match = _ISO_DURATION.fullmatch(value.strip())
+    if not match or not any(match.groupdict().values()):
+        return None
+    return int(match["d"] or 0) * 1440 + int(match["h"] or 0) * 60 + int(match["m"] or 0)
+
+
+def parse_servings(value: Any) -> int:
+    """Servings in a yield such as 4, "4 servings" or ["4", "4 servings"]; 1 when unknown."""
+    for item in _as_list(value):
+        match = re.search(r"\d+", str(item))
+        if match and int(match.group()) > 0:
+            return int(match.group())
+    return 1
+
+
+def guess_equipment(instructions: Iterable[str]) -> list[str]:
+    """Equipment mentioned in the instructions, or ["no_cook"] when none is."""
+    text = " ".join(instructions)
+    found = [name for name, pattern in _EQUIPMENT_HINTS.items() if pattern.search(text)]
+    return found or ["no_cook"]
+
+
+def _instruction_text(step: Any) -> list[str]:
+    """Flatten JSON-LD HowToStep / HowToSection instructions to strings."""
+    if isinstance(step, str):
+        return [line.strip() for line in step.splitlines() if line.strip()]
+    if isinstance(step, list):
+        return [text for item in step for text in _instruction_text(item)]
+    if isinstance(step, dict):
+        if "itemListElement" in step:
+            return _instruction_text(step["itemListElement"])
+        return _instruction_text(step.get("text", ""))
+    return []
+
+
+def _as_list(value: Any) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def from_json_ld(data: dict) -> dict | None:
+    """ParsedRecipe-shaped dict for a schema.org Recipe, or None for other types."""
+    types = {t.lower() for t in _as_list(data.get("@type"))}
+    if "recipe" not in types or not data.get("name"):
+        return None
+    instructions = _instruction_text(data.get("recipeInstructions"))
+    time_estimate = parse_duration(data.get("totalTime"))
+    if not time_estimate:
+        time_estimate = (parse_duration(data.get("prepTime")) or 0) + (parse_duration(data.get("cookTime")) or 0)
+    categories = _as_list(data.get("recipeCategory")) + _as_list(data.get("recipeCuisine"))
+    return {
+        "name": data["name"].strip(),
+        "ingredients": _parse_ingredients(_as_list(data.get("recipeIngredient"))),
+        "instructions": instructions,
+        "time_estimate": time_estimate or None,
+        "equipment": guess_equipment(instructions),
+        "category": [str(c).lower() for c in categories],
+        "servings": parse_servings(data.get("recipeYield")),
+        "url": data.get("url", ""),
+    }
+
+
+def json_ld_recipes(data: Any) -> list[dict]:
+    """Every schema.org Recipe in a JSON-LD document, including inside @graph."""
+    recipes = []
+    for item in _as_list(data):
+        if not isinstance(item, dict):
+            continue
+        recipe = from_json_ld(item)
+        if recipe is not None:
+            recipes.append(recipe)
+        recipes.extend(json_ld_recipes(item.get("@graph")))
+    return recipes
+
+
+def _from_record(record: dict) -> dict | None:
+    """Normalize a JSON record: ParsedRecipe-shaped dicts pass through, JSON-LD is converted."""
+    if "@type" in record or "@graph" in record:
+        recipes = json_ld_recipes(record)
+        return recipes[0] if recipes else None
+    if not record.get("name"):
+        return None
+    ingredients = _parse_ingredients(record.get("ingredients", []))
+    instructions = _instruction_text(record.get("instructions", []))
+    return {
+        **record,
+        "ingredients": ingredients,
+        "instructions": instructions,
+        "time_estimate": parse_duration(record.get("time_estimate")) or None,
+        "equipment": record.get("equipment") or guess_equipment(instructions),
+        "category": [str(c).lower() for c in _as_list(record.get("category"))],
+        "servings": parse_servings(record.get("servings")),
+    }
+
+
+def _from_csv_row(row: dict) -> dict | None:
+    """Recipe from a CSV row with name, ingredients (";"-separated), instructions
+    ("|"-separated), time_estimate, equipment and category (","-separated) columns."""
+    return _from_record({
+        "name": (row.get("name") or "").strip(),
+        "ingredients": [part for part in (row.get("ingredients") or "").split(";") if part.strip()],
+        "instructions": [part.strip() for part in (row.get("instructions") or "").split("|") if part.strip()],
+        "time_estimate": row.get("time_estimate") or row.get("total_time"),
+        "equipment": [part.strip() for part in (row.get("equipment") or "").split(",") if part.strip()],
+        "category": [part.strip() for part in (row.get("category") or "").split(",") if part.strip()],
+        "servings": row.get("servings"),
+        "url": row.get("url", ""),
+    })
+
+
+def load_recipes(path: str) -> list[dict]:
+    """Load recipes from a JSON, JSONL or CSV file, or every such file in a directory."""
+    if os.path.isdir(path):
+        recipes = []
+        for entry in sorted(os.listdir(path)):
+            if entry.lower().endswith((".json", ".jsonl", ".csv")):
+                recipes.extend(load_recipes(os.path.join(path, entry)))
+        return recipes
+
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = [_from_csv_row(row) for row in csv.DictReader(f)]
+        elif path.lower().endswith(".jsonl"):
+            rows = [_from_record(json.loads(line)) for line in f if line.strip()]
+        else:
+            data = json.load(f)
+            rows = [_from_record(item) for item in _as_list(data) if isinstance(item, dict)]
+    return [row for row in rows if row is not None]
+
+
+class RecipeIndex:
+    """Inverted index over a recipe corpus.
+
+    Postings map each canonical ingredient, name or category word and piece
+    of equipment to the ids of the recipes that have it; known times are
+    kept sorted so "ready in N minutes" is a bisect.
+    """
+
+    def __init__(self, recipes: Iterable[dict]):
+        self.recipes: list[dict] = []
+        self._ingredients: dict[str, set[int]] = {}
+        self._words: dict[str, set[int]] = {}
+        self._equipment: dict[str, set[int]] = {}
+        self._times: list[tuple[int, int]] = []
+        seen: set[str] = set()
+        for recipe in recipes:
+            key = recipe["name"].strip().lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            self._add(recipe)
+        self._times.sort()
+
+    def _add(self, recipe: dict) -> None:
+        recipe_id = len(self.recipes)
+        self.recipes.append(recipe)
+        for ing in recipe.get("ingredients", []):
+            self._ingredients.setdefault(canonical_name(ing["name"]), set()).add(recipe_id)
+        words = ingredient_key(recipe["name"]).split("_")
+        for category in recipe.get("category", []):
+            words.extend(ingredient_key(category).split("_"))
+        for word in words:
+            if len(word) > 2:
+                self._words.setdefault(word, set()).add(recipe_id)
+        for equipment in recipe.get("equipment", []):
+            self._equipment.setdefault(equipment, set()).add(recipe_id)
+        if recipe.get("time_estimate") is not None:
+            self._times.append((int(recipe["time_estimate"]), recipe_id))
+
+    def __len__(self) -> int:
+        return len(self.recipes)
+
+    def ingredient_terms(self, text: str) -> list[str]:
+        """Canonical ingredients of the corpus mentioned in free text (up to three-word names)."""
+        words = ingredient_key(text).split("_")
+        found = []
+        for size in (3, 2, 1):
+            for i in range(len(words) - size + 1):
+                name = canonical_name("_".join(words[i:i + size]))
+                if name in self._ingredients and name not in found:
+                    found.append(name)
+        return found
+
+    def search(
+        self,
+        max_time: int | None = None,
+        ingredients: Iterable[str] = (),
+        words: Iterable[str] = (),
+        exclude_equipment: Iterable[str] = (),
+        exclude_names: Iterable[str] = (),
+        limit: int = 5,
+    ) -> list[dict]:
+        """Best recipes within `max_time` that avoid `exclude_equipment`.
+
+        Recipes score 2 per matching ingredient and 1 per matching name or
+        category word. When ingredients or words are given, only recipes
+        matching at least one are returned.
+        """
+        if max_time is None:
+            candidates = set(range(len(self.recipes)))
+        else:
+            end = bisect.bisect_right(self._times, (max_time, len(self.recipes)))
+            candidates = {recipe_id for _, recipe_id in self._times[:end]}
+        for equipment in exclude_equipment:
+            candidates -= self._equipment.get(equipment, set())
+        excluded = {name.strip().lower() for name in exclude_names}
+        if excluded:
+            candidates = {i for i in candidates if self.recipes[i]["name"].strip().lower() not in excluded}
+
+        scores: dict[int, int] = {}
+        terms = [(self._ingredients, ingredient, 2) for ingredient in ingredients]
+        terms += [(self._words, word, 1) for word in words]
+        for postings, term, weight in terms:
+            for recipe_id in postings.get(term, set()) & candidates:
+                scores[recipe_id] = scores.get(recipe_id, 0) + weight
+
+        if terms:
+            ranked = heapq.nlargest(limit, scores, key=lambda i: (scores[i], -self._time_of(i)))
+        else:
+            ranked = heapq.nsmallest(limit, candidates, key=lambda i: (self._time_of(i), i))
+        return [self.recipes[i] for i in ranked]
+
+    def within(self, max_time: int, limit: int | None = None) -> list[dict]:
+        """Recipes ready in `max_time` minutes or less, in corpus order."""
+        end = bisect.bisect_right(self._times, (max_time, len(self.recipes)))
+        ids = sorted(recipe_id for _, recipe_id in self._times[:end])
+        return [self.recipes[i] for i in ids[:limit]]
+
+    def _time_of(self, recipe_id: int) -> float:
+        """Minutes of a recipe; recipes of unknown time rank after every other."""
+        minutes = self.recipes[recipe_id].get("time_estimate")
+        return float("inf") if minutes is None else minutes
+
+    def query(self, text: str, limit: int = 5) -> list[dict]:
+        """Answer a free-text recipe query such as "under 30 minutes with spinach, no oven"."""
+        max_time = None
+        time_match = re.search(r"(\d+)\s*(?:-\s*)?(?:min|mins|minute|minutes)\b", text, re.I)
+        if time_match:
+            max_time = int(time_match.group(1))
+        exclude_equipment = [
+            ingredient_key(match) for match in
+            re.findall(r"\b(?:no|without)[\s-]+(oven|stovetop|stove|air[\s_-]?fryer|microwave)", text, re.I)
+        ]
+        exclude_equipment = ["stovetop" if e == "stove" else e.replace("airfryer", "air_fryer") for e in exclude_equipment]
+        ingredients = self.ingredient_terms(text)
+        ingredient_words = {word for name in ingredients for word in name.split("_")}
+        query_words = [word for word in dict.fromkeys(ingredient_key(text).split("_")) if not word.isdigit()]
+        words = [word for word in query_words if word in self._words and word not in ingredient_words]
+        if not ingredients and not words and any(word not in _QUERY_STOPWORDS for word in query_words):
+            # Nothing the query asks for is in the corpus
+            return []
+        return self.search(max_time, ingredients, words, exclude_equipment, limit=limit)
+
+
+def ingredient_text(ingredient: dict) -> str:
+    """Readable line for a parsed ingredient, e.g. "2 cup spinach"."""
+    parts = (f"{ingredient['quantity']:g}", ingredient.get("unit", ""), ingredient["name"].replace("_", " "))
+    return " ".join(part for part in parts if part)
+
+
+def format_result(recipe: dict) -> dict:
+    """Tavily-style search result for a local recipe."""
+    ingredients = ", ".join(ingredient_text(ing) for ing in recipe.get("ingredients", []))
+    steps = " ".join(f"{i}. {step}" for i, step in enumerate(recipe.get("instructions", []), 1))
+    slug = ingredient_key(recipe["name"]).replace("_", "-")
+    minutes = recipe.get("time_estimate")
+    ready = f"ready in {minutes} minutes" if minutes is not None else "time not given"
+    return {
+        "url": recipe.get("url") or f"local://recipes/{slug}",
+        "title": recipe["name"],
+        "content": (
+            f"{recipe['name']} - {ready}. "
+            f"Equipment: {', '.join(recipe.get('equipment', []))}. "
+            f"Ingredients: {ingredients}. Instructions: {steps}"
+        ),
+    }
+
+
+_indexes: dict[str, RecipeIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_recipe_index(path: str) -> RecipeIndex | None:
+    """Process-wide index for the corpus at `path`, or None when no corpus is configured."""
+    if not path:
+        return None
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = _indexes[path] = RecipeIndex(load_recipes(path))
+        return index
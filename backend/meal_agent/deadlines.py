@@ -0,0 +1,75 @@
+"""Per-run latency budget, split across the days being planned.
+
+A run may take `run_deadline` seconds from its start (0 disables the
+budget). Each day gets an equal share of the time left when it starts;
+days the menu optimizer, the week plan or the recipe cache already filled
+cost next to nothing and are not counted. A day may search until half of its
+share is used or `max_tool_iterations` rounds were made. After that the
+model writes the recipe from the results it has, and a search still running
+is abandoned. The other half of the share is left for writing and parsing
+the recipe.
+
+A day that starts with nothing left of the run's budget does not search at
+all: it takes a cached or local-corpus recipe when one fits, or else the
+model writes one without tools. Either way every day costs a bounded number
+of calls.
+
+Deadlines are kept on the run's clock: wall-clock time less the seconds a
+checkpointed run spent stopped before it was resumed (`paused_seconds`, set
+by meal_agent.checkpoints.run_or_resume). A resumed run therefore has the
+budget it had left when it stopped, not one that ran out while it waited.
+"""
+
+import time
+from collections.abc import Sequence
+
+from langchain_core.runnables import RunnableConfig
+
+from meal_agent.configuration import Configuration
+
+# Share of a day's budget it may spend searching
+SEARCH_SHARE = 0.5
+
+
+def run_clock(config: RunnableConfig | None) -> float:
+    """Current time on the run's clock, which stands still while the run is stopped."""
+    return time.time() - Configuration.from_runnable_config(config).paused_seconds
+
+
+def run_deadline(started_at: float | None, config: RunnableConfig | None) -> float | None:
+    """Time on the run's clock by which the run should be done, or None without a budget."""
+    seconds = Configuration.from_runnable_config(config).run_deadline
+    if not seconds or started_at is None:
+        return None
+    return started_at + seconds
+
+
+def search_deadline(started_at: float | None, config: RunnableConfig | None, days_left: int) -> float | None:
+    """Time until which the next of `days_left` days may search, or None without a budget."""
+    end = run_deadline(started_at, config)
+    if end is None:
+        return None
+    now = run_clock(config)
+    return now + max(0.0, end - now) / max(1, days_left) * SEARCH_SHARE
+
+
+def time_left(deadline: float | None, config: RunnableConfig | None) -> float | None:
+    """Seconds until `deadline`, or None when there is none."""
+    if deadline is None:
+        return None
+    return max(0.0, deadline - run_clock(config))
+
+
+def expired(deadline: float | None, config: RunnableConfig | None) -> bool:
+    return deadline is not None and run_clock(config) >= deadline
+
+
+def may_search(config: RunnableConfig | None, rounds: int, deadline: float | None) -> bool:
+    """Whether a day that made `rounds` search rounds may search again."""
+    return rounds < Configuration.from_runnable_config(config).max_tool_iterations and not expired(deadline, config)
+
+
+def waves_left(days: Sequence[str], max_parallel_days: int) -> int:
+    """Parallel waves needed for `days`."""
+    cap = max(1, max_parallel_days)
+    return max(1, -(-len(days) // cap))
@@ -0,0 +1,199 @@
+"""Local distillation of recipe search results before they reach the model.
+
+A Tavily search returns up to five pages, each with a title, URL, a snippet
+of page text and, when requested, the page's raw content. The model only
+needs each recipe's essentials, so results are reduced here without any
+model call to one table row per recipe:
+
+    Recipes within 30 minutes (2 longer ones left out):
+    | # | recipe | minutes | ingredients | steps | url |
+    | 1 | Beef Tacos | 20 | ground beef; tortillas; lettuce | 1. Brown the beef. 2. Warm the tortillas. | https://... |
+
+The essentials come from a schema.org Recipe in the result's JSON-LD when
+there is one (parsed by meal_agent.corpus), otherwise from the snippet's
+"ready in" / "total time", "Ingredients:" and "Instructions:" text. Recipes
+that take longer than the day's time limit are left out; a recipe whose time
+cannot be found is kept with "?" minutes. A result with no recognizable
+ingredients or steps keeps a short excerpt of its snippet instead.
+"""
+
+import json
+import re
+from typing import Any
+
+from meal_agent.corpus import ingredient_text, json_ld_recipes
+
+# Per-recipe caps; a recipe needs no more than this to be chosen and written out
+MAX_INGREDIENTS = 15
+MAX_STEPS = 8
+STEP_CHARS = 160
+EXCERPT_CHARS = 300
+
+_JSON_LD_SCRIPT = re.compile(r"<script[^>]*application/ld\+json[^>]*>(.*?)</script>", re.I | re.S)
+
+_DURATION = r"(?:(?P<h>\d+)\s*(?:hours?|hrs?|h)\b\s*(?:and\s+)?)?(?:(?P<m>\d+)\s*(?:minutes?|mins?|m)\b)?"
+_TOTAL_TIME = re.compile(r"\b(?:total(?:\s+time)?|ready\s+in)\s*:?\s*" + _DURATION, re.I)
+_PREP_TIME = re.compile(r"\bprep(?:aration)?(?:\s+time|:)\s*:?\s*" + _DURATION, re.I)
+_COOK_TIME = re.compile(r"\bcook(?:ing)?(?:\s+time|:)\s*:?\s*" + _DURATION, re.I)
+
+_SECTION = re.compile(r"\b(?P<label>ingredients|instructions|directions|method|steps)\s*:", re.I)
+_NUMBERED_STEP = re.compile(r"(?:^|\s)\d{1,2}[.)]\s+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z])")
+_TITLE_SUFFIX = re.compile(r"\s+[|–—-]\s+")
+
+
+def _first_minutes(pattern: re.Pattern, text: str) -> int | None:
+    for match in pattern.finditer(text):
+        if match["h"] or match["m"]:
+            return int(match["h"] or 0) * 60 + int(match["m"] or 0)
+    return None
+
+
+def snippet_minutes(text: str) -> int | None:
+    """Total minutes stated in a snippet ("Ready in 25 minutes", "Prep time: 10 mins Cook time: 1 hr")."""
+    total = _first_minutes(_TOTAL_TIME, text)
+    if total is not None:
+        return total
+    prep, cook = _first_minutes(_PREP_TIME, text), _first_minutes(_COOK_TIME, text)
+    if prep is None and cook is None:
+        return None
+    return (prep or 0) + (cook or 0)
+
+
+def _sections(text: str) -> dict[str, str]:
+    """Text following each "Ingredients:" / "Instructions:" style label, by label."""
+    matches = list(_SECTION.finditer(text))
+    sections = {}
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        label = "ingredients" if match["label"].lower() == "ingredients" else "steps"
+        sections.setdefault(label, text[match.end():end].strip())
+    return sections
+
+
+def _split_steps(text: str) -> list[str]:
+    parts = _NUMBERED_STEP.split(text) if _NUMBERED_STEP.search(text) else _SENTENCE_END.split(text)
+    return [part.strip() for part in parts if part.strip()]
+
+
+def snippet_recipe(text: str) -> tuple[list[str], list[str]]:
+    """Ingredient lines and steps found in a snippet's labelled sections."""
+    sections = _sections(text)
+    ingredients_text = sections.get("ingredients", "")
+    steps_text = sections.get("steps", "")
+    if ingredients_text and not steps_text:
+        # Unlabelled instructions usually follow the ingredient list's first full stop
+        ingredients_text, _, steps_text = ingredients_text.partition(". ")
+    ingredients = [line.strip(" .") for line in re.split(r"[;,\n•]|\s-\s", ingredients_text)]
+    return [line for line in ingredients if line], _split_steps(steps_text)
+
+
+def _json_ld(result: dict) -> list[dict]:
+    """schema.org Recipes embedded in a result's raw content or snippet."""
+    recipes = []
+    for field in ("raw_content", "content"):
+        text = result.get(field)
+        if not isinstance(text, str):
+            continue
+        blocks = _JSON_LD_SCRIPT.findall(text)
+        if not blocks and text.lstrip()[:1] in ("{", "["):
+            blocks = [text]
+        for block in blocks:
+            try:
+                recipes.extend(json_ld_recipes(json.loads(block)))
+            except ValueError:
+                continue
+    return recipes
+
+
+def _title(result: dict, content: str) -> str:
+    title = str(result.get("title") or "").strip()
+    if not title:
+        # Snippets of recipe pages usually open with the recipe's name
+        title = re.split(r"\s+-\s+|[.!?]\s", content, maxsplit=1)[0]
+    return _TITLE_SUFFIX.split(title, maxsplit=1)[0].strip()
+
+
+def distill_result(result: dict) -> dict:
+    """Recipe essentials of one search result: name, minutes, ingredients, steps and url."""
+    content = str(result.get("content") or "")
+    url = str(result.get("url") or "")
+    recipes = _json_ld(result)
+    if recipes:
+        recipe = recipes[0]
+        return {
+            "name": recipe["name"],
+            "minutes": recipe["time_estimate"] or snippet_minutes(content),
+            "ingredients": [ingredient_text(ing) for ing in recipe["ingredients"]],
+            "steps": recipe["instructions"],
+            "url": recipe.get("url") or url,
+            "excerpt": "",
+        }
+    ingredients, steps = snippet_recipe(content)
+    return {
+        "name": _title(result, content),
+        "minutes": snippet_minutes(content),
+        "ingredients": ingredients,
+        "steps": steps,
+        "url": url,
+        "excerpt": "" if ingredients or steps else content,
+    }
+
+
+def _cell(text: str, limit: int | None = None) -> str:
+    text = " ".join(text.replace("|", "/").split())
+    if limit is not None and len(text) > limit:
+        text = text[: limit - 1].rstrip() + "…"
+    return text or "-"
+
+
+def format_table(recipes: list[dict], time_limit: int, dropped: int) -> str:
+    """Compact table of distilled recipes for the model."""
+    heading = f"Recipes within {time_limit} minutes"
+    if dropped:
+        heading += f" ({dropped} longer {'one' if dropped == 1 else 'ones'} left out)"
+    if not recipes and dropped:
+        return f"{heading}: none. Every result takes longer; search for a quicker dish."
+    if not recipes:
+        return "No recipes found; try a different search."
+    lines = [f"{heading}:", "| # | recipe | minutes | ingredients | steps | url |"]
+    for i, recipe in enumerate(recipes, 1):
+        ingredients = "; ".join(recipe["ingredients"][:MAX_INGREDIENTS])
+        if recipe["excerpt"]:
+            steps = _cell(recipe["excerpt"], EXCERPT_CHARS)
+        else:
+            steps = " ".join(
+                f"{n}. {_cell(step, STEP_CHARS)}" for n, step in enumerate(recipe["steps"][:MAX_STEPS], 1)
+            )
+        minutes = recipe["minutes"] if recipe["minutes"] is not None else "?"
+        cells = (str(i), _cell(recipe["name"]), str(minutes), _cell(ingredients), _cell(steps), recipe["url"] or "-")
+        lines.append("| " + " | ".join(cells) + " |")
+    return "\n".join(lines)
+
+
+def distill_results(results: Any, time_limit: int) -> str | None:
+    """Compact table for a recipe_search result list, or None when it is not one (e.g. an error)."""
+    if not isinstance(results, list) or not all(isinstance(result, dict) for result in results):
+        return None
+    kept, seen, dropped = [], set(), 0
+    for result in results:
+        recipe = distill_result(result)
+        key = recipe["name"].lower()
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        if recipe["minutes"] is not None and recipe["minutes"] > time_limit:
+            dropped += 1
+            continue
+        kept.append(recipe)
+    return format_table(kept, time_limit, dropped)
+
+
+def distill_content(content: Any, time_limit: int) -> str | None:
+    """distill_results for a recipe_search ToolMessage's content, which holds the results as JSON."""
+    if isinstance(content, str):
+        try:
+            content = json.loads(content)
+        except ValueError:
+            return None
+    return distill_results(content, time_limit)
@@ -0,0 +1,403 @@
+"""Deterministic offline stand-ins for OpenAI, Anthropic and Tavily.
+
+The fakes replay the recorded recipes in meal_agent.fixtures, so the whole
+graph can run with no network and no API keys:
+
+    with use_fake_providers(latency=0.2):
+        graph.invoke({"meal_input": ...})
+
+Every response carries approximate usage_metadata so token counts can be
+benchmarked. Latencies are simulated with sleep / asyncio.sleep.
+"""
+
+import asyncio
+import contextlib
+import json
+import re
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator
+from typing import Any
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import Field, PrivateAttr
+
+from meal_agent.constants import DAYS_OF_WEEK
+from meal_agent.fixtures import RECIPES, image_results, search_results
+from meal_agent.prompts import estimate_tokens
+from meal_agent.providers import override_providers
+from meal_agent.similarity import dish_key
+
+
+# Characters per streamed chunk; roughly a few tokens, as providers send them
+STREAM_CHUNK_CHARS = 16
+
+
+def _message_text(message: BaseMessage) -> str:
+    content = message.content
+    return content if isinstance(content, str) else json.dumps(content)
+
+
+def _scaled(recipe: dict, servings: int) -> dict:
+    """Copy of a recipe with ingredient quantities scaled for `servings`."""
+    return {
+        **recipe,
+        "ingredients": [
+            {**ing, "quantity": round(ing["quantity"] * servings, 2)} for ing in recipe["ingredients"]
+        ],
+    }
+
+
+def find_recipe(text: str, recipes: list[dict] = RECIPES) -> dict | None:
+    """Recorded recipe whose name appears first in `text`."""
+    lowered = text.lower()
+    positions = [(lowered.find(recipe["name"].lower()), i) for i, recipe in enumerate(recipes)]
+    found = [(pos, i) for pos, i in positions if pos >= 0]
+    return recipes[min(found)[1]] if found else None
+
+
+def planned_dishes(prompt: str) -> set[tuple[str, str]]:
+    """(dish, variation) pairs of the exclusion signature in a request's already-planned section."""
+    if "already been planned" not in prompt:
+        return set()
+    section = prompt.split("already been planned", 1)[1]
+    planned = set()
+    for line in section.splitlines():
+        if not line.startswith("- "):
+            continue
+        dish, _, variations = line[2:].partition(":")
+        for variation in variations.split(";"):
+            variation = variation.strip()
+            planned.add((dish.strip(), "" if variation == "plain" else variation))
+    return planned
+
+
+def choose_recipe(prompt: str, recipes: list[dict] = RECIPES) -> dict:
+    """Pick a recorded recipe that fits the time limit and avoids already-planned meals."""
+    limit_match = re.search(r"(\d+) minutes or less", prompt)
+    time_limit = int(limit_match.group(1)) if limit_match else 60
+
+    planned = planned_dishes(prompt)
+
+    # Rotate the candidates by weekday so different days get different recipes
+    day_match = re.search(r"recipe for (\w+)", prompt)
+    day = day_match.group(1).lower() if day_match else ""
+    offset = DAYS_OF_WEEK.index(day) if day in DAYS_OF_WEEK else 0
+
+    fitting = [r for r in recipes if r["time_estimate"] <= time_limit] or [
+        min(recipes, key=lambda r: r["time_estimate"])
+    ]
+    fresh = [r for r in fitting if dish_key(r["name"]) not in planned] or fitting
+    return fresh[offset % len(fresh)]
+
+
+def choose_week(prompt: str, recipes: list[dict] = RECIPES) -> list[dict]:
+    """Distinct recorded recipes for every "- Day: N minutes or less, S serving(s)" line of a week request."""
+    planned = planned_dishes(prompt)
+
+    dinners = []
+    for day, time_limit, servings in re.findall(r"^- (\w+): (\d+) minutes or less, (\d+) serving", prompt, re.M):
+        fitting = [
+            r for r in recipes if r["time_estimate"] <= int(time_limit) and dish_key(r["name"]) not in planned
+        ]
+        if not fitting:
+            continue
+        recipe = fitting[DAYS_OF_WEEK.index(day.lower()) % len(fitting) if day.lower() in DAYS_OF_WEEK else 0]
+        planned.add(dish_key(recipe["name"]))
+        dinners.append({**_scaled(recipe, int(servings)), "day": day.lower()})
+    return dinners
+
+
+class FakeRateLimitError(Exception):
+    """429 from a fake provider whose simulated quota was exceeded."""
+
+    status_code = 429
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that answers the agent's prompts from recorded recipes.
+
+    It calls recipe_search first, then answers with recipe prose, a
+    ParsedRecipe or WeekPlan tool call or an ImageRelevance verdict
+    depending on which tools are bound, the same way the real models are
+    driven.
+    """
+
+    recipes: list[dict] = Field(default_factory=lambda: list(RECIPES))
+    latency: float = 0.0
+    # Calls allowed at the same time before the fake answers with a 429; 0 is unlimited
+    quota: int = 0
+
+    _quota_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _in_flight: int = PrivateAttr(default=0)
+
+    @contextlib.contextmanager
+    def _quota_slot(self) -> Iterator[None]:
+        with self._quota_lock:
+            if self.quota and self._in_flight >= self.quota:
+                raise FakeRateLimitError(f"Rate limit reached: {self.quota} concurrent requests")
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._quota_lock:
+                self._in_flight -= 1
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-meal-planner"
+
+    def bind_tools(self, tools: list, *, tool_choice: Any = None, **kwargs: Any):
+        converted = [convert_to_openai_tool(tool) for tool in tools]
+        # Like the real models: "none" forbids tool calls, a tool's name forces that tool
+        if tool_choice == "none":
+            converted = []
+        elif isinstance(tool_choice, str) and tool_choice not in ("auto", "any", "required"):
+            converted = [tool for tool in converted if tool["function"]["name"] == tool_choice]
+        return self.bind(tools=converted, **kwargs)
+
+    def _respond(self, messages: list[BaseMessage], tool_names: list[str]) -> AIMessage:
+        prompt = "\n".join(_message_text(m) for m in messages)
+        # Only searches made for the latest request count as this turn's results
+        last_request = max(
+            (i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=0
+        )
+        tool_results = [m for m in messages[last_request:] if isinstance(m, ToolMessage)]
+
+        if "WeekPlan" in tool_names:
+            return self._tool_call("WeekPlan", {"dinners": choose_week(prompt, self.recipes)}, prompt)
+
+        if "ImageRelevance" in tool_names:
+            name_match = re.search(r'match the recipe "(.+?)"', prompt)
+            description = prompt.split("Image description:", 1)[-1].lower()
+            is_relevant = bool(name_match) and name_match.group(1).lower() in description
+            return self._tool_call("ImageRelevance", {"is_relevant": is_relevant}, prompt)
+
+        if "recipe_search" in tool_names and not tool_results:
+            recipe = choose_recipe(prompt, self.recipes)
+            return self._tool_call("recipe_search", {"query": f"{recipe['name']} recipe"}, prompt)
+
+        # Without search results, answer the latest request, leaving out the
+        # meals it lists as already planned
+        request = "\n".join(_message_text(m) for m in messages[last_request:])
+        recipe = find_recipe(
+            "\n".join(_message_text(m) for m in tool_results) or request.split("already been planned", 1)[0],
+            self.recipes,
+        ) or choose_recipe(request, self.recipes)
+        servings_match = re.search(r"for (\d+) serving", prompt) or re.search(r"serve (\d+) person", prompt)
+        servings = int(servings_match.group(1)) if servings_match else 1
+
+        if "ParsedRecipe" in tool_names:
+            return self._tool_call("ParsedRecipe", _scaled(recipe, servings), prompt)
+
+        content = (
+            f"{recipe['name']}\n\nReady in {recipe['time_estimate']} minutes.\n\nIngredients:\n"
+            + "\n".join(
+                f"- {ing['quantity']} {ing['unit']} {ing['name']}" for ing in recipe["ingredients"]
+            )
+            + "\n\nInstructions:\n"
+            + "\n".join(f"{i}. {step}" for i, step in enumerate(recipe["instructions"], 1))
+        )
+        return AIMessage(content=content, usage_metadata=self._usage(prompt, content))
+
+    def _tool_call(self, name: str, args: dict, prompt: str) -> AIMessage:
+        call_id = f"call_{name}_{abs(hash((prompt, name))) % 10**8}"
+        return AIMessage(
+            content="",
+            tool_calls=[{"name": name, "args": args, "id": call_id}],
+            usage_metadata=self._usage(prompt, json.dumps(args)),
+        )
+
+    @staticmethod
+    def _usage(prompt: str, output: str) -> dict:
+        input_tokens = estimate_tokens(prompt)
+        output_tokens = estimate_tokens(output)
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        with self._quota_slot():
+            if self.latency:
+                time.sleep(self.latency)
+        tool_names = [tool["function"]["name"] for tool in kwargs.get("tools", [])]
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages, tool_names))])
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        with self._quota_slot():
+            if self.latency:
+                await asyncio.sleep(self.latency)
+        tool_names = [tool["function"]["name"] for tool in kwargs.get("tools", [])]
+        return ChatResult(generations=[ChatGeneration(message=self._respond(messages, tool_names))])
+
+    @staticmethod
+    def _chunks(message: AIMessage) -> list[AIMessageChunk]:
+        """Split a response into the chunks a streaming provider would send."""
+        def pieces(text: str) -> list[str]:
+            return [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)] or [""]
+
+        if message.tool_calls:
+            chunks = [
+                AIMessageChunk(content="", tool_call_chunks=[{
+                    "name": call["name"] if j == 0 else None,
+                    "args": piece,
+                    "id": call["id"] if j == 0 else None,
+                    "index": i,
+                }])
+                for i, call in enumerate(message.tool_calls)
+                for j, piece in enumerate(pieces(json.dumps(call["args"])))
+            ]
+        else:
+            chunks = [AIMessageChunk(content=piece) for piece in pieces(_message_text(message))]
+        chunks[-1].usage_metadata = message.usage_metadata
+        return chunks
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        # Half the latency passes before the first chunk, the rest between chunks
+        tool_names = [tool["function"]["name"] for tool in kwargs.get("tools", [])]
+        with self._quota_slot():
+            chunks = self._chunks(self._respond(messages, tool_names))
+            if self.latency:
+                time.sleep(self.latency / 2)
+            for chunk in chunks:
+                if self.latency:
+                    time.sleep(self.latency / 2 / len(chunks))
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.text, chunk=ChatGenerationChunk(message=chunk))
+                yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        tool_names = [tool["function"]["name"] for tool in kwargs.get("tools", [])]
+        with self._quota_slot():
+            chunks = self._chunks(self._respond(messages, tool_names))
+            if self.latency:
+                await asyncio.sleep(self.latency / 2)
+            for chunk in chunks:
+                if self.latency:
+                    await asyncio.sleep(self.latency / 2 / len(chunks))
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=ChatGenerationChunk(message=chunk))
+                yield ChatGenerationChunk(message=chunk)
+
+
+def _search(query: str, recipes: list[dict]) -> list[dict]:
+    """Search results for the recipes matching a query, best match first."""
+    recipe = find_recipe(query, recipes)
+    matches = [recipe] if recipe else []
+    matches += [r for r in recipes if r is not recipe]
+    results = []
+    for match in matches[:5]:
+        results.extend(search_results(match))
+    return results
+
+
+class FakeRecipeSearchTool(BaseTool):
+    """Offline recipe_search tool returning recorded Tavily-style results."""
+
+    name: str = "recipe_search"
+    description: str = (
+        "Search for recipes online. Use this to find dinner recipes based on "
+        "time constraints, ingredients to use up, or cuisine preferences. "
+        "Returns recipe names, URLs, and snippets."
+    )
+    recipes: list[dict] = Field(default_factory=lambda: list(RECIPES))
+    latency: float = 0.0
+
+    def _run(self, query: str) -> list[dict]:
+        if self.latency:
+            time.sleep(self.latency)
+        return _search(query, self.recipes)
+
+    async def _arun(self, query: str) -> list[dict]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return _search(query, self.recipes)
+
+
+def _image_response(query: str, recipes: list[dict]) -> dict:
+    recipe_name = query.removesuffix(" food recipe dish")
+    return {"results": _search(query, recipes)[:3], "images": image_results(recipe_name)}
+
+
+class FakeTavilyClient:
+    """Offline TavilyClient serving recorded results with configurable latency."""
+
+    def __init__(self, latency: float = 0.0, recipes: list[dict] = RECIPES):
+        self.latency = latency
+        self.recipes = recipes
+
+    def search(self, query: str, **kwargs: Any) -> dict:
+        if self.latency:
+            time.sleep(self.latency)
+        return _image_response(query, self.recipes)
+
+
+class FakeAsyncTavilyClient(FakeTavilyClient):
+    """Async version of FakeTavilyClient."""
+
+    async def search(self, query: str, **kwargs: Any) -> dict:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return _image_response(query, self.recipes)
+
+
+def fake_providers(
+    latency: float = 0.0,
+    search_latency: float = 0.0,
+    recipes: list[dict] = RECIPES,
+    quota: int = 0,
+) -> dict[str, Any]:
+    """Provider overrides replacing every external service with a fake.
+
+    `quota` limits the fake chat model's concurrent calls; calls over it fail with a 429.
+    """
+    return {
+        "chat_model": FakeChatModel(recipes=recipes, latency=latency, quota=quota),
+        "validation_model": FakeChatModel(recipes=recipes, latency=latency / 4),
+        "recipe_search_tool": FakeRecipeSearchTool(recipes=recipes, latency=search_latency),
+        "tavily_client": FakeTavilyClient(search_latency, recipes),
+        "async_tavily_client": FakeAsyncTavilyClient(search_latency, recipes),
+    }
+
+
+@contextlib.contextmanager
+def use_fake_providers(
+    latency: float = 0.0,
+    search_latency: float = 0.0,
+    recipes: list[dict] = RECIPES,
+    quota: int = 0,
+) -> Iterator[None]:
+    """Run the agent against the offline fakes for the duration of the block."""
+    with override_providers(**fake_providers(latency, search_latency, recipes, quota)):
+        yield
@@ -0,0 +1,236 @@
+"""Recorded recipes and search results replayed by the offline fakes.
+
+Recipes use the ParsedRecipe shape for one serving.
+"""
+
+
+def _ing(name: str, quantity: float, unit: str, category: str, is_fresh: bool = True) -> dict:
+    return {"name": name, "quantity": quantity, "unit": unit, "is_fresh": is_fresh, "category": category}
+
+
+RECIPES: list[dict] = [
+    {
+        "name": "Garlic Butter Shrimp Pasta",
+        "ingredients": [
+            _ing("shrimp", 0.25, "lb", "protein"),
+            _ing("pasta", 3, "oz", "grains", False),
+            _ing("garlic", 3, "clove", "aromatics"),
+            _ing("butter", 1, "tbsp", "dairy"),
+            _ing("parsley", 1, "tbsp", "aromatics"),
+            _ing("lemon", 0.5, "whole", "produce"),
+        ],
+        "instructions": [
+            "Boil the pasta until al dente.",
+            "Saute garlic in butter, add shrimp and cook 3 minutes.",
+            "Toss with pasta, lemon juice and parsley.",
+        ],
+        "time_estimate": 20,
+        "equipment": ["stovetop"],
+    },
+    {
+        "name": "Chicken Stir Fry",
+        "ingredients": [
+            _ing("chicken_breast", 0.5, "lb", "protein"),
+            _ing("bell_pepper", 1, "medium", "produce"),
+            _ing("broccoli", 1, "cup", "produce"),
+            _ing("soy_sauce", 2, "tbsp", "pantry", False),
+            _ing("ginger", 1, "tsp", "aromatics"),
+            _ing("rice", 0.5, "cup", "grains", False),
+        ],
+        "instructions": [
+            "Cook the rice.",
+            "Stir fry sliced chicken until browned.",
+            "Add vegetables, ginger and soy sauce; cook 5 minutes and serve over rice.",
+        ],
+        "time_estimate": 25,
+        "equipment": ["stovetop"],
+    },
+    {
+        "name": "Beef Tacos",
+        "ingredients": [
+            _ing("ground_beef", 0.33, "lb", "protein"),
+            _ing("tortillas", 3, "whole", "grains", False),
+            _ing("lettuce", 1, "cup", "produce"),
+            _ing("tomato", 1, "medium", "produce"),
+            _ing("cheddar_cheese", 1, "oz", "dairy"),
+            _ing("onion", 0.5, "medium", "aromatics"),
+        ],
+        "instructions": [
+            "Brown the beef with onion and season.",
+            "Warm the tortillas.",
+            "Fill with beef, lettuce, tomato and cheese.",
+        ],
+        "time_estimate": 20,
+        "equipment": ["stovetop"],
+    },
+    {
+        "name": "Sheet Pan Salmon with Asparagus",
+        "ingredients": [
+            _ing("salmon", 6, "oz", "protein"),
+            _ing("asparagus", 0.5, "bunch", "produce"),
+            _ing("lemon", 0.5, "whole", "produce"),
+            _ing("olive_oil", 1, "tbsp", "pantry", False),
+            _ing("dill", 1, "tsp", "aromatics"),
+        ],
+        "instructions": [
+            "Heat the oven to 400F.",
+            "Arrange salmon and asparagus on a sheet pan with oil, lemon and dill.",
+            "Roast 15 minutes.",
+        ],
+        "time_estimate": 25,
+        "equipment": ["oven"],
+    },
+    {
+        "name": "Spinach and Mushroom Omelette",
+        "ingredients": [
+            _ing("eggs", 3, "large", "protein"),
+            _ing("spinach", 1, "cup", "produce"),
+            _ing("mushrooms", 0.5, "cup", "produce"),
+            _ing("parmesan", 2, "tbsp", "dairy"),
+        ],
+        "instructions": [
+            "Saute mushrooms and spinach.",
+            "Pour in beaten eggs and cook until set.",
+            "Top with parmesan and fold.",
+        ],
+        "time_estimate": 15,
+        "equipment": ["stovetop"],
+    },
+    {
+        "name": "Pork Chops with Green Beans",
+        "ingredients": [
+            _ing("pork_chops", 0.5, "lb", "protein"),
+            _ing("green_beans", 0.25, "lb", "produce"),
+            _ing("garlic", 2, "clove", "aromatics"),
+            _ing("potato", 0.5, "lb", "produce"),
+        ],
+        "instructions": [
+            "Roast the potatoes for 25 minutes.",
+            "Sear the pork chops 5 minutes per side.",
+            "Saute green beans with garlic and serve.",
+        ],
+        "time_estimate": 40,
+        "equipment": ["stovetop", "oven"],
+    },
+    {
+        "name": "Vegetable Fried Rice",
+        "ingredients": [
+            _ing("rice", 1, "cup", "grains", False),
+            _ing("eggs", 2, "large", "protein"),
+            _ing("carrot", 1, "medium", "produce"),
+            _ing("green_onion", 2, "tbsp", "aromatics"),
+            _ing("soy_sauce", 1, "tbsp", "pantry", False),
+        ],
+        "instructions": [
+            "Scramble the eggs and set aside.",
+            "Fry cooked rice with diced carrot.",
+            "Stir in eggs, green onion and soy sauce.",
+        ],
+        "time_estimate": 20,
+        "equipment": ["stovetop"],
+    },
+    {
+        "name": "Baked Chicken Thighs with Potatoes",
+        "ingredients": [
+            _ing("chicken_thighs", 0.5, "lb", "protein"),
+            _ing("potato", 0.5, "lb", "produce"),
+            _ing("rosemary", 1, "tsp", "aromatics", False),
+            _ing("lemon", 0.5, "whole", "produce"),
+        ],
+        "instructions": [
+            "Heat the oven to 425F.",
+            "Toss chicken and potatoes with rosemary and lemon.",
+            "Bake 40 minutes.",
+        ],
+        "time_estimate": 50,
+        "equipment": ["oven"],
+    },
+    {
+        "name": "Caprese Pasta Salad",
+        "ingredients": [
+            _ing("pasta", 3, "oz", "grains", False),
+            _ing("tomato", 1, "medium", "produce"),
+            _ing("mozzarella", 2, "oz", "dairy"),
+            _ing("basil_fresh", 2, "tbsp", "aromatics"),
+        ],
+        "instructions": [
+            "Cook and cool the pasta.",
+            "Toss with tomato, mozzarella and basil.",
+        ],
+        "time_estimate": 15,
+        "equipment": ["stovetop"],
+    },
+    {
+        "name": "Steak and Broccoli",
+        "ingredients": [
+            _ing("steak", 0.5, "lb", "protein"),
+            _ing("broccoli", 1, "cup", "produce"),
+            _ing("garlic", 2, "clove", "aromatics"),
+        ],
+        "instructions": [
+            "Sear the steak to your liking and rest it.",
+            "Saute broccoli with garlic.",
+        ],
+        "time_estimate": 25,
+        "equipment": ["stovetop"],
+    },
+    {
+        "name": "Black Bean Quesadillas",
+        "ingredients": [
+            _ing("tortillas", 2, "whole", "grains", False),
+            _ing("canned_beans", 0.5, "cup", "pantry", False),
+            _ing("cheddar_cheese", 2, "oz", "dairy"),
+            _ing("bell_pepper", 0.5, "medium", "produce"),
+            _ing("cilantro", 1, "tbsp", "aromatics"),
+        ],
+        "instructions": [
+            "Fill tortillas with beans, cheese and pepper.",
+            "Cook in a skillet until golden on both sides.",
+            "Top with cilantro.",
+        ],
+        "time_estimate": 15,
+        "equipment": ["stovetop"],
+    },
+    {
+        "name": "Slow Simmered Beef Chili",
+        "ingredients": [
+            _ing("ground_beef", 0.5, "lb", "protein"),
+            _ing("canned_tomatoes", 1, "cup", "pantry", False),
+            _ing("canned_beans", 0.5, "cup", "pantry", False),
+            _ing("onion", 1, "medium", "aromatics"),
+        ],
+        "instructions": [
+            "Brown beef with onion.",
+            "Add tomatoes and beans and simmer 60 minutes.",
+        ],
+        "time_estimate": 75,
+        "equipment": ["stovetop"],
+    },
+]
+
+
+def _slug(name: str) -> str:
+    return name.lower().replace(" ", "-")
+
+
+def search_results(recipe: dict) -> list[dict]:
+    """Tavily-style search results for a recipe."""
+    ingredient_names = ", ".join(ing["name"].replace("_", " ") for ing in recipe["ingredients"])
+    return [
+        {
+            "url": f"https://recipes.example.com/{_slug(recipe['name'])}",
+            "title": recipe["name"],
+            "content": (
+                f"{recipe['name']} - ready in {recipe['time_estimate']} minutes. "
+                f"Ingredients: {ingredient_names}. " + " ".join(recipe["instructions"])
+            ),
+        }
+    ]
+
+
+def image_results(recipe_name: str) -> list[dict]:
+    """Tavily-style images for a recipe: one unrelated and one matching description."""
+    return [
+        {"url": f"https://images.example.com/{_slug(recipe_name)}-kitchen.jpg", "description": "An empty kitchen counter"},
+        {"url": f"https://images.example.com/{_slug(recipe_name)}.jpg", "description": f"A plate of {recipe_name.lower()}"},
+    ]
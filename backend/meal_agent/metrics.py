@@ -0,0 +1,377 @@
+"""Per-run and process-wide timing and token metrics for the meal planner agent.
+
+Every graph node is wrapped with `instrumented`. While a node runs, a callback
+handler records each model and tool call made beneath it; the node then adds
+its figures to the `metrics` state key, so they appear in the stream next to
+the node's other updates and are summed for the whole run:
+
+    {
+        "nodes": {"generate_meal": {"calls": 1, "seconds": 1.2}},
+        "calls": {"llm:gpt-4o": {"calls": 1, "errors": 0, "seconds": 1.2,
+                                 "input_tokens": 410, "output_tokens": 25}},
+        "days": {"monday": {"tool_iterations": 1, "retries": 0}},
+        "retries": {"reparse": 0, "duplicate_replan": 0},
+        "prompts": {"generation": {"calls": 1, "static_tokens": 190,
+                                   "context_tokens": 60, "dropped_items": 0}},
+    }
+
+`cached_input_tokens` counts input tokens the provider served from its
+prompt cache; divided by `input_tokens` it gives the cache hit rate.
+
+The same observations feed process-wide histograms, exported in the
+Prometheus text format by `prometheus_text()`.
+"""
+
+import contextlib
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from collections.abc import Iterator
+from contextvars import ContextVar
+from typing import Any
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import ensure_config
+from langchain_core.tracers.context import register_configure_hook
+
+from meal_agent.configuration import Configuration
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Histogram bucket upper bounds in bytes, for checkpoint sizes
+BYTE_BUCKETS = (1_000, 4_000, 16_000, 64_000, 256_000, 1_000_000, 4_000_000)
+
+
+def merge_metrics(left: dict | None, right: dict | None) -> dict:
+    """State reducer: recursively add the numbers of two metrics dicts."""
+    if not left:
+        return dict(right or {})
+    if not right:
+        return dict(left)
+    merged = dict(left)
+    for key, value in right.items():
+        if isinstance(value, dict):
+            merged[key] = merge_metrics(merged.get(key), value)
+        elif isinstance(value, (int, float)):
+            merged[key] = merged.get(key, 0) + value
+        else:
+            merged[key] = value
+    return merged
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram keyed by label values."""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...], buckets: tuple[float, ...] = BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series: dict[tuple[str, ...], list[float]] = {}  # labels -> bucket counts + [sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple[str, ...], value: float) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                label_text = ",".join(f'{name}="{value}"' for name, value in zip(self.label_names, labels))
+                prefix = f"{label_text}," if label_text else ""
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {count:g}')
+                lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {series[-1]:g}')
+                lines.append(f"{self.name}_sum{{{label_text}}} {series[-2]:.6f}")
+                lines.append(f"{self.name}_count{{{label_text}}} {series[-1]:g}")
+        return lines
+
+
+class Counter:
+    """Monotonic Prometheus-style counter keyed by label values."""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple[str, ...], amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                label_text = ",".join(f'{name}="{value}"' for name, value in zip(self.label_names, labels))
+                lines.append(f"{self.name}{{{label_text}}} {value:g}")
+        return lines
+
+
+NODE_SECONDS = Histogram("meal_planner_node_seconds", "Wall time of graph nodes.", ("node",))
+CALL_SECONDS = Histogram("meal_planner_call_seconds", "Wall time of model, tool and Tavily calls.", ("call",))
+CALL_ERRORS = Counter("meal_planner_call_errors_total", "Failed model, tool and Tavily calls.", ("call",))
+TOKENS = Counter("meal_planner_tokens_total", "Model tokens by direction.", ("call", "direction"))
+CACHED_TOKENS = Counter(
+    "meal_planner_cached_input_tokens_total", "Model input tokens served from the provider prompt cache.", ("call",)
+)
+PROMPT_TOKENS = Counter(
+    "meal_planner_prompt_tokens_total", "Estimated prompt tokens by prompt and part (static or context).", ("prompt", "part")
+)
+PROMPT_ITEMS_DROPPED = Counter(
+    "meal_planner_prompt_items_dropped_total", "List entries left out of prompts to fit the token budget.", ("prompt",)
+)
+RETRIES = Counter("meal_planner_retries_total", "Regenerations and re-parses.", ("reason",))
+TOOL_ITERATIONS = Counter("meal_planner_tool_iterations_total", "Search rounds made while planning days.", ())
+SCHEDULER_WAIT = Histogram(
+    "meal_planner_scheduler_wait_seconds", "Time provider calls waited for the rate limiter.", ("provider", "priority")
+)
+RATE_LIMITED = Counter("meal_planner_rate_limited_total", "Provider calls retried after a 429.", ("provider",))
+TRANSIENT_RETRIES = Counter(
+    "meal_planner_transient_retries_total",
+    "Provider calls retried after a timeout, connection error or 408/409/5xx response.",
+    ("provider",),
+)
+FIRST_VISIBLE = Histogram(
+    "meal_planner_first_visible_seconds", "Time from the start of a run until its first meal or partial meal was shown.", ()
+)
+CHECKPOINT_BYTES = Histogram(
+    "meal_planner_checkpoint_bytes",
+    "Serialized size of checkpoints (part=checkpoint) and of the node writes saved with them (part=write).",
+    ("part",),
+    BYTE_BUCKETS,
+)
+
+_METRICS = (
+    NODE_SECONDS, CALL_SECONDS, CALL_ERRORS, TOKENS, CACHED_TOKENS,
+    PROMPT_TOKENS, PROMPT_ITEMS_DROPPED, RETRIES, TOOL_ITERATIONS,
+    SCHEDULER_WAIT, RATE_LIMITED, TRANSIENT_RETRIES, FIRST_VISIBLE, CHECKPOINT_BYTES,
+)
+
+
+def prometheus_text() -> str:
+    """Process-wide metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class NodeRecorder(BaseCallbackHandler):
+    """Collects the calls made while one node runs.
+
+    Installed for the node's duration through a configure hook, so every
+    model and tool run started beneath the node reports to it, including
+    runs on worker threads that copy the node's context.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started: dict[UUID, tuple[str, float]] = {}  # run id -> (call, start)
+        self.metrics: dict[str, Any] = {}
+
+    def _add(self, *path_and_counts: Any, **counts: float) -> None:
+        with self._lock:
+            self.metrics = merge_metrics(self.metrics, _nested(path_and_counts, counts))
+
+    def record_call(
+        self,
+        call: str,
+        seconds: float,
+        error: bool = False,
+        input_tokens: int = 0,
+        output_tokens: int = 0,
+        cached_input_tokens: int = 0,
+    ) -> None:
+        """Record one external call, e.g. "tavily:search"."""
+        self._add(
+            "calls", call,
+            calls=1, errors=int(error), seconds=seconds, input_tokens=input_tokens, output_tokens=output_tokens,
+            cached_input_tokens=cached_input_tokens,
+        )
+        CALL_SECONDS.observe((call,), seconds)
+        if error:
+            CALL_ERRORS.inc((call,))
+        if input_tokens:
+            TOKENS.inc((call, "input"), input_tokens)
+        if output_tokens:
+            TOKENS.inc((call, "output"), output_tokens)
+        if cached_input_tokens:
+            CACHED_TOKENS.inc((call,), cached_input_tokens)
+
+    def _start(self, run_id: UUID, call: str) -> None:
+        with self._lock:
+            self._started[run_id] = (call, time.perf_counter())
+
+    def _end(self, run_id: UUID, error: bool = False, **tokens: int) -> None:
+        with self._lock:
+            started = self._started.pop(run_id, None)
+        if started is not None:
+            call, start = started
+            self.record_call(call, time.perf_counter() - start, error, **tokens)
+
+    def on_chat_model_start(
+        self, serialized: dict[str, Any], messages: list, *, run_id: UUID, metadata: dict[str, Any] | None = None, **kwargs: Any
+    ) -> None:
+        model = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name") or "chat_model"
+        self._start(run_id, f"llm:{model}")
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        input_tokens = output_tokens = cached_input_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+                cached_input_tokens += (usage.get("input_token_details") or {}).get("cache_read", 0)
+        self._end(
+            run_id, input_tokens=input_tokens, output_tokens=output_tokens, cached_input_tokens=cached_input_tokens
+        )
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error=True)
+
+    def on_tool_start(self, serialized: dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, f"tool:{kwargs.get('name') or (serialized or {}).get('name') or 'tool'}")
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error=True)
+
+
+def _nested(path: tuple, counts: dict) -> dict:
+    """{"a": {"b": counts}} for path ("a", "b")."""
+    nested = counts
+    for key in reversed(path):
+        nested = {key: nested}
+    return nested
+
+
+_recorder: ContextVar[NodeRecorder | None] = ContextVar("meal_planner_node_recorder", default=None)
+register_configure_hook(_recorder, inheritable=True)
+
+
+def record_day(day: str, **counts: int) -> None:
+    """Add per-day counts (tool_iterations, retries, search_tokens_saved) to the running node's metrics."""
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder._add("days", day, **counts)
+    if counts.get("tool_iterations"):
+        TOOL_ITERATIONS.inc((), counts["tool_iterations"])
+
+
+def record_retry(day: str, reason: str) -> None:
+    """Count a regeneration or re-parse for `day`."""
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder._add("retries", **{reason: 1})
+    record_day(day, retries=1)
+    RETRIES.inc((reason,))
+
+
+def record_prompt(prompt: str, static_tokens: int, context_tokens: int, dropped_items: int = 0) -> None:
+    """Record the estimated size of an assembled prompt (see meal_agent.prompts)."""
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder._add(
+            "prompts", prompt,
+            calls=1, static_tokens=static_tokens, context_tokens=context_tokens, dropped_items=dropped_items,
+        )
+    PROMPT_TOKENS.inc((prompt, "static"), static_tokens)
+    PROMPT_TOKENS.inc((prompt, "context"), context_tokens)
+    if dropped_items:
+        PROMPT_ITEMS_DROPPED.inc((prompt,), dropped_items)
+
+
+def record_checkpoint(part: str, size: int) -> None:
+    """Observe the serialized size of a checkpoint ("checkpoint") or of one node write ("write")."""
+    CHECKPOINT_BYTES.observe((part,), size)
+
+
+@contextlib.contextmanager
+def timed_call(call: str) -> Iterator[None]:
+    """Time an external call that does not go through LangChain, e.g. a Tavily client."""
+    recorder = _recorder.get()
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        if recorder is not None:
+            recorder.record_call(call, time.perf_counter() - start, error)
+
+
+def _enter_node() -> tuple[str, NodeRecorder, contextvars.Token] | None:
+    config = ensure_config()
+    if not Configuration.from_runnable_config(config).collect_metrics:
+        return None
+    node = config.get("metadata", {}).get("langgraph_node", "unknown")
+    recorder = NodeRecorder()
+    return node, recorder, _recorder.set(recorder)
+
+
+def _exit_node(scope: tuple[str, NodeRecorder, contextvars.Token], start: float, result: Any) -> Any:
+    node, recorder, token = scope
+    _recorder.reset(token)
+    seconds = time.perf_counter() - start
+    NODE_SECONDS.observe((node,), seconds)
+    if not isinstance(result, dict):
+        return result
+    recorder._add("nodes", node, calls=1, seconds=seconds)
+    return {**result, "metrics": recorder.metrics}
+
+
+def instrumented(func):
+    """Record a node's wall time and calls and add them to its `metrics` update."""
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            scope = _enter_node()
+            if scope is None:
+                return await func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = await func(*args, **kwargs)
+            except BaseException:
+                _exit_node(scope, start, None)
+                raise
+            return _exit_node(scope, start, result)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        scope = _enter_node()
+        if scope is None:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException:
+            _exit_node(scope, start, None)
+            raise
+        return _exit_node(scope, start, result)
+
+    return wrapper
@@ -0,0 +1,257 @@
+"""Deterministic menu optimizer over a pool of already-parsed recipes.
+
+Picks one recipe per day from recipes the planner already knows (the recipe
+cache and the local corpus) without calling a model. Fresh ingredients are
+bought in whole store packages (STANDARD_PURCHASE_UNITS via the catalog),
+so the optimizer chooses the combination of recipes that leaves the least
+of those packages unused at the end of the week. Fresh ingredients already
+bought for the meals on the menu are counted first, so a recipe that uses
+them up beats one that needs nothing fresh. Ingredients measured by volume
+in a recipe but sold by weight (or the other way round) are converted with
+GRAMS_PER_CUP so they count toward the same package.
+
+Recipes are scored as columns of a fresh-ingredient x recipe matrix, so
+trying every candidate for a day is one NumPy expression. The menu is built
+greedily, most constrained day first, then improved one day at a time until
+no single swap reduces the leftovers. Recipes whose time is unknown are never
+chosen, since they may not fit a day's time limit, and neither are near-
+duplicates (meal_agent.similarity) of meals already planned or chosen. Days
+the pool cannot fill are left to the model.
+"""
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+import numpy as np
+
+from meal_agent.cache import normalize_name
+from meal_agent.catalog import ingredient_key, resolve_ingredient
+from meal_agent.quantities import in_package_unit, package_amount, to_canonical
+from meal_agent.similarity import MealIndex, MealSignature, near_duplicate
+
+# Passes of single-day improvements after the greedy menu
+MAX_IMPROVEMENT_PASSES = 4
+
+
+@dataclass
+class RecipePool:
+    """Candidate recipes and their fresh ingredient use per serving."""
+
+    recipes: list[dict]
+    # (ingredient, canonical unit) of each matrix row
+    rows: list[tuple[str, str]]
+    # Amount in one package for each row
+    packages: np.ndarray
+    # rows x recipes, amount used by one serving
+    per_serving: np.ndarray
+    # Minutes per recipe; inf when unknown, so no time limit admits it
+    times: np.ndarray
+    # What each recipe is compared by for near-duplicates
+    signatures: list[MealSignature]
+
+    def __len__(self) -> int:
+        return len(self.recipes)
+
+
+def _clean_recipe(recipe: dict) -> dict | None:
+    """ParsedRecipe-shaped copy of a pool recipe, or None when it is incomplete."""
+    if not recipe.get("name") or not recipe.get("ingredients") or not recipe.get("instructions"):
+        return None
+    ingredients = []
+    for ing in recipe["ingredients"]:
+        if not isinstance(ing, dict) or not ing.get("name"):
+            continue
+        ingredients.append({
+            "name": ing["name"],
+            "quantity": float(ing.get("quantity") or 0),
+            "unit": ing.get("unit") or "",
+            "is_fresh": bool(ing.get("is_fresh", False)),
+            "category": ing.get("category") or "",
+        })
+    return {
+        "name": recipe["name"],
+        "ingredients": ingredients,
+        "instructions": list(recipe["instructions"]),
+        "time_estimate": int(recipe["time_estimate"]) if recipe.get("time_estimate") is not None else None,
+        "equipment": list(recipe.get("equipment") or []),
+        "servings": max(1, int(recipe.get("servings") or 1)),
+    }
+
+
+def _fresh_use(recipe: dict) -> dict[tuple[str, str], float]:
+    """(ingredient, canonical unit) -> amount per serving for the recipe's packaged fresh ingredients."""
+    use: dict[tuple[str, str], float] = {}
+    for ing in recipe["ingredients"]:
+        key = ingredient_key(ing["name"])
+        entry = resolve_ingredient(key)
+        if entry is not None and entry.is_staple:
+            continue
+        is_fresh = entry.is_fresh if entry is not None and entry.is_fresh is not None else ing["is_fresh"]
+        if not is_fresh:
+            continue
+        name = entry.name if entry is not None else key
+        unit, amount = in_package_unit(name, *to_canonical(ing["quantity"], ing["unit"]))
+        row = (name, unit)
+        use[row] = use.get(row, 0.0) + amount / recipe["servings"]
+    return use
+
+
+def _row_package(row: tuple[str, str]) -> float | None:
+    """Package size for a matrix row; loose produce counted by the piece is bought one at a time."""
+    name, unit = row
+    package = package_amount(name)
+    if package is not None:
+        return package[1] if package[0] == unit else None
+    return 1.0 if unit == "count" else None
+
+
+def build_pool(recipes: Iterable[dict], max_size: int = 500) -> RecipePool:
+    """Index up to `max_size` distinct recipes for plan_menu."""
+    cleaned: list[dict] = []
+    uses: list[dict[tuple[str, str], float]] = []
+    seen: set[str] = set()
+    packages: dict[tuple[str, str], float] = {}
+    for recipe in recipes:
+        if len(cleaned) >= max_size:
+            break
+        recipe = _clean_recipe(recipe)
+        if recipe is None or normalize_name(recipe["name"]) in seen:
+            continue
+        seen.add(normalize_name(recipe["name"]))
+        use = {}
+        for row, amount in _fresh_use(recipe).items():
+            if row not in packages:
+                package = _row_package(row)
+                if package is None:
+                    # Bought by weight or volume as needed, so nothing is left over
+                    continue
+                packages[row] = package
+            use[row] = amount
+        cleaned.append(recipe)
+        uses.append(use)
+
+    rows = list(packages)
+    row_index = {row: i for i, row in enumerate(rows)}
+    per_serving = np.zeros((len(rows), len(cleaned)))
+    for j, use in enumerate(uses):
+        for row, amount in use.items():
+            per_serving[row_index[row], j] = amount
+    return RecipePool(
+        recipes=cleaned,
+        rows=rows,
+        packages=np.array([packages[row] for row in rows]),
+        per_serving=per_serving,
+        times=np.array([
+            np.inf if recipe["time_estimate"] is None else recipe["time_estimate"] for recipe in cleaned
+        ], dtype=float),
+        signatures=[MealSignature.of(recipe) for recipe in cleaned],
+    )
+
+
+def inventory_use(shopping_totals: dict[str, dict], fresh_inventory: dict[str, float]) -> dict[tuple[str, str], float]:
+    """(ingredient, unit) -> amount of the fresh ingredients the meals already on the menu use."""
+    use: dict[tuple[str, str], float] = {}
+    for name in fresh_inventory:
+        item = shopping_totals.get(name)
+        if item is None:
+            continue
+        for unit, amount in item["amounts"].items():
+            unit, amount = in_package_unit(name, unit, amount)
+            use[(name, unit)] = use.get((name, unit), 0.0) + amount
+    return use
+
+
+def leftover(totals: np.ndarray, packages: np.ndarray) -> np.ndarray:
+    """Unused package fractions summed over ingredients, for each column of `totals`.
+
+    `totals` holds the week's amount of each ingredient (rows) for one or
+    more candidate menus (columns); each ingredient is bought in whole packages.
+    """
+    sizes = packages[:, None] if totals.ndim == 2 else packages
+    bought = np.ceil(totals / sizes - 1e-9)
+    return (bought - totals / sizes).sum(axis=0)
+
+
+def _scaled(recipe: dict, servings: int) -> dict:
+    """Pool recipe with quantities scaled to `servings`, without the pool-only servings field."""
+    factor = servings / recipe["servings"]
+    scaled = {key: value for key, value in recipe.items() if key != "servings"}
+    scaled["ingredients"] = [
+        {**ing, "quantity": round(ing["quantity"] * factor, 2)} for ing in recipe["ingredients"]
+    ]
+    return scaled
+
+
+def _pick(scores: np.ndarray, pool: RecipePool, chosen: Iterable[int]) -> int | None:
+    """Best-scoring finite candidate that is not a near-duplicate of the `chosen` recipes."""
+    others = [pool.signatures[j] for j in chosen]
+    for j in np.argsort(scores, kind="stable"):
+        if not np.isfinite(scores[j]):
+            return None
+        if not any(near_duplicate(pool.signatures[j], other) for other in others):
+            return int(j)
+    return None
+
+
+def plan_menu(
+    days: list[tuple[str, int, int]],
+    pool: RecipePool,
+    exclude: Iterable[dict | str] = (),
+    on_hand: dict[tuple[str, str], float] | None = None,
+) -> dict[str, dict]:
+    """Choose distinct pool recipes for (day, time limit, servings) constraints.
+
+    `exclude` holds the meals already planned (MealInfo or recipe dicts, or
+    names) and `on_hand` the fresh ingredients they use, as from inventory_use.
+    Returns day -> recipe scaled to the day's servings for every day the pool
+    can fill; days with no unused recipe within their time limit are omitted.
+    """
+    if not days or not len(pool):
+        return {}
+
+    planned = MealIndex(exclude)
+    allowed = np.array([planned.duplicate_of(recipe) is None for recipe in pool.recipes])
+    limits = np.array([time_limit for _, time_limit, _ in days])
+    feasible = (pool.times[None, :] <= limits[:, None]) & allowed[None, :]
+    servings = [servings for _, _, servings in days]
+    uses = [pool.per_serving * s for s in servings]  # per day: rows x recipes at that day's servings
+
+    chosen: dict[int, int] = {}  # day position -> recipe column
+    used = np.zeros(len(pool), dtype=bool)
+    # Packages opened for the meals already planned are bought whatever is chosen
+    totals = np.array([(on_hand or {}).get(row, 0.0) for row in pool.rows])
+
+    # Greedy: the day with the fewest options picks first
+    for d in np.argsort(feasible.sum(axis=1), kind="stable"):
+        candidates = feasible[d] & ~used
+        if not candidates.any():
+            continue
+        scores = np.where(candidates, leftover(totals[:, None] + uses[d], pool.packages), np.inf)
+        best = _pick(scores, pool, chosen.values())
+        if best is None:
+            continue
+        chosen[int(d)] = best
+        used[best] = True
+        totals += uses[d][:, best]
+
+    # Improve one day at a time while any swap leaves less over
+    current = float(leftover(totals, pool.packages))
+    for _ in range(MAX_IMPROVEMENT_PASSES):
+        improved = False
+        for d, recipe in list(chosen.items()):
+            base = totals - uses[d][:, recipe]
+            candidates = feasible[d] & ~used
+            candidates[recipe] = True
+            scores = np.where(candidates, leftover(base[:, None] + uses[d], pool.packages), np.inf)
+            best = _pick(scores, pool, (r for other, r in chosen.items() if other != d))
+            if best is not None and scores[best] < current - 1e-9:
+                used[recipe] = False
+                used[best] = True
+                chosen[d] = best
+                totals = base + uses[d][:, best]
+                current = float(scores[best])
+                improved = True
+        if not improved:
+            break
+
+    return {days[d][0]: _scaled(pool.recipes[r], servings[d]) for d, r in sorted(chosen.items())}
@@ -0,0 +1,237 @@
+"""Prompt assembly for the meal planner agent.
+
+Every prompt is a static system message followed by the per-call context.
+The system messages never change between days or runs; anything that varies
+(day, time limit, servings, inventory, planned meals, recipe text) goes in
+the final human message. The system messages are a few hundred tokens, well
+under the 1024-token minimum for OpenAI's prompt caching, and no
+cache_control is sent to Anthropic, so they are not served from a cache.
+
+Meals planned for other days are listed as an exclusion signature (see
+meal_agent.similarity): one line per main dish with the variations already
+taken, which is shorter than the recipe titles and also rules out close
+variations of them.
+
+The inventory and planned-meal lists grow with the week, so they are fitted
+to a token budget: inventory is cut to ingredient names and then truncated,
+largest quantities first, and planned dishes beyond the budget are counted
+instead of listed.
+"""
+
+from dataclasses import dataclass
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from meal_agent.similarity import exclusion_signature
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for budgeting."""
+    return max(1, len(text) // 4)
+
+
+# Extraction and formatting rules shared by the parse prompt and single-pass generation
+RECIPE_FORMAT_RULES = """Extract:
+1. Recipe name
+2. All ingredients with precise quantities, PROPER UNITS, and category
+3. Step-by-step instructions
+4. Mark each ingredient as fresh (spoils within a week) or not
+5. Total time estimate in minutes (prep + cooking)
+6. Required equipment (choose from: 'stovetop', 'oven', 'air_fryer', 'microwave', 'no_cook')
+
+CRITICAL - Unit formatting rules:
+- Meats/proteins: use weight (lb or oz). Example: "0.5 lb chicken_breast", "4 oz salmon"
+- Garlic: use "clove" not whole heads. Example: "2 clove garlic"
+- Onions/peppers/tomatoes: use "medium" or "large" or weight. Example: "1 medium onion"
+- Liquids: use volume (cup, tbsp, tsp). Example: "0.25 cup soy_sauce"
+- Cheese: use weight or volume. Example: "0.25 cup parmesan" or "2 oz cheddar"
+- Herbs: use "tbsp" for chopped or "sprig" for whole. Example: "2 tbsp cilantro"
+- Pasta/rice/grains: use weight or volume. Example: "4 oz pasta" or "0.5 cup rice"
+
+CRITICAL - Ingredient categories:
+- produce: vegetables, fruits (spinach, tomato, lemon, bell_pepper)
+- protein: meats, fish, tofu, eggs (chicken_breast, ground_beef, salmon, eggs)
+- dairy: milk, cheese, butter, cream (parmesan, cheddar, butter, heavy_cream)
+- grains: pasta, rice, bread, flour (pasta, rice, bread_crumbs)
+- pantry: canned goods, sauces, condiments (soy_sauce, chicken_broth, olive_oil)
+- aromatics: garlic, onion, ginger, shallot, herbs (garlic, onion, ginger, basil)
+
+For ingredient names, use lowercase with underscores (e.g., 'ground_beef', 'bell_pepper', 'garlic').
+Common fresh items: meat, poultry, fish, vegetables, fruits, dairy, eggs, fresh herbs.
+Non-fresh: canned goods, pasta, rice, dried spices, condiments."""
+
+GENERATION_PROMPT = """You are a helpful meal planning assistant. Your task is to find and suggest a dinner recipe.
+
+Requirements:
+- The recipe must take no longer than the time limit in the request (prep + cooking time)
+- The recipe should serve the number of people in the request
+- Choose recipes with commonly available ingredients
+- Prefer simple, home-cooked meals
+- When the request lists fresh ingredients remaining, STRONGLY prefer recipes that use them up to avoid waste
+- When the request lists meals already planned for other days, you MUST choose a DIFFERENT recipe
+
+Use the recipe_search tool to find a recipe, then provide complete details including:
+- Recipe name
+- Full ingredient list with quantities
+- Step-by-step cooking instructions"""
+
+# Appended to GENERATION_PROMPT in single-pass mode; {tool} is the structured output tool
+SINGLE_PASS_PROMPT = """
+
+Once you have found the recipe, answer by calling the {tool} tool instead of writing it out.
+Scale all ingredient quantities for the servings in the request.
+
+""" + RECIPE_FORMAT_RULES
+
+WEEK_PROMPT = """You are a helpful meal planning assistant. Plan dinners for several days of a week at once.
+
+Requirements:
+- Return exactly one dinner for each day in the request, with its day name
+- Each dinner must take no longer than that day's time limit (prep + cooking time)
+- Scale each dinner's ingredient quantities for that day's servings
+- Every dinner must be a DIFFERENT recipe, and different from any meals already planned in the request
+- Plan the days together so fresh ingredients bought for one dinner are used up by the others
+  (e.g. the rest of a bag of spinach or a bunch of cilantro), and STRONGLY prefer using any fresh
+  ingredients the request lists as remaining
+- Choose well-known home-cooked recipes with commonly available ingredients
+
+""" + RECIPE_FORMAT_RULES
+
+PARSE_PROMPT = """Parse the recipe information in the request into a structured format.
+Scale all ingredient quantities for the servings in the request.
+
+""" + RECIPE_FORMAT_RULES
+
+
+# Heads the exclusion signature of meals planned for other days
+PLANNED_HEADER = "Dishes that have already been planned (dish: variations); pick a clearly different dish:"
+
+
+@dataclass
+class Prompt:
+    """Assembled messages and their estimated size."""
+
+    messages: list
+    static_tokens: int
+    context_tokens: int
+    # Inventory and planned-meal entries left out to fit the budget
+    dropped_items: int = 0
+
+
+def fit_lines(lines: list[str], budget: int) -> tuple[list[str], int]:
+    """Leading lines that fit in `budget` tokens, and how many were left out."""
+    kept: list[str] = []
+    used = 0
+    for line in lines:
+        cost = estimate_tokens(line + "\n")
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return kept, len(lines) - len(kept)
+
+
+def _inventory_section(fresh_inventory: dict[str, float], budget: int) -> tuple[str, int]:
+    """Inventory to use up, largest quantities first, shortened to fit `budget`."""
+    items = sorted(
+        ((name, qty) for name, qty in fresh_inventory.items() if qty > 0.1), key=lambda item: -item[1]
+    )
+    if not items:
+        return "", 0
+    header = "Fresh ingredients remaining that should be used up:"
+    lines = [f"- {name}: {qty:.2f}" for name, qty in items]
+    if estimate_tokens("\n".join(lines)) <= budget:
+        return "\n".join([header, *lines]), 0
+
+    # Summarize: names only, then as many as fit
+    names, dropped = fit_lines([name for name, _ in items], budget)
+    summary = ", ".join(names)
+    if dropped:
+        summary += f" (and {dropped} more)"
+    return f"{header}\n- {summary}", dropped
+
+
+def _planned_section(planned_meals: list[str], budget: int) -> tuple[str, int]:
+    """Dishes planned for other days, as many as fit `budget`."""
+    if not planned_meals:
+        return "", 0
+    lines, dropped = fit_lines([f"- {dish}" for dish in exclusion_signature(planned_meals)], budget)
+    if dropped:
+        lines.append(f"- ... and {dropped} more")
+    return "\n".join([PLANNED_HEADER, *lines]), dropped
+
+
+def _split_budget(planned_meals: list[str], fresh_inventory: dict[str, float], budget: int) -> tuple[int, int]:
+    """Share of the budget for planned meals and inventory; either may use what the other leaves."""
+    planned_need = sum(estimate_tokens(f"- {dish}\n") for dish in exclusion_signature(planned_meals))
+    inventory_need = sum(
+        estimate_tokens(f"- {name}: {qty:.2f}\n") for name, qty in fresh_inventory.items() if qty > 0.1
+    )
+    planned_budget = min(planned_need, max(budget // 2, budget - inventory_need))
+    return planned_budget, budget - planned_budget
+
+
+def generation_prompt(
+    system_prompt: str,
+    day: str,
+    time_limit: int,
+    servings: int,
+    fresh_inventory: dict[str, float],
+    planned_meals: list[str],
+    context_budget: int,
+) -> Prompt:
+    """Static system prompt plus the day's request, with its lists fitted to `context_budget` tokens."""
+    planned_budget, inventory_budget = _split_budget(planned_meals, fresh_inventory, context_budget)
+    inventory, inventory_dropped = _inventory_section(fresh_inventory, inventory_budget)
+    planned, planned_dropped = _planned_section(planned_meals, planned_budget)
+
+    request = f"""Find a dinner recipe for {day.capitalize()} that takes {time_limit} minutes or less.
+The recipe should serve {servings} person(s); scale all ingredient quantities for {servings} serving(s).
+Search for a recipe and provide the complete details."""
+    human_prompt = "\n\n".join(part for part in (request, inventory, planned) if part)
+    return Prompt(
+        messages=[SystemMessage(content=system_prompt), HumanMessage(content=human_prompt)],
+        static_tokens=estimate_tokens(system_prompt),
+        context_tokens=estimate_tokens(human_prompt),
+        dropped_items=inventory_dropped + planned_dropped,
+    )
+
+
+def week_prompt(
+    days: list[tuple[str, int, int]],
+    fresh_inventory: dict[str, float],
+    planned_meals: list[str],
+    context_budget: int,
+) -> Prompt:
+    """Static week-planning prompt plus each (day, time limit, servings) to plan, with the lists fitted to the budget."""
+    planned_budget, inventory_budget = _split_budget(planned_meals, fresh_inventory, context_budget)
+    inventory, inventory_dropped = _inventory_section(fresh_inventory, inventory_budget)
+    planned, planned_dropped = _planned_section(planned_meals, planned_budget)
+
+    request = "\n".join(
+        ["Plan a dinner for each of these days:"]
+        + [
+            f"- {day.capitalize()}: {time_limit} minutes or less, {servings} serving(s)"
+            for day, time_limit, servings in days
+        ]
+    )
+    human_prompt = "\n\n".join(part for part in (request, inventory, planned) if part)
+    return Prompt(
+        messages=[SystemMessage(content=WEEK_PROMPT), HumanMessage(content=human_prompt)],
+        static_tokens=estimate_tokens(WEEK_PROMPT),
+        context_tokens=estimate_tokens(human_prompt),
+        dropped_items=inventory_dropped + planned_dropped,
+    )
+
+
+def parse_prompt(recipe_text: str, servings: int) -> Prompt:
+    """Static parse instructions followed by the servings and recipe text to parse."""
+    human_prompt = f"""Scale all ingredient quantities for {servings} serving(s).
+
+Recipe text:
+{recipe_text}"""
+    return Prompt(
+        messages=[SystemMessage(content=PARSE_PROMPT), HumanMessage(content=human_prompt)],
+        static_tokens=estimate_tokens(PARSE_PROMPT),
+        context_tokens=estimate_tokens(human_prompt),
+    )
@@ -0,0 +1,136 @@
+"""Lazily created, swappable model and client providers for the meal planner agent.
+
+Nothing here builds a client or imports a provider SDK at import time: each
+provider is created on first use by its factory and then shared by every
+run in the process. Which model serves a run is chosen per run with a
+"<provider>:<model>" spec (the `chat_model` and `validation_model`
+settings), so importing the agent needs neither the SDKs loaded nor API
+keys set, and a run that never looks up an image never loads Anthropic.
+
+The agent and tools look providers up here on every call, so tests and
+benchmarks can replace them (e.g. with the stand-ins in meal_agent.fakes)
+without live API keys.
+"""
+
+import contextlib
+import threading
+from collections.abc import Callable, Iterator
+from typing import Any
+
+# Provider names understood by get_provider and override_providers:
+# - chat_model: tool-calling chat model used for generation and parsing
+# - validation_model: fast chat model used for image relevance checks
+# - recipe_search_tool: tool named "recipe_search"
+# - tavily_client / async_tavily_client: clients used for image search
+PROVIDER_NAMES = (
+    "chat_model",
+    "validation_model",
+    "recipe_search_tool",
+    "tavily_client",
+    "async_tavily_client",
+)
+
+_overrides: dict[str, Any] = {}
+
+
+def get_override(name: str, default: Any = None) -> Any:
+    """Return the overriding provider for `name`, or `default` when none is set."""
+    return _overrides.get(name, default)
+
+
+@contextlib.contextmanager
+def override_providers(**providers: Any) -> Iterator[None]:
+    """Replace providers process-wide for the duration of the block."""
+    unknown = set(providers) - set(PROVIDER_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown providers: {', '.join(sorted(unknown))}")
+    previous = dict(_overrides)
+    _overrides.update(providers)
+    try:
+        yield
+    finally:
+        _overrides.clear()
+        _overrides.update(previous)
+
+
+def model_provider(spec: str) -> str:
+    """Provider part of a "<provider>:<model>" spec, e.g. "openai"."""
+    return spec.partition(":")[0]
+
+
+def _chat_model(spec: str) -> Any:
+    provider, _, model = spec.partition(":")
+    # Retries are left to meal_agent.scheduler: it coordinates 429 retries
+    # across runs and retries timeouts, connection errors and 5xx itself
+    if provider == "openai":
+        from langchain_openai import ChatOpenAI
+
+        return ChatOpenAI(model=model, temperature=0.7, max_retries=0, stream_usage=True)
+    if provider == "anthropic":
+        from langchain_anthropic import ChatAnthropic
+
+        return ChatAnthropic(model=model, temperature=0.7, max_tokens=4096, max_retries=0)
+    raise ValueError(f"Unknown chat model provider in {spec!r}")
+
+
+def _validation_model(spec: str) -> Any:
+    provider, _, model = spec.partition(":")
+    if provider == "anthropic":
+        from langchain_anthropic import ChatAnthropic
+
+        return ChatAnthropic(model=model, temperature=0, max_tokens=100, max_retries=0)
+    if provider == "openai":
+        from langchain_openai import ChatOpenAI
+
+        return ChatOpenAI(model=model, temperature=0, max_tokens=100, max_retries=0)
+    raise ValueError(f"Unknown validation model provider in {spec!r}")
+
+
+def _recipe_search_tool(spec: str) -> Any:
+    from meal_agent.tools import get_recipe_search_tool
+
+    return get_recipe_search_tool()
+
+
+def _tavily_client(api_key: str) -> Any:
+    from tavily import TavilyClient
+
+    return TavilyClient(api_key=api_key)
+
+
+# name -> factory building the provider from its spec (a model spec or an API key)
+_factories: dict[str, Callable[[str], Any]] = {
+    "chat_model": _chat_model,
+    "validation_model": _validation_model,
+    "recipe_search_tool": _recipe_search_tool,
+    "tavily_client": _tavily_client,
+}
+
+# (name, spec) -> provider, built on first use
+_providers: dict[tuple[str, str], Any] = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name: str, spec: str = "") -> Any:
+    """The provider `name` for `spec`, overridden or created once per process on first use."""
+    override = _overrides.get(name)
+    if override is not None:
+        return override
+    key = (name, spec)
+    provider = _providers.get(key)
+    if provider is None:
+        with _providers_lock:
+            provider = _providers.get(key)
+            if provider is None:
+                provider = _providers[key] = _factories[name](spec)
+    return provider
+
+
+def register_provider(name: str, factory: Callable[[str], Any]) -> None:
+    """Replace the factory of provider `name`; providers it already built are dropped."""
+    if name not in _factories:
+        raise ValueError(f"Unknown provider: {name}")
+    with _providers_lock:
+        _factories[name] = factory
+        for key in [key for key in _providers if key[0] == name]:
+            del _providers[key]
@@ -0,0 +1,162 @@
+"""Numeric ingredient quantities for the shopping list.
+
+Recipe quantities are converted once to a canonical unit per dimension
+(grams, milliliters, counts; other units such as "clove" stand alone) and
+summed as numbers. They are only turned back into display strings when the
+shopping list is emitted, rounded up to the catalog's purchase packages.
+"""
+
+import math
+
+from meal_agent.catalog import CATALOG, Ingredient
+from meal_agent.constants import GRAMS_PER_CUP, UNIT_ALIASES, UNIT_CONVERSIONS
+
+CANONICAL_UNITS = {"mass": "g", "volume": "ml", "count": "count"}
+
+# unit -> (canonical unit, factor), built once so conversions are a dict lookup
+_TO_CANONICAL = {
+    unit: (CANONICAL_UNITS[dimension], factor) for unit, (dimension, factor) in UNIT_CONVERSIONS.items()
+}
+
+# Smallest amounts shown in the larger display unit
+_POUND = UNIT_CONVERSIONS["lb"][1]
+_CUP = UNIT_CONVERSIONS["cup"][1]
+_TBSP = UNIT_CONVERSIONS["tbsp"][1]
+
+
+def format_quantity(qty: float, unit: str) -> str:
+    """Format a numeric quantity with its unit, dropping trailing zeros."""
+    if qty == int(qty):
+        return f"{int(qty)} {unit}".strip()
+    return f"{round(qty, 2):g} {unit}".strip()
+
+
+def normalize_unit(unit: str) -> str:
+    """Lowercase unit with common plural and long spellings folded to one key."""
+    unit = unit.strip().lower().rstrip(".")
+    return UNIT_ALIASES.get(unit, unit)
+
+
+def to_canonical(quantity: float, unit: str) -> tuple[str, float]:
+    """Convert a quantity to (canonical unit, amount)."""
+    unit = normalize_unit(unit)
+    canonical = _TO_CANONICAL.get(unit)
+    if canonical is None:
+        return unit, quantity
+    return canonical[0], quantity * canonical[1]
+
+
+def add_amount(amounts: dict[str, float], quantity: float, unit: str) -> None:
+    """Add a recipe quantity to a canonical unit -> amount dict in place."""
+    canonical_unit, amount = to_canonical(quantity, unit)
+    amounts[canonical_unit] = amounts.get(canonical_unit, 0.0) + amount
+
+
+def add_shopping(left: dict | None, right: dict | None) -> dict:
+    """State reducer: sum two ingredient -> ShoppingItem dicts in canonical units.
+
+    Only the ingredients in `right` are touched, so merging a day into a
+    week costs time proportional to the day's ingredients.
+    """
+    if not right:
+        return left if left is not None else {}
+    merged = dict(left) if left else {}
+    for name, item in right.items():
+        existing = merged.get(name)
+        if existing is None:
+            merged[name] = item
+            continue
+        amounts = dict(existing["amounts"])
+        for unit, amount in item["amounts"].items():
+            amounts[unit] = amounts.get(unit, 0.0) + amount
+        merged[name] = {"amounts": amounts, "category": existing.get("category") or item.get("category", "pantry")}
+    return merged
+
+
+def format_amount(canonical_unit: str, amount: float) -> str:
+    """Display a canonical amount in a kitchen unit (lb/oz, cup/tbsp/tsp, whole)."""
+    if canonical_unit == "g":
+        if amount >= _POUND / 4:
+            return format_quantity(round(amount / _POUND, 2), "lb")
+        return format_quantity(round(amount / UNIT_CONVERSIONS["oz"][1], 1), "oz")
+    if canonical_unit == "ml":
+        if amount >= _CUP / 4:
+            return format_quantity(round(amount / _CUP, 2), "cup")
+        if amount >= _TBSP:
+            return format_quantity(round(amount / _TBSP, 1), "tbsp")
+        return format_quantity(round(amount / UNIT_CONVERSIONS["tsp"][1], 1), "tsp")
+    if canonical_unit == "count":
+        return format_quantity(round(amount, 2), "whole")
+    return format_quantity(round(amount, 2), canonical_unit)
+
+
+def _package_size(entry: Ingredient, purchase_unit: str) -> tuple[str, float] | None:
+    """(canonical unit, amount) held by one purchase unit of an ingredient."""
+    if entry.package_contents is not None:
+        unit, amount = entry.package_contents
+        return to_canonical(amount, unit)
+    if normalize_unit(purchase_unit) in _TO_CANONICAL:
+        return to_canonical(1.0, purchase_unit)
+    return None
+
+
+def package_amount(name: str) -> tuple[str, float] | None:
+    """(canonical unit, amount) of the smallest purchase of a catalog ingredient, or None."""
+    entry = CATALOG.get(name)
+    if entry is None or entry.purchase_unit is None:
+        return None
+    purchase_unit, step = entry.purchase_unit
+    size = _package_size(entry, purchase_unit)
+    if size is None:
+        return None
+    return size[0], size[1] * step
+
+
+def in_package_unit(name: str, unit: str, amount: float) -> tuple[str, float]:
+    """A canonical amount of a catalog ingredient in the unit its package is measured in, when convertible.
+
+    Converts between "g" and "ml" with GRAMS_PER_CUP; other amounts are returned unchanged.
+    """
+    package = package_amount(name)
+    if package is None or package[0] == unit or name not in GRAMS_PER_CUP:
+        return unit, amount
+    grams_per_ml = GRAMS_PER_CUP[name] / _TO_CANONICAL["cup"][1]
+    if unit == "ml" and package[0] == "g":
+        return "g", amount * grams_per_ml
+    if unit == "g" and package[0] == "ml":
+        return "ml", amount / grams_per_ml
+    return unit, amount
+
+
+def format_amounts(name: str, amounts: dict[str, float]) -> str:
+    """Shopping quantity for a catalog ingredient, rounded up to whole purchase packages."""
+    parts = []
+    remaining = amounts
+    entry = CATALOG.get(name)
+    if entry is not None and entry.purchase_unit is not None:
+        purchase_unit, step = entry.purchase_unit
+        # Packages needed: amounts given in the purchase unit itself plus
+        # amounts in the unit the package contents are measured in
+        package_unit = to_canonical(1.0, purchase_unit)[0]
+        size = _package_size(entry, purchase_unit)
+        needed = amounts.get(package_unit, 0)
+        used = {package_unit}
+        if size is not None and size[0] != package_unit:
+            needed += amounts.get(size[0], 0) / size[1]
+            used.add(size[0])
+        elif size is not None:
+            needed /= size[1]
+        if needed > 0:
+            packages = math.ceil(needed / step - 1e-9) * step
+            parts.append(format_quantity(packages, purchase_unit))
+            remaining = {unit: amount for unit, amount in amounts.items() if unit not in used}
+    parts.extend(format_amount(unit, amount) for unit, amount in remaining.items() if amount > 0)
+    return " + ".join(parts)
+
+
+def format_shopping_list(items: dict) -> dict:
+    """Turn ingredient -> ShoppingItem totals into display IngredientInfo entries."""
+    return {
+        name: {"quantity": format_amounts(name, item["amounts"]), "category": item.get("category", "pantry")}
+        for name, item in items.items()
+    }
@@ -0,0 +1,398 @@
+"""Process-wide scheduling of calls to OpenAI, Anthropic and Tavily.
+
+Every run in the process (threads, event loops, batch households) goes
+through one limiter per provider, so concurrent runs share the provider's
+quota instead of each discovering it with 429s:
+
+- token buckets for requests and model tokens per minute, when configured
+- an adaptive concurrency limit: it grows by one slot per window of
+  successful calls, shrinks while many calls are in flight and they run
+  well over the recent latency of the same operation (queueing at the
+  provider), and is halved on a 429. Only calls that completed count
+  toward latency, and a model call's latency is taken per 100 output
+  tokens, so long answers don't read as queueing
+- after a 429 the provider cools down for everyone, and the call is retried
+  with exponential backoff and full jitter
+- timeouts, connection errors and 408/409/5xx (including Anthropic's 529
+  "overloaded") are retried with the same backoff, since the SDKs' own
+  retries are off; they don't change the concurrency limit
+- interactive runs are served before batch runs (see priority_scope)
+
+Limits come from environment variables per provider, e.g.
+OPENAI_REQUESTS_PER_MINUTE, OPENAI_TOKENS_PER_MINUTE, OPENAI_MAX_CONCURRENCY,
+ANTHROPIC_..., TAVILY_...; a limit of 0 means no limit.
+"""
+
+import asyncio
+import contextlib
+import os
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable, Iterator
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Literal, TypeVar
+
+from meal_agent.metrics import RATE_LIMITED, SCHEDULER_WAIT, TRANSIENT_RETRIES
+from meal_agent.prompts import estimate_tokens
+
+Provider = Literal["openai", "anthropic", "tavily"]
+Priority = Literal["interactive", "batch"]
+
+T = TypeVar("T")
+
+# Retries of a call that hit a rate limit
+MAX_RATE_LIMIT_RETRIES = 5
+
+# Retries of a call that failed with a transient error, as the SDKs do by default
+MAX_TRANSIENT_RETRIES = 2
+
+# Response statuses worth retrying besides 429; 529 is Anthropic's "overloaded"
+TRANSIENT_STATUSES = frozenset({408, 409, 500, 502, 503, 504, 529})
+
+# First retry backoff in seconds; doubles per retry, with full jitter
+BASE_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+
+# Seconds every caller of a provider holds back after one of them got a 429
+COOLDOWN = 0.25
+
+# Longest single wait before the limiter is checked again
+_POLL_INTERVAL = 0.05
+
+# Tokens assumed for a model's answer when estimating a request
+OUTPUT_TOKEN_ALLOWANCE = 300
+
+# Recent completed calls per operation whose latency makes its baseline
+LATENCY_WINDOW = 32
+# Completed calls of an operation before its latency is judged
+MIN_LATENCY_SAMPLES = 5
+# A model call's latency is compared per this many output tokens
+TOKENS_PER_LATENCY_UNIT = 100
+
+
+@dataclass
+class ProviderLimits:
+    """Quota of one provider; 0 disables a limit."""
+
+    requests_per_minute: float = 0.0
+    tokens_per_minute: float = 0.0
+    max_concurrency: int = 64
+    min_concurrency: int = 1
+
+    @classmethod
+    def from_env(cls, provider: str) -> "ProviderLimits":
+        prefix = provider.upper()
+        return cls(
+            requests_per_minute=float(os.environ.get(f"{prefix}_REQUESTS_PER_MINUTE", 0)),
+            tokens_per_minute=float(os.environ.get(f"{prefix}_TOKENS_PER_MINUTE", 0)),
+            max_concurrency=int(os.environ.get(f"{prefix}_MAX_CONCURRENCY", 64)),
+        )
+
+
+class _Bucket:
+    """Token bucket refilled continuously at `per_minute`; it can go into debt."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount: float) -> float:
+        """Seconds until `amount` (capped at capacity) is available."""
+        deficit = min(amount, self.capacity) - self.level
+        return deficit / self.rate if deficit > 0 else 0.0
+
+
+class ProviderLimiter:
+    """Rate, token and concurrency limits shared by every call to one provider."""
+
+    def __init__(self, provider: str, limits: ProviderLimits):
+        self.provider = provider
+        self.limits = limits
+        self._lock = threading.Lock()
+        self._requests = _Bucket(limits.requests_per_minute) if limits.requests_per_minute else None
+        self._tokens = _Bucket(limits.tokens_per_minute) if limits.tokens_per_minute else None
+        self.limit = float(max(limits.min_concurrency, limits.max_concurrency))
+        self.in_flight = 0
+        self._waiting_interactive = 0
+        self._cooldown_until = 0.0
+        # Recent latencies per operation, and the moving average of latency
+        # over the operation's baseline
+        self._latencies: dict[str, deque[float]] = {}
+        self._slowdown: dict[str, float] = {}
+        # Concurrency at the last 429; the limit creeps up slowly near it
+        self._ceiling = float(limits.max_concurrency)
+        self.rate_limited = 0
+
+    def _try_acquire(self, priority: Priority, tokens: int) -> float:
+        """0.0 when a slot was taken, else seconds to wait before trying again."""
+        now = time.monotonic()
+        with self._lock:
+            if now < self._cooldown_until:
+                return self._cooldown_until - now
+            if priority == "batch" and self._waiting_interactive:
+                return _POLL_INTERVAL
+            if self.in_flight >= int(self.limit):
+                return _POLL_INTERVAL
+            waits = []
+            for bucket, amount in ((self._requests, 1), (self._tokens, tokens)):
+                if bucket is not None:
+                    bucket.refill(now)
+                    waits.append(bucket.wait_for(amount))
+            if any(waits):
+                return max(waits)
+            if self._requests is not None:
+                self._requests.level -= 1
+            if self._tokens is not None:
+                self._tokens.level -= tokens
+            self.in_flight += 1
+            return 0.0
+
+    @contextlib.contextmanager
+    def _waiting(self, priority: Priority) -> Iterator[None]:
+        if priority == "interactive":
+            with self._lock:
+                self._waiting_interactive += 1
+        try:
+            yield
+        finally:
+            if priority == "interactive":
+                with self._lock:
+                    self._waiting_interactive -= 1
+
+    def acquire(self, priority: Priority, tokens: int) -> float:
+        """Block until the call may start; returns the seconds waited."""
+        start = time.monotonic()
+        with self._waiting(priority):
+            while (wait := self._try_acquire(priority, tokens)) > 0:
+                time.sleep(min(wait, _POLL_INTERVAL))
+        return time.monotonic() - start
+
+    async def aacquire(self, priority: Priority, tokens: int) -> float:
+        """Async version of acquire."""
+        start = time.monotonic()
+        with self._waiting(priority):
+            while (wait := self._try_acquire(priority, tokens)) > 0:
+                await asyncio.sleep(min(wait, _POLL_INTERVAL))
+        return time.monotonic() - start
+
+    def release(
+        self,
+        operation: str,
+        latency: float | None,
+        estimated_tokens: int,
+        usage: dict | None,
+        rate_limited: bool,
+    ) -> None:
+        """Return the slot and adapt the concurrency limit to the call's outcome.
+
+        `latency` is None for a call that did not complete (an error or a
+        cancellation); it returns its slot without counting as fast or slow.
+        """
+        now = time.monotonic()
+        with self._lock:
+            # Latency only points at queueing at the provider when many calls overlap
+            busy = self.in_flight >= max(2, self.limit / 2)
+            self.in_flight -= 1
+            if self._tokens is not None and usage and usage.get("total_tokens") is not None:
+                # Settle the estimate against what the provider reported
+                self._tokens.level -= usage["total_tokens"] - estimated_tokens
+            if rate_limited:
+                self.rate_limited += 1
+                # Calls in flight together fail together: halve once per cooldown
+                if now >= self._cooldown_until:
+                    self._ceiling = self.limit
+                    self.limit = max(self.limits.min_concurrency, self.limit / 2)
+                self._cooldown_until = max(self._cooldown_until, now + COOLDOWN)
+                return
+            if latency is None:
+                return
+
+            output_tokens = (usage or {}).get("output_tokens") or 0
+            cost = latency / max(1.0, output_tokens / TOKENS_PER_LATENCY_UNIT)
+            window = self._latencies.setdefault(operation, deque(maxlen=LATENCY_WINDOW))
+            window.append(cost)
+            # Lower quartile of the recent window: it follows the provider
+            # when it gets slower or faster for good
+            baseline = sorted(window)[len(window) // 4]
+            slowdown = 0.8 * self._slowdown.get(operation, 1.0) + 0.2 * (cost + 0.05) / (baseline + 0.05)
+            self._slowdown[operation] = slowdown
+            if slowdown <= 2:
+                step = 0.1 if self.limit >= self._ceiling - 1 else 1.0
+                self.limit = min(self.limits.max_concurrency, self.limit + step / self.limit)
+                self._ceiling = max(self._ceiling, self.limit)
+            elif busy and len(window) >= MIN_LATENCY_SAMPLES:
+                # Queueing at the provider: back off before it turns into 429s
+                self.limit = max(self.limits.min_concurrency, self.limit * 0.95)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "concurrency_limit": round(self.limit, 1),
+                "in_flight": self.in_flight,
+                "rate_limited": self.rate_limited,
+            }
+
+
+_limiters: dict[str, ProviderLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: Provider) -> ProviderLimiter:
+    """The process-wide limiter for `provider`, created from the environment on first use."""
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limiter = _limiters[provider] = ProviderLimiter(provider, ProviderLimits.from_env(provider))
+        return limiter
+
+
+def configure_limits(provider: Provider, limits: ProviderLimits) -> None:
+    """Replace a provider's limits, e.g. from a benchmark or a worker's startup."""
+    with _limiters_lock:
+        _limiters[provider] = ProviderLimiter(provider, limits)
+
+
+def scheduler_stats() -> dict[str, dict]:
+    """Current concurrency limit, calls in flight and 429s seen per provider."""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {provider: limiter.stats() for provider, limiter in sorted(limiters.items())}
+
+
+_priority: ContextVar[Priority] = ContextVar("meal_planner_priority", default="interactive")
+
+
+@contextlib.contextmanager
+def priority_scope(priority: Priority) -> Iterator[None]:
+    """Schedule the provider calls made in the block at `priority`."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Whether an exception from an SDK is a 429 / rate limit response."""
+    if getattr(error, "status_code", None) == 429:
+        return True
+    response = getattr(error, "response", None)
+    if getattr(response, "status_code", None) == 429:
+        return True
+    return "RateLimit" in type(error).__name__
+
+
+def _status_code(error: BaseException) -> int | None:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+# Exception class names of timeouts and dropped connections in the OpenAI,
+# Anthropic, httpx and requests libraries, matched without importing them
+_TRANSIENT_ERRORS = frozenset({
+    "APIConnectionError", "APITimeoutError", "TimeoutException", "NetworkError", "Timeout", "ConnectionError",
+})
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether an exception from an SDK is worth retrying: a timeout, a dropped
+    connection, or a 408/409/5xx response such as Anthropic's 529 "overloaded"."""
+    status = _status_code(error)
+    if status is not None:
+        return status in TRANSIENT_STATUSES or status >= 500
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in _TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+
+def request_tokens(request: Any) -> int:
+    """Estimated tokens of a model request: its prompt plus an answer allowance."""
+    if isinstance(request, list):
+        text = "".join(str(getattr(message, "content", message)) for message in request)
+    else:
+        text = str(request)
+    return estimate_tokens(text) + OUTPUT_TOKEN_ALLOWANCE
+
+
+def _usage(result: Any) -> dict | None:
+    return getattr(result, "usage_metadata", None) or None
+
+
+def _backoff(attempt: int) -> float:
+    return random.uniform(0, min(MAX_BACKOFF, BASE_BACKOFF * 2**attempt))
+
+
+def call(provider: Provider, operation: str, func: Callable[[], T], tokens: int = 0) -> T:
+    """Run a provider call under the provider's limits, retrying rate-limited and transient failures.
+
+    `operation` names the kind of call (e.g. "generation"), so its latency is
+    compared with earlier calls of the same kind; `tokens` is the estimated
+    size of a model request.
+    """
+    limiter = get_limiter(provider)
+    priority = _priority.get()
+    limited_attempts = transient_attempts = 0
+    while True:
+        SCHEDULER_WAIT.observe((provider, priority), limiter.acquire(priority, tokens))
+        start = time.monotonic()
+        try:
+            result = func()
+        except BaseException as e:
+            # Failed and cancelled calls return the slot without a latency
+            limited = isinstance(e, Exception) and is_rate_limited(e)
+            transient = not limited and isinstance(e, Exception) and is_transient(e)
+            limiter.release(operation, None, tokens, None, limited)
+            if limited and limited_attempts < MAX_RATE_LIMIT_RETRIES:
+                RATE_LIMITED.inc((provider,))
+                time.sleep(_backoff(limited_attempts))
+                limited_attempts += 1
+                continue
+            if transient and transient_attempts < MAX_TRANSIENT_RETRIES:
+                TRANSIENT_RETRIES.inc((provider,))
+                time.sleep(_backoff(transient_attempts))
+                transient_attempts += 1
+                continue
+            raise
+        limiter.release(operation, time.monotonic() - start, tokens, _usage(result), False)
+        return result
+
+
+async def acall(provider: Provider, operation: str, func: Callable[[], Awaitable[T]], tokens: int = 0) -> T:
+    """Async version of call; `func` returns a fresh awaitable per attempt."""
+    limiter = get_limiter(provider)
+    priority = _priority.get()
+    limited_attempts = transient_attempts = 0
+    while True:
+        SCHEDULER_WAIT.observe((provider, priority), await limiter.aacquire(priority, tokens))
+        start = time.monotonic()
+        try:
+            result = await func()
+        except BaseException as e:
+            # Failed and cancelled calls return the slot without a latency
+            limited = isinstance(e, Exception) and is_rate_limited(e)
+            transient = not limited and isinstance(e, Exception) and is_transient(e)
+            limiter.release(operation, None, tokens, None, limited)
+            if limited and limited_attempts < MAX_RATE_LIMIT_RETRIES:
+                RATE_LIMITED.inc((provider,))
+                await asyncio.sleep(_backoff(limited_attempts))
+                limited_attempts += 1
+                continue
+            if transient and transient_attempts < MAX_TRANSIENT_RETRIES:
+                TRANSIENT_RETRIES.inc((provider,))
+                await asyncio.sleep(_backoff(transient_attempts))
+                transient_attempts += 1
+                continue
+            raise
+        limiter.release(operation, time.monotonic() - start, tokens, _usage(result), False)
+        return result
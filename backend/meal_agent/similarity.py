@@ -0,0 +1,159 @@
+"""Near-duplicate detection between planned meals.
+
+Two meals are near-duplicates when their names share most of their words
+after normalization ("Garlic Butter Chicken" and "Buttery Garlic Chicken"),
+or when their names overlap and they are made from mostly the same
+ingredients ("Spaghetti Carbonara" and "Classic Carbonara"). Names are
+compared as sets of lowercased, roughly stemmed words without filler such as
+"easy" or "one-pan"; ingredients as sets of catalog names without pantry
+staples. Both use the Jaccard index. A week has at most a handful of
+meals, so they are compared exactly rather than through MinHash sketches.
+
+Meals known only by name (e.g. those sent to a parallel branch) are
+compared by name alone.
+
+`exclusion_signature` is the compact form of planned meals used in prompts:
+one line per main dish with the variations already taken, e.g.
+"chicken: garlic butter; lemon herb".
+"""
+
+import re
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from meal_agent.catalog import ingredient_key, resolve_ingredient
+
+# Names this similar are duplicates whatever their ingredients
+NAME_THRESHOLD = 0.75
+# Names at least this similar are duplicates when their ingredients are INGREDIENT_THRESHOLD similar
+NAME_OVERLAP = 0.4
+INGREDIENT_THRESHOLD = 0.6
+
+# Words that describe how a recipe is presented rather than what it is
+STOPWORDS = frozenset({
+    "a", "an", "and", "the", "of", "for", "to", "my", "best", "easy", "quick", "simple", "classic",
+    "homemade", "healthy", "ultimate", "perfect", "recipe", "style", "one", "pan", "pot", "sheet",
+    "minute", "minutes", "night", "weeknight",
+})
+
+# A name's main dish comes before these ("Pork Chops with Green Beans")
+_SIDE = re.compile(r"\b(?:with|over|on)\b")
+_WORD = re.compile(r"[a-z]+")
+
+
+def _stem(word: str) -> str:
+    """Rough stem so "tacos"/"taco" and "buttery"/"butter" compare equal."""
+    if word.endswith("ies") and len(word) > 4:
+        word = word[:-3] + "y"
+    elif word.endswith("es") and len(word) > 4 and word[-3] in "sxzho":
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        word = word[:-1]
+    for suffix in ("ing", "ed", "y"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[: -len(suffix)]
+    return word
+
+
+def _words(name: str) -> list[str]:
+    return [word for word in _WORD.findall(name.lower()) if word not in STOPWORDS]
+
+
+def name_tokens(name: str) -> frozenset[str]:
+    """Normalized words of a meal name."""
+    return frozenset(_stem(word) for word in _words(name))
+
+
+def ingredient_set(ingredients: dict | list | None) -> frozenset[str]:
+    """Catalog names of a meal's ingredients, without pantry staples.
+
+    Takes a MealInfo's ingredients (name -> info) or a recipe's ingredient
+    list (dicts with a "name").
+    """
+    names = ingredients if isinstance(ingredients, dict) else [
+        item.get("name", "") for item in ingredients or [] if isinstance(item, dict)
+    ]
+    keys = set()
+    for name in names:
+        key = ingredient_key(str(name))
+        entry = resolve_ingredient(key)
+        if entry is not None and entry.is_staple:
+            continue
+        if key:
+            keys.add(entry.name if entry is not None else key)
+    return frozenset(keys)
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass(frozen=True)
+class MealSignature:
+    """What a meal is compared by."""
+
+    name: str
+    tokens: frozenset[str]
+    ingredients: frozenset[str]  # Empty when only the name is known
+
+    @classmethod
+    def of(cls, meal: dict | str) -> "MealSignature":
+        """Signature of a MealInfo, a recipe dict or a bare name."""
+        if isinstance(meal, str):
+            return cls(meal, name_tokens(meal), frozenset())
+        name = str(meal.get("name", ""))
+        return cls(name, name_tokens(name), ingredient_set(meal.get("ingredients")))
+
+
+def near_duplicate(a: MealSignature, b: MealSignature) -> bool:
+    names = jaccard(a.tokens, b.tokens)
+    if names >= NAME_THRESHOLD:
+        return True
+    if names < NAME_OVERLAP or not a.ingredients or not b.ingredients:
+        return False
+    return jaccard(a.ingredients, b.ingredients) >= INGREDIENT_THRESHOLD
+
+
+class MealIndex:
+    """Signatures of the meals planned so far, to check new ones against."""
+
+    def __init__(self, meals: Iterable[dict | str] = ()):
+        self.signatures: list[MealSignature] = []
+        for meal in meals:
+            self.add(meal)
+
+    def add(self, meal: dict | str) -> None:
+        self.signatures.append(MealSignature.of(meal))
+
+    def duplicate_of(self, meal: dict | str) -> str | None:
+        """Name of a planned meal that `meal` is a near-duplicate of, if any."""
+        signature = MealSignature.of(meal)
+        for planned in self.signatures:
+            if near_duplicate(signature, planned):
+                return planned.name
+        return None
+
+
+def dish_key(name: str) -> tuple[str, str]:
+    """(main dish, variation) of a meal name, e.g. ("chicken", "garlic butter") for "Easy Garlic Butter Chicken"."""
+    words = _words(_SIDE.split(name.lower(), maxsplit=1)[0]) or _words(name) or [name.lower().strip()]
+    return words[-1], " ".join(words[:-1])
+
+
+def exclusion_signature(names: Iterable[str]) -> list[str]:
+    """One "dish: variation; variation" line per main dish among `names`, in order of appearance.
+
+    A dish planned without a variation is listed as "plain".
+    """
+    dishes: dict[str, list[str]] = {}
+    for name in names:
+        dish, variation = dish_key(name)
+        variations = dishes.setdefault(dish, [])
+        if variation not in variations:
+            variations.append(variation)
+    return [
+        dish if variations == [""] else f"{dish}: {'; '.join(v or 'plain' for v in variations)}"
+        for dish, variations in dishes.items()
+    ]
@@ -4,6 +4,9 @@ from typing import TypedDict, Annotated
 from langchain_core.messages import BaseMessage
 import operator
 
+from meal_agent.metrics import merge_metrics
+from meal_agent.quantities import add_shopping
+
 
 class DayInput(TypedDict, total=False):
     """Input configuration for a single day."""
@@ -28,12 +31,72 @@ class MealInfo(TypedDict, total=False):
     image_url: str  # URL of a relevant food image
 
 
+class ShoppingItem(TypedDict):
+    """Numeric shopping quantity of one ingredient, summed across meals."""
+    amounts: dict[str, float]  # canonical unit ("g", "ml", "count", "clove", ...) -> amount
+    category: str
+
+
+class DayResult(TypedDict, total=False):
+    """Shopping and inventory contribution of a single planned day."""
+    shopping_totals: dict[str, ShoppingItem]
+    fresh_inventory: dict[str, float]  # fresh ingredient -> quantity used that day
+
+
+class PreviousPlan(TypedDict, total=False):
+    """An earlier run's plan, sent back to re-plan only the days whose input changed."""
+    meal_input: dict[str, DayInput]
+    meal_output: dict[str, MealInfo]
+    day_results: dict[str, DayResult]
+
+
+def earliest(left: float | None, right: float | None) -> float | None:
+    """State reducer: the smaller of two optional times."""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    return min(left, right)
+
+
+def day_messages(left: list[BaseMessage] | None, right: list[BaseMessage] | None) -> list[BaseMessage]:
+    """State reducer: append a node's messages; an update of None discards them all.
+
+    Messages hold only the conversation of the day being planned. The node
+    that finishes a day returns None, so the next day's calls and every
+    checkpoint after it no longer carry the earlier days' searches.
+    """
+    if right is None:
+        return []
+    return (left or []) + right
+
+
+class DayTask(TypedDict, total=False):
+    """Input sent to a parallel per-day planning branch."""
+    day: str
+    meal_input: dict[str, DayInput]
+    planned_meals: list[str]  # Meal names already planned for other days
+    fresh_inventory: dict[str, float]
+    planned_recipe: dict | None  # Recipe chosen by the menu optimizer, used instead of the model
+    started_at: float  # Run start, for first_visible_s
+    search_deadline: float | None  # Run-clock time until which the day may search (see meal_agent.deadlines)
+
+
+class ImageTask(TypedDict, total=False):
+    """Input sent to a deferred image enrichment branch."""
+    day: str
+    meal: MealInfo
+
+
 class MealPlannerState(TypedDict, total=False):
     """Main state for the meal planner graph."""
 
     # Input from frontend
     meal_input: dict[str, DayInput]  # day name -> DayInput
 
+    # Earlier plan to update incrementally; unchanged days are kept as they are
+    previous_plan: PreviousPlan
+
     # Processing state
     current_day_index: int
     days_to_process: list[str]  # List of days that need meals generated
@@ -42,10 +105,39 @@ class MealPlannerState(TypedDict, total=False):
     meal_output: Annotated[dict[str, MealInfo], operator.or_]
     shopping_list: Annotated[dict[str, IngredientInfo], operator.or_]  # ingredient -> {quantity, category}
 
+    # Numeric quantities behind shopping_list, summed across days in canonical
+    # units; shopping_list entries are formatted from these
+    shopping_totals: Annotated[dict[str, ShoppingItem], add_shopping]
+
     # Fresh ingredient tracking for waste minimization
     # Tracks remaining quantities of perishable ingredients
     # e.g., {"onion": 0.75, "ground_beef_lb": 0.5}
     fresh_inventory: Annotated[dict[str, float], operator.or_]
 
-    # Messages for LLM interactions
-    messages: Annotated[list[BaseMessage], operator.add]
+    # Recipes chosen for days up front by the menu optimizer (day -> ParsedRecipe dict)
+    planned_recipes: dict[str, dict]
+
+    # Recipe served from the recipe cache or the menu optimizer for the current day, if any
+    cached_recipe: dict | None
+
+    # Recipes rejected for the current day as near-duplicates of other days'
+    # meals; the day is generated again without them (see meal_agent.similarity)
+    rejected_meals: list[str]
+
+    # Per-day shopping and inventory contributions of every planned day;
+    # parallel branches are merged from these by reconcile
+    day_results: Annotated[dict[str, DayResult], operator.or_]
+
+    # Wall-clock start of the run, and seconds until its first meal (or
+    # partial meal) was shown; parallel branches keep the earliest
+    started_at: float
+    first_visible_s: Annotated[float | None, earliest]
+
+    # Time until which the current day of the sequential loop may search
+    search_deadline: float | None
+
+    # Node timings, call counts and tokens for this run (see meal_agent.metrics)
+    metrics: Annotated[dict, merge_metrics]
+
+    # Messages of the current day's LLM interactions (see day_messages)
+    messages: Annotated[list[BaseMessage], day_messages]
@@ -0,0 +1,263 @@
+"""Partial meals streamed while a day's recipe is being written.
+
+With `stream_partial_meals` on, the model call that produces a day's
+structured recipe (the parse call, or the single-pass generation) is
+streamed, and the recipe is sent as a custom stream event each time another
+of its fields is finished, so a client can show the name long before the
+ingredients and instructions are done. Request the events with
+`stream_mode: ["updates", "custom"]`; each one looks like
+
+    {
+        "type": "partial_meal",
+        "day": "monday",
+        "meal": {"name": "Beef Tacos", "ingredients": {"ground_beef": {...}}},
+        "complete": false,
+        "seconds": 0.82,
+    }
+
+`meal` is a MealInfo holding only the fields finished so far, in the order
+name, ingredients, instructions, time_estimate, equipment; `ingredients`
+and `instructions` grow one finished entry at a time. The last event of a
+day has `complete: true` and the whole recipe; it is sent before the image
+search, and the day's `meal_output` update follows as before. `seconds` is
+the time since the run started.
+
+A recipe can still be rejected once it is complete, as a near-duplicate of
+another day's meal. The day then gets an event with `meal: null`, telling
+the client to clear what it showed, and the rejected recipe no longer
+counts as the day's first visible meal; the day's next recipe streams as usual.
+
+Whether or not partial meals are streamed, nodes report when the run's
+first meal became visible as `first_visible_s` (see MealStream.visible_update).
+"""
+
+import contextlib
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextvars import ContextVar
+
+from langchain_core.messages import AIMessageChunk
+from langchain_core.runnables import RunnableConfig
+from langchain_core.utils.json import parse_partial_json
+from langgraph.config import get_stream_writer
+
+from meal_agent.catalog import ingredient_key, resolve_ingredient
+from meal_agent.configuration import Configuration
+from meal_agent.quantities import format_quantity
+from meal_agent.state import IngredientInfo, MealInfo
+
+# ParsedRecipe fields in the order the model writes them
+RECIPE_FIELDS = ("name", "ingredients", "instructions", "time_estimate", "equipment")
+
+# Tool the model calls with the structured recipe
+RECIPE_TOOL = "ParsedRecipe"
+
+# Characters of recipe arguments received before they are parsed again even
+# without a closing bracket; parsing on every chunk costs more than the call
+PARSE_EVERY_CHARS = 48
+
+
+def finished_fields(args: dict, done: bool) -> dict:
+    """Fields of a partially written recipe that the model has finished.
+
+    A field is finished once the model has moved on to the next one; in the
+    field being written, list entries are finished once the next entry has
+    started.
+    """
+    keys = [key for key in args if key in RECIPE_FIELDS]
+    finished = {}
+    for i, key in enumerate(keys):
+        value = args[key]
+        if done or i < len(keys) - 1:
+            finished[key] = value
+        elif isinstance(value, list) and len(value) > 1:
+            finished[key] = value[:-1]
+    return finished
+
+
+def _meal_ingredients(items: list) -> dict[str, IngredientInfo]:
+    """Display entries of the finished ingredients, leaving out pantry staples."""
+    ingredients: dict[str, IngredientInfo] = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        name = ingredient_key(str(item.get("name", "")))
+        entry = resolve_ingredient(name)
+        if not name or entry is not None and entry.is_staple:
+            continue
+        try:
+            quantity = format_quantity(float(item["quantity"]), str(item.get("unit", "")))
+        except (KeyError, TypeError, ValueError):
+            continue
+        ingredients[name] = {"quantity": quantity, "category": str(item.get("category", "pantry"))}
+    return ingredients
+
+
+def partial_meal(fields: dict) -> MealInfo:
+    """MealInfo with the finished fields of a recipe."""
+    meal: MealInfo = {}
+    if isinstance(fields.get("name"), str):
+        meal["name"] = fields["name"]
+    if isinstance(fields.get("ingredients"), list):
+        meal["ingredients"] = _meal_ingredients(fields["ingredients"])
+    if isinstance(fields.get("instructions"), list):
+        meal["instructions"] = [str(step) for step in fields["instructions"]]
+    if isinstance(fields.get("time_estimate"), (int, float)):
+        meal["time_estimate"] = int(fields["time_estimate"])
+    if isinstance(fields.get("equipment"), list):
+        meal["equipment"] = [str(item) for item in fields["equipment"]]
+    return meal
+
+
+class _RecipeArgs:
+    """Arguments of the ParsedRecipe call in a streamed response, as received so far."""
+
+    def __init__(self):
+        self.text = ""
+        self._unparsed = 0
+        self._tools: dict[int | None, str] = {}  # tool call index -> tool name
+
+    def add(self, chunk: AIMessageChunk) -> bool:
+        """Append the chunk's recipe arguments; True when they are worth parsing again.
+
+        That is when an ingredient or list just closed, or enough text
+        arrived since the last parse to have finished a name or a step.
+        """
+        added = ""
+        for part in chunk.tool_call_chunks:
+            if part.get("name"):
+                self._tools[part.get("index")] = part["name"]
+            if self._tools.get(part.get("index")) == RECIPE_TOOL:
+                added += part.get("args") or ""
+        if not added:
+            return False
+        self.text += added
+        self._unparsed += len(added)
+        if "}" in added or "]" in added or self._unparsed >= PARSE_EVERY_CHARS:
+            self._unparsed = 0
+            return True
+        return False
+
+
+def _joined(chunks: list[AIMessageChunk]) -> AIMessageChunk | None:
+    return chunks[0] + chunks[1:] if chunks else None
+
+
+class MealStream:
+    """Partial meal events and first-visible timing for the day a node is planning."""
+
+    def __init__(self, day: str, started_at: float | None, enabled: bool):
+        self.day = day
+        self.started_at = started_at if started_at is not None else time.time()
+        self.enabled = enabled
+        self.first_visible: float | None = None
+        self._sent: MealInfo | None = None
+        self._writer = get_stream_writer() if enabled else None
+
+    def seconds(self) -> float:
+        return max(0.0, time.time() - self.started_at)
+
+    def _send(self, meal: MealInfo, complete: bool) -> None:
+        if not meal.get("name") or (meal == self._sent and not complete):
+            return
+        self._sent = meal
+        seconds = self.seconds()
+        if self.first_visible is None:
+            self.first_visible = seconds
+        self._writer({
+            "type": "partial_meal",
+            "day": self.day,
+            "meal": meal,
+            "complete": complete,
+            "seconds": round(seconds, 3),
+        })
+
+    def _feed(self, args: _RecipeArgs, chunk: AIMessageChunk) -> None:
+        if not args.add(chunk):
+            return
+        parsed = parse_partial_json(args.text)
+        if isinstance(parsed, dict):
+            self._send(partial_meal(finished_fields(parsed, done=False)), complete=False)
+
+    def consume(self, chunks: Iterator[AIMessageChunk]) -> AIMessageChunk | None:
+        """Join a streamed model response, sending the recipe's fields as they finish."""
+        received = []
+        args = _RecipeArgs()
+        for chunk in chunks:
+            received.append(chunk)
+            self._feed(args, chunk)
+        return _joined(received)
+
+    async def aconsume(self, chunks: AsyncIterator[AIMessageChunk]) -> AIMessageChunk | None:
+        """Async version of consume."""
+        received = []
+        args = _RecipeArgs()
+        async for chunk in chunks:
+            received.append(chunk)
+            self._feed(args, chunk)
+        return _joined(received)
+
+    def finish(self, recipe: dict) -> None:
+        """Send the day's whole recipe, before its image is searched."""
+        if self.enabled:
+            self._send(partial_meal(finished_fields(recipe, done=True)), complete=True)
+
+    def retract(self) -> None:
+        """Withdraw the partial meal sent for the day, after its recipe was rejected."""
+        if self._sent is None:
+            return
+        self._sent = None
+        self.first_visible = None
+        self._writer({
+            "type": "partial_meal",
+            "day": self.day,
+            "meal": None,
+            "complete": False,
+            "seconds": round(self.seconds(), 3),
+        })
+
+    def visible_update(self, update: dict | None = None) -> dict:
+        """`first_visible_s` for a node's update, once the day's meal has been shown.
+
+        A meal_output for the day in `update` counts as shown now when no
+        partial meal was sent earlier.
+        """
+        if self.first_visible is None and self.day in (update or {}).get("meal_output", {}):
+            self.first_visible = self.seconds()
+        if self.first_visible is None:
+            return {}
+        return {"first_visible_s": round(self.first_visible, 3)}
+
+
+_meal_stream: ContextVar[MealStream | None] = ContextVar("meal_planner_meal_stream", default=None)
+
+
+@contextlib.contextmanager
+def meal_stream(day: str, started_at: float | None, config: RunnableConfig | None) -> Iterator[MealStream]:
+    """Stream the partial meal of `day` from model calls made in the block."""
+    stream = MealStream(day, started_at, Configuration.from_runnable_config(config).stream_partial_meals)
+    token = _meal_stream.set(stream)
+    try:
+        yield stream
+    finally:
+        _meal_stream.reset(token)
+
+
+def streaming_meal() -> MealStream | None:
+    """The running node's meal stream when partial meals are being streamed."""
+    stream = _meal_stream.get()
+    return stream if stream is not None and stream.enabled else None
+
+
+def finish_meal(recipe: dict) -> None:
+    """Send a day's whole recipe to the running node's meal stream, if any."""
+    stream = streaming_meal()
+    if stream is not None:
+        stream.finish(recipe)
+
+
+def retract_meal() -> None:
+    """Withdraw the partial meal of a rejected recipe from the running node's meal stream, if any."""
+    stream = streaming_meal()
+    if stream is not None:
+        stream.retract()
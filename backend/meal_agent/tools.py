@@ -1,51 +1,182 @@
-"""Tools for the meal planner agent."""
+"""Tools for the meal planner agent.
 
-from langchain_community.tools.tavily_search import TavilySearchResults
-from tavily import TavilyClient
-from langchain_anthropic import ChatAnthropic
+Tavily and the image validation model are loaded through meal_agent.providers
+on first use, so importing this module pulls in neither SDK.
+"""
+
+from langchain_core.callbacks import AsyncCallbackManagerForToolRun, CallbackManagerForToolRun
+from langchain_core.runnables import ensure_config
+from langchain_core.tools import BaseTool
 from pydantic import BaseModel, Field
+import asyncio
+import contextvars
 import os
+import threading
+import time
+import weakref
+from typing import TYPE_CHECKING, Any
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from meal_agent.cache import get_kv_cache, normalize_name
+from meal_agent.configuration import Configuration
+from meal_agent.corpus import format_result, get_recipe_index
+from meal_agent.metrics import timed_call
+from meal_agent.providers import get_override, get_provider, model_provider
+from meal_agent.scheduler import acall, call, request_tokens
+
+if TYPE_CHECKING:
+    from tavily import AsyncTavilyClient, TavilyClient
 
 
-def get_recipe_search_tool() -> TavilySearchResults:
+RECIPE_SEARCH_DESCRIPTION = (
+    "Search for recipes online. Use this to find dinner recipes based on "
+    "time constraints, ingredients to use up, or cuisine preferences. "
+    "Returns recipe names, URLs, and snippets."
+)
+
+
+def get_recipe_search_tool() -> BaseTool:
     """Create a Tavily search tool configured for recipe search."""
+    from langchain_community.tools.tavily_search import TavilySearchResults
+
     return TavilySearchResults(
         name="recipe_search",
-        description=(
-            "Search for recipes online. Use this to find dinner recipes based on "
-            "time constraints, ingredients to use up, or cuisine preferences. "
-            "Returns recipe names, URLs, and snippets."
-        ),
+        description=RECIPE_SEARCH_DESCRIPTION,
         max_results=5,
     )
 
 
+class LocalRecipeSearchTool(BaseTool):
+    """recipe_search answered from the local corpus, falling back to another search tool on a miss."""
+
+    name: str = "recipe_search"
+    description: str = RECIPE_SEARCH_DESCRIPTION
+    index: Any
+    fallback: BaseTool | None = None
+    max_results: int = 5
+
+    def _local_results(self, query: str) -> list[dict]:
+        return [format_result(recipe) for recipe in self.index.query(query, limit=self.max_results)]
+
+    def _run(self, query: str, run_manager: CallbackManagerForToolRun | None = None) -> list[dict] | str:
+        results = self._local_results(query)
+        if results or self.fallback is None:
+            return results
+        callbacks = run_manager.get_child() if run_manager else None
+        return call("tavily", "recipe_search", lambda: self.fallback.invoke(
+            {"query": query}, {"callbacks": callbacks, "run_name": "web_recipe_search"}
+        ))
+
+    async def _arun(
+        self, query: str, run_manager: AsyncCallbackManagerForToolRun | None = None
+    ) -> list[dict] | str:
+        results = self._local_results(query)
+        if results or self.fallback is None:
+            return results
+        callbacks = run_manager.get_child() if run_manager else None
+        return await acall("tavily", "recipe_search", lambda: self.fallback.ainvoke(
+            {"query": query}, {"callbacks": callbacks, "run_name": "web_recipe_search"}
+        ))
+
+
+# (corpus path, fallback tool id) -> (fallback, tool); the fallback is kept
+# alive so its id cannot be reused
+_local_search_tools: dict[tuple[str, int], tuple] = {}
+_local_search_tools_lock = threading.Lock()
+
+
+def get_local_recipe_search_tool(path: str, fallback: BaseTool | None) -> LocalRecipeSearchTool | None:
+    """Shared local search tool for the corpus at `path`, or None when no corpus is configured."""
+    index = get_recipe_index(path)
+    if index is None:
+        return None
+    key = (path, id(fallback))
+    with _local_search_tools_lock:
+        entry = _local_search_tools.get(key)
+        if entry is None:
+            entry = _local_search_tools[key] = (fallback, LocalRecipeSearchTool(index=index, fallback=fallback))
+        return entry[1]
+
+
 class ImageRelevance(BaseModel):
     """Whether an image is relevant to a recipe."""
     is_relevant: bool = Field(description="True if the image matches the recipe, False otherwise")
 
 
-# Fast model for image validation with structured output
-_validation_llm = None
+# (model id) -> (model, structured variant); the model is kept alive so its
+# id cannot be reused by another object
+_validation_llms: dict[int, tuple] = {}
+
+
+def validation_model_spec() -> str:
+    """The run's validation model, e.g. "anthropic:claude-3-haiku-20240307"."""
+    return Configuration.from_runnable_config(ensure_config()).validation_model
 
 
 def get_validation_llm():
-    """Get or create the fast validation LLM (Claude Haiku) with structured output."""
-    global _validation_llm
-    if _validation_llm is None:
-        base_llm = ChatAnthropic(
-            model="claude-3-haiku-20240307",
-            temperature=0,
-            max_tokens=100,
-        )
-        _validation_llm = base_llm.with_structured_output(ImageRelevance)
-    return _validation_llm
+    """The run's fast validation model with structured output, created on first use."""
+    model = get_provider("validation_model", validation_model_spec())
+    entry = _validation_llms.get(id(model))
+    if entry is None:
+        entry = _validation_llms[id(model)] = (model, model.with_structured_output(ImageRelevance))
+    return entry[1]
+
+
+# Async clients hold an httpx pool bound to the event loop that created it
+_async_tavily_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def get_tavily_client() -> "TavilyClient | None":
+    """Get the shared TavilyClient for the configured API key, or None without a key.
+
+    One long-lived client per API key, so HTTP connections are reused.
+    """
+    override = get_override("tavily_client")
+    if override is not None:
+        return override
+    api_key = os.environ.get("TAVILY_API_KEY")
+    if not api_key:
+        return None
+    return get_provider("tavily_client", api_key)
+
+
+def get_async_tavily_client() -> "AsyncTavilyClient | None":
+    """Get the AsyncTavilyClient shared within the running event loop, or None without a key."""
+    override = get_override("async_tavily_client")
+    if override is not None:
+        return override
+    api_key = os.environ.get("TAVILY_API_KEY")
+    if not api_key:
+        return None
+    clients = _async_tavily_clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get(api_key)
+    if client is None:
+        from tavily import AsyncTavilyClient
+
+        client = clients[api_key] = AsyncTavilyClient(api_key=api_key)
+    return client
+
+
+# Returned when the search itself errored, so the miss is not cached
+_SEARCH_FAILED = object()
+
+
+def get_image_caches():
+    """Caches for recipe name -> image URL and (recipe, image URL) -> relevance verdict."""
+    configuration = Configuration.from_runnable_config(ensure_config())
+    args = (
+        configuration.image_cache_path,
+        configuration.image_cache_ttl,
+        configuration.image_cache_max_entries,
+    )
+    return get_kv_cache("image_url", *args), get_kv_cache("image_relevance", *args)
 
 
 def search_recipe_image(recipe_name: str) -> str | None:
     """
     Search for a relevant image for the recipe using Tavily.
     Validates image descriptions with a fast model to ensure relevance.
+    Results are memoized per normalized recipe name, including misses.
 
     Args:
         recipe_name: The name of the recipe to find an image for
@@ -53,65 +184,224 @@ def search_recipe_image(recipe_name: str) -> str | None:
     Returns:
         URL of a relevant image, or None if no good match found
     """
-    api_key = os.environ.get("TAVILY_API_KEY")
-    if not api_key:
+    client = get_tavily_client()
+    if client is None:
+        return None
+
+    image_cache, relevance_cache = get_image_caches()
+    name_key = normalize_name(recipe_name)
+    cached = image_cache.get(name_key)
+    if cached is not None:
+        # An empty string records that no image was found
+        return cached or None
+
+    image_url = _find_recipe_image(client, recipe_name, relevance_cache)
+    if image_url is not _SEARCH_FAILED:
+        image_cache.set(name_key, image_url or "")
+        return image_url
+    return None
+
+
+async def asearch_recipe_image(recipe_name: str) -> str | None:
+    """Async version of search_recipe_image, sharing the same caches."""
+    client = get_async_tavily_client()
+    if client is None:
         return None
 
+    image_cache, relevance_cache = get_image_caches()
+    name_key = normalize_name(recipe_name)
+    cached = image_cache.get(name_key)
+    if cached is not None:
+        return cached or None
+
+    image_url = await _afind_recipe_image(client, recipe_name, relevance_cache)
+    if image_url is not _SEARCH_FAILED:
+        image_cache.set(name_key, image_url or "")
+        return image_url
+    return None
+
+
+# Shared pool for concurrent image relevance checks across runs
+_validation_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="image-validation")
+
+
+def _image_search_kwargs(recipe_name: str) -> dict:
+    """Tavily search arguments for images of a recipe."""
+    return {
+        "query": f"{recipe_name} food recipe dish",
+        "search_depth": "basic",
+        "include_images": True,
+        "include_image_descriptions": True,
+        "max_results": 3,
+    }
+
+
+def _validation_prompt(recipe_name: str, image_desc: str) -> str:
+    return f"""Does this image description match the recipe "{recipe_name}"?
+
+Image description: {image_desc}"""
+
+
+def _check_relevance(llm, provider: str, recipe_name: str, image_desc: str) -> bool:
+    """Ask the validation model whether an image description matches the recipe."""
     try:
-        client = TavilyClient(api_key=api_key)
+        prompt = _validation_prompt(recipe_name, image_desc)
+        result: ImageRelevance = call(provider, "image_relevance", lambda: llm.invoke(prompt), request_tokens(prompt))
+    except Exception:
+        # If validation fails, just use this image
+        return True
+    return result.is_relevant
 
-        # Search for images of the recipe
-        response = client.search(
-            query=f"{recipe_name} food recipe dish",
-            search_depth="basic",
-            include_images=True,
-            include_image_descriptions=True,
-            max_results=3,
+
+async def _acheck_relevance(llm, provider: str, recipe_name: str, image_desc: str) -> bool:
+    """Async version of _check_relevance."""
+    try:
+        prompt = _validation_prompt(recipe_name, image_desc)
+        result: ImageRelevance = await acall(
+            provider, "image_relevance", lambda: llm.ainvoke(prompt), request_tokens(prompt)
         )
+    except Exception:
+        return True
+    return result.is_relevant
+
+
+def _image_candidates(images: list) -> tuple[list[tuple[str, str]], str | None]:
+    """Split search images into (url, description) pairs to validate and an image to accept as-is.
+
+    Up to 5 images are considered in order. An image without a description is
+    accepted without checking, so candidates after it are dropped.
+    """
+    candidates: list[tuple[str, str]] = []
+    for image in images[:5]:
+        # Handle both formats: string URL or dict with url/description
+        if isinstance(image, str):
+            return candidates, image
+
+        image_url = image.get("url", "")
+        image_desc = image.get("description", "")
+
+        if not image_url:
+            continue
+
+        if not image_desc:
+            return candidates, image_url
+
+        candidates.append((image_url, image_desc))
+    return candidates, None
+
+
+def _first_image_url(images: list) -> str | None:
+    """Fallback: return first image URL if available."""
+    first_image = images[0]
+    if isinstance(first_image, str):
+        return first_image
+    return first_image.get("url")
+
+
+def _find_recipe_image(client: "TavilyClient", recipe_name: str, relevance_cache):
+    """Search Tavily for images and return the first one judged relevant."""
+    name_key = normalize_name(recipe_name)
+    try:
+        # Search for images of the recipe
+        with timed_call("tavily:search"):
+            response = call("tavily", "image_search", lambda: client.search(**_image_search_kwargs(recipe_name)))
 
         images = response.get("images", [])
         if not images:
             return None
 
-        # Get the validation LLM with structured output
+        candidates, accepted_without_check = _image_candidates(images)
+
+        # Validate every uncached candidate concurrently with the fast model
         llm = get_validation_llm()
+        provider = model_provider(validation_model_spec())
+        timeout = Configuration.from_runnable_config(ensure_config()).image_validation_timeout
+        verdicts = {}
+        for image_url, image_desc in candidates:
+            cached = relevance_cache.get(f"{name_key}|{image_url}")
+            if cached is not None:
+                verdicts[image_url] = cached
+            elif image_url not in verdicts:
+                # Run in a copy of the caller's context so callbacks see the check
+                verdicts[image_url] = _validation_pool.submit(
+                    contextvars.copy_context().run, _check_relevance, llm, provider, recipe_name, image_desc
+                )
+
+        # Take the first relevant image in search order; later checks are not
+        # awaited once an earlier one passes, and slow checks count as misses
+        deadline = time.monotonic() + timeout
+        try:
+            for image_url, _ in candidates:
+                verdict = verdicts[image_url]
+                if not isinstance(verdict, bool):
+                    try:
+                        verdict = verdict.result(timeout=max(0.0, deadline - time.monotonic()))
+                    except FutureTimeoutError:
+                        continue
+                    relevance_cache.set(f"{name_key}|{image_url}", verdict)
+                    verdicts[image_url] = verdict
+                if verdict:
+                    return image_url
+        finally:
+            for verdict in verdicts.values():
+                if not isinstance(verdict, bool):
+                    verdict.cancel()
 
-        # Check up to 5 images for relevance
-        for image in images[:5]:
-            # Handle both formats: string URL or dict with url/description
-            if isinstance(image, str):
-                # No description available, just return the first image
-                return image
+        return accepted_without_check or _first_image_url(images)
 
-            image_url = image.get("url", "")
-            image_desc = image.get("description", "")
+    except Exception as e:
+        print(f"Image search failed: {e}")
+        return _SEARCH_FAILED
 
-            if not image_url:
-                continue
 
-            # If no description, use the image
-            if not image_desc:
-                return image_url
+async def _afind_recipe_image(client: "AsyncTavilyClient", recipe_name: str, relevance_cache):
+    """Async version of _find_recipe_image; relevance checks run as concurrent tasks."""
+    name_key = normalize_name(recipe_name)
+    try:
+        with timed_call("tavily:search"):
+            response = await acall("tavily", "image_search", lambda: client.search(**_image_search_kwargs(recipe_name)))
 
-            # Validate with fast model using structured output
-            validation_prompt = f"""Does this image description match the recipe "{recipe_name}"?
+        images = response.get("images", [])
+        if not images:
+            return None
 
-Image description: {image_desc}"""
+        candidates, accepted_without_check = _image_candidates(images)
 
-            try:
-                result: ImageRelevance = llm.invoke(validation_prompt)
-                if result.is_relevant:
+        llm = get_validation_llm()
+        provider = model_provider(validation_model_spec())
+        timeout = Configuration.from_runnable_config(ensure_config()).image_validation_timeout
+        verdicts = {}
+        for image_url, image_desc in candidates:
+            cached = relevance_cache.get(f"{name_key}|{image_url}")
+            if cached is not None:
+                verdicts[image_url] = cached
+            elif image_url not in verdicts:
+                verdicts[image_url] = asyncio.create_task(
+                    _acheck_relevance(llm, provider, recipe_name, image_desc)
+                )
+
+        deadline = time.monotonic() + timeout
+        try:
+            for image_url, _ in candidates:
+                verdict = verdicts[image_url]
+                if not isinstance(verdict, bool):
+                    try:
+                        verdict = await asyncio.wait_for(
+                            asyncio.shield(verdict), max(0.0, deadline - time.monotonic())
+                        )
+                    except asyncio.TimeoutError:
+                        continue
+                    relevance_cache.set(f"{name_key}|{image_url}", verdict)
+                    verdicts[image_url] = verdict
+                if verdict:
                     return image_url
-            except Exception:
-                # If validation fails, just use this image
-                return image_url
+        finally:
+            for verdict in verdicts.values():
+                if not isinstance(verdict, bool):
+                    verdict.cancel()
 
-        # Fallback: return first image URL if available
-        first_image = images[0]
-        if isinstance(first_image, str):
-            return first_image
-        return first_image.get("url")
+        return accepted_without_check or _first_image_url(images)
 
     except Exception as e:
         print(f"Image search failed: {e}")
-        return None
+        return _SEARCH_FAILED
@@ -0,0 +1,27 @@
+"""Custom HTTP routes mounted next to the LangGraph server API."""
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from meal_agent.batch import DEFAULT_CONCURRENCY, aplan_batch
+from meal_agent.metrics import prometheus_text
+
+
+async def metrics(request: Request) -> PlainTextResponse:
+    """Process-wide node and call metrics for Prometheus to scrape."""
+    return PlainTextResponse(prometheus_text(), media_type="text/plain; version=0.0.4")
+
+
+async def batch(request: Request) -> JSONResponse:
+    """Plan many households at once: {"households": {id: meal_input}, "configurable": {...}}."""
+    body = await request.json()
+    households = body.get("households")
+    if not isinstance(households, dict) or not households:
+        return JSONResponse({"error": "households must map household ids to meal_input"}, status_code=400)
+    config = {"configurable": body.get("configurable", {})}
+    return JSONResponse(await aplan_batch(households, config, body.get("concurrency", DEFAULT_CONCURRENCY)))
+
+
+app = Starlette(routes=[Route("/metrics", metrics), Route("/batch", batch, methods=["POST"])])
@@ -0,0 +1,71 @@
+from typing import TypedDict
+
+from langchain_core.messages import AIMessage
+from langgraph.graph import END, START, StateGraph
+
+from meal_agent.agent import RECIPE_OUTPUT_TOOL, build_recipe_update
+from meal_agent.cache import RecipeCache
+from meal_agent.similarity import MealIndex
+from meal_agent.streaming import meal_stream
+
+RECIPE = {
+    "name": "Buttery Garlic Chicken",
+    "ingredients": [
+        {"name": "chicken_breast", "quantity": 1.0, "unit": "lb", "is_fresh": True, "category": "protein"},
+        {"name": "garlic_salt", "quantity": 1.0, "unit": "tsp", "is_fresh": False, "category": "pantry"},
+    ],
+    "instructions": ["Cook the chicken."],
+    "time_estimate": 25,
+    "equipment": ["stovetop"],
+}
+
+
+def recipe_message():
+    return AIMessage(content="", tool_calls=[{"name": RECIPE_OUTPUT_TOOL, "args": RECIPE, "id": "call_1"}])
+
+
+def test_rejected_recipe_is_not_cached(tmp_path):
+    cache = RecipeCache(str(tmp_path / "recipes.sqlite"))
+    update = build_recipe_update(
+        "monday", 2, [recipe_message()], {}, cache=cache, cache_key="monday", search_image=False,
+        exclude=MealIndex(["Garlic Butter Chicken"]),
+    )
+    assert "meal_output" not in update
+    assert update["rejected_meals"] == ["Buttery Garlic Chicken"]
+    assert cache.get("monday") is None
+
+
+def test_accepted_recipe_is_cached_without_its_staples(tmp_path):
+    cache = RecipeCache(str(tmp_path / "recipes.sqlite"))
+    update = build_recipe_update(
+        "monday", 2, [recipe_message()], {}, cache=cache, cache_key="monday", search_image=False,
+        exclude=MealIndex(["Beef Tacos"]),
+    )
+    assert set(update["meal_output"]["monday"]["ingredients"]) == {"chicken_breast"}
+    assert set(update["shopping_totals"]) == {"chicken_breast"}
+    assert cache.get("monday")["name"] == "Buttery Garlic Chicken"
+
+
+def test_partial_meal_of_a_rejected_recipe_is_retracted():
+    class State(TypedDict, total=False):
+        first_visible_s: float
+
+    def plan_monday(state: State, config) -> dict:
+        with meal_stream("monday", None, config) as stream:
+            stream.finish(RECIPE)  # as if the fields had been streamed
+            update = build_recipe_update(
+                "monday", 2, [recipe_message()], {}, search_image=False, exclude=MealIndex(["Garlic Butter Chicken"])
+            )
+            return stream.visible_update(update)
+
+    builder = StateGraph(State)
+    builder.add_node("plan_monday", plan_monday)
+    builder.add_edge(START, "plan_monday")
+    builder.add_edge("plan_monday", END)
+    config = {"configurable": {"stream_partial_meals": True}}
+    chunks = list(builder.compile().stream({}, config, stream_mode=["custom", "updates"]))
+
+    events = [chunk for mode, chunk in chunks if mode == "custom"]
+    assert [event["meal"] and event["meal"]["name"] for event in events] == ["Buttery Garlic Chicken", None]
+    updates = [chunk for mode, chunk in chunks if mode == "updates"]
+    assert updates == [{"plan_monday": None}]
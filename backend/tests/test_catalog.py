@@ -0,0 +1,71 @@
+import pytest
+
+from meal_agent.catalog import canonical_name, ingredient_category, is_pantry_staple, resolve_ingredient
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "salt",
+        "kosher_salt",
+        "garlic_salt",
+        "salt_and_pepper",
+        "black_pepper",
+        "freshly_ground_black_pepper",
+        "all_purpose_flour",
+        "granulated_sugar",
+        "dark_brown_sugar",
+        "smoked_paprika",
+        "unsalted_butter",
+        "extra virgin olive oil",
+        "rice_vinegar",
+        "warm_water",
+    ],
+)
+def test_staples_stay_off_the_shopping_list(name):
+    assert is_pantry_staple(name)
+
+
+@pytest.mark.parametrize(
+    "name",
+    ["bell_pepper", "red_bell_pepper", "jalapeno_pepper", "coconut_water", "rice", "peanut_butter", "chicken_and_rice"],
+)
+def test_staple_words_inside_other_ingredients(name):
+    assert not is_pantry_staple(name)
+
+
+@pytest.mark.parametrize(
+    ("name", "expected"),
+    [
+        ("Fresh Spinach", "spinach"),
+        ("red_bell_pepper", "bell_pepper"),
+        ("boneless skinless chicken breasts", "chicken_breast"),
+        ("spring onions", "green_onion"),
+        ("egg", "eggs"),
+    ],
+)
+def test_modifiers_and_aliases_resolve_to_the_catalog_name(name, expected):
+    assert canonical_name(name) == expected
+
+
+@pytest.mark.parametrize("name", ["sweet_potato", "almond_milk", "jalapeno_pepper"])
+def test_other_leading_words_name_a_different_ingredient(name):
+    assert resolve_ingredient(name) is None
+    assert canonical_name(name) == name
+
+
+def test_categories():
+    assert ingredient_category("diced_tomatoes") == "produce"
+    assert ingredient_category("chicken_thighs") == "protein"
+    assert ingredient_category("sweet_potato") == "pantry"
+
+
+@pytest.mark.parametrize("name", ["frozen_corn", "frozen_spinach", "canned_tomatoes", "cooked_chicken_breast"])
+def test_storage_words_do_not_make_an_ingredient_fresh(name):
+    entry = resolve_ingredient(name)
+    assert entry is None or not entry.is_fresh
+
+
+@pytest.mark.parametrize("name", ["dried_oregano", "dried_basil"])
+def test_dried_herbs_are_staples(name):
+    assert is_pantry_staple(name)
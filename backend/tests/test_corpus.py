@@ -0,0 +1,35 @@
+import pytest
+
+from meal_agent.corpus import _from_record, parse_ingredient_line
+
+
+@pytest.mark.parametrize(
+    ("line", "name", "quantity", "unit"),
+    [
+        ("2 cups fresh spinach, chopped", "fresh_spinach", 2.0, "cup"),
+        ("1 (14 oz) can diced tomatoes", "diced_tomatoes", 1.0, "can"),
+        ("1 onion (diced)", "onion", 1.0, ""),
+        ("1 1/2 lb boneless chicken thighs", "boneless_chicken_thighs", 1.5, "lb"),
+        ("½ cup sour cream", "sour_cream", 0.5, "cup"),
+        ("2 eggs", "eggs", 2.0, ""),
+    ],
+)
+def test_parse_ingredient_line(line, name, quantity, unit):
+    ing = parse_ingredient_line(line)
+    assert (ing["name"], ing["quantity"], ing["unit"]) == (name, quantity, unit)
+
+
+def test_canned_ingredients_are_not_fresh():
+    assert not parse_ingredient_line("1 (14 oz) can diced tomatoes")["is_fresh"]
+    assert parse_ingredient_line("2 tomatoes")["is_fresh"]
+
+
+def test_nameless_ingredients_are_dropped():
+    recipe = _from_record({"name": "Soup", "ingredients": ["(optional)", "2 carrots", {"name": ""}]})
+    assert [ing["name"] for ing in recipe["ingredients"]] == ["carrots"]
+
+
+def test_unknown_time_stays_unknown():
+    recipe = _from_record({"name": "Soup", "ingredients": ["2 carrots"]})
+    assert recipe["time_estimate"] is None
+    assert recipe["ingredients"][0]["category"] == "produce"
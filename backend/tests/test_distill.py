@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from meal_agent.distill import distill_content, distill_result, distill_results, snippet_minutes
+
+
+@pytest.mark.parametrize(
+    ("text", "minutes"),
+    [
+        ("Ready in 25 minutes. A weeknight favourite.", 25),
+        ("Total time: 1 hr 15 mins", 75),
+        ("Prep time: 10 mins Cook time: 20 mins", 30),
+        ("Cook time: 40 minutes", 40),
+        ("Serves 4. Great for parties.", None),
+    ],
+)
+def test_snippet_minutes(text, minutes):
+    assert snippet_minutes(text) == minutes
+
+
+def test_recipes_over_the_time_limit_are_left_out():
+    results = [
+        {"title": "Beef Tacos", "url": "https://a", "content": "Ready in 20 minutes. Ingredients: beef, tortillas"},
+        {"title": "Pot Roast", "url": "https://b", "content": "Total time: 3 hours. Ingredients: beef chuck"},
+        {"title": "Mystery Stew", "url": "https://c", "content": "Ingredients: beans, stock"},
+    ]
+    table = distill_results(results, 30)
+    assert table.startswith("Recipes within 30 minutes (1 longer one left out):")
+    assert "Beef Tacos" in table
+    assert "Pot Roast" not in table
+    assert "| Mystery Stew | ? |" in table
+
+
+def test_every_result_too_long():
+    results = [{"title": "Pot Roast", "url": "https://b", "content": "Total time: 3 hours"}]
+    assert "none" in distill_results(results, 30)
+
+
+def test_duplicate_results_are_listed_once():
+    result = {"title": "Beef Tacos", "url": "https://a", "content": "Ready in 20 minutes"}
+    assert distill_results([result, result], 30).count("Beef Tacos") == 1
+
+
+def test_json_ld_recipe_is_preferred_over_the_snippet():
+    json_ld = {
+        "@context": "https://schema.org",
+        "@graph": [
+            {"@type": "WebPage", "name": "Tacos page"},
+            {
+                "@type": "Recipe",
+                "name": "Weeknight Beef Tacos",
+                "totalTime": "PT25M",
+                "recipeIngredient": ["1 lb ground beef", "8 tortillas"],
+                "recipeInstructions": [{"@type": "HowToStep", "text": "Brown the beef."}],
+            },
+        ],
+    }
+    result = {
+        "title": "Tacos | Some Site",
+        "url": "https://a",
+        "content": "Ready in 60 minutes",
+        "raw_content": f'<html><script type="application/ld+json">{json.dumps(json_ld)}</script></html>',
+    }
+    recipe = distill_result(result)
+    assert recipe["name"] == "Weeknight Beef Tacos"
+    assert recipe["minutes"] == 25
+    assert recipe["steps"] == ["Brown the beef."]
+    assert len(recipe["ingredients"]) == 2
+
+
+def test_non_result_content_is_passed_through():
+    assert distill_results({"error": "quota"}, 30) is None
+    assert distill_content("Search failed", 30) is None
@@ -0,0 +1,51 @@
+from meal_agent.optimizer import build_pool, inventory_use, plan_menu
+
+
+def recipe(name, ingredients, time_estimate=20):
+    return {
+        "name": name,
+        "ingredients": [
+            {"name": ing, "quantity": quantity, "unit": unit, "is_fresh": True} for ing, quantity, unit in ingredients
+        ],
+        "instructions": ["Cook."],
+        "time_estimate": time_estimate,
+        "servings": 1,
+    }
+
+
+POOL = [
+    recipe("Garlic Butter Chicken", [("chicken_breast", 0.5, "lb")]),
+    recipe("Buttery Garlic Chicken", [("chicken_breast", 0.5, "lb")]),
+    recipe("Pasta Aglio e Olio", [("pasta", 8, "oz")]),
+    recipe("Spinach Salad", [("spinach", 2, "cup")]),
+    recipe("Slow Braised Short Ribs", [("short_ribs", 2, "lb")], time_estimate=None),
+]
+
+
+def names(menu):
+    return {day: meal["name"] for day, meal in menu.items()}
+
+
+def test_volume_measured_produce_counts_toward_its_package():
+    pool = build_pool(POOL)
+    assert ("spinach", "g") in pool.rows
+
+
+def test_near_duplicates_are_not_chosen_together():
+    menu = names(plan_menu([("monday", 30, 1), ("tuesday", 30, 1)], build_pool(POOL)))
+    assert not {"Garlic Butter Chicken", "Buttery Garlic Chicken"} <= set(menu.values())
+
+
+def test_near_duplicates_of_planned_meals_are_excluded():
+    menu = names(plan_menu([("monday", 30, 1)], build_pool(POOL), exclude=["Garlic Butter Chicken"]))
+    assert menu["monday"] not in {"Garlic Butter Chicken", "Buttery Garlic Chicken"}
+
+
+def test_unknown_times_are_never_chosen():
+    menu = plan_menu([("monday", 600, 1)], build_pool(POOL[-1:]))
+    assert menu == {}
+
+
+def test_inventory_on_hand_is_used_up_first():
+    on_hand = inventory_use({"spinach": {"amounts": {"ml": 473.0}, "category": "produce"}}, {"spinach": 2.0})
+    assert names(plan_menu([("monday", 30, 1)], build_pool(POOL), on_hand=on_hand)) == {"monday": "Spinach Salad"}
@@ -0,0 +1,65 @@
+import pytest
+
+from meal_agent.quantities import (
+    add_amount,
+    add_shopping,
+    format_amount,
+    format_shopping_list,
+    in_package_unit,
+    package_amount,
+    to_canonical,
+)
+
+
+def test_to_canonical():
+    assert to_canonical(2, "cups") == ("ml", pytest.approx(473.176))
+    assert to_canonical(1, "lb") == ("g", pytest.approx(453.592))
+    assert to_canonical(3, "") == ("count", 3)
+    assert to_canonical(2, "cloves") == ("clove", 2)
+
+
+def test_add_amount_sums_in_canonical_units():
+    amounts = {}
+    add_amount(amounts, 1, "cup")
+    add_amount(amounts, 8, "tbsp")
+    add_amount(amounts, 4, "oz")
+    assert amounts["ml"] == pytest.approx(236.588 + 8 * 14.7868)
+    assert amounts["g"] == pytest.approx(4 * 28.3495)
+
+
+def test_add_shopping_only_touches_the_new_items():
+    week = {"onion": {"amounts": {"count": 1.0}, "category": "aromatics"}}
+    day = {
+        "onion": {"amounts": {"count": 2.0}, "category": "aromatics"},
+        "rice": {"amounts": {"ml": 200.0}, "category": "grains"},
+    }
+    merged = add_shopping(week, day)
+    assert merged["onion"]["amounts"] == {"count": 3.0}
+    assert merged["rice"]["amounts"] == {"ml": 200.0}
+    assert week["onion"]["amounts"] == {"count": 1.0}
+    assert add_shopping(week, None) is week
+
+
+def test_format_amount():
+    assert format_amount("g", 453.592) == "1 lb"
+    assert format_amount("g", 56.699) == "2 oz"
+    assert format_amount("ml", 473.176) == "2 cup"
+    assert format_amount("count", 3.0) == "3 whole"
+
+
+def test_shopping_list_rounds_up_to_whole_packages():
+    items = {
+        "ground_beef": {"amounts": {"g": 700.0}, "category": "protein"},
+        "spinach": {"amounts": {"g": 100.0}, "category": "produce"},
+    }
+    shopping = format_shopping_list(items)
+    assert shopping["ground_beef"] == {"quantity": "2 lb", "category": "protein"}
+    assert shopping["spinach"]["quantity"] == "1 bag"
+
+
+def test_volume_amounts_convert_to_the_package_unit():
+    assert package_amount("spinach")[0] == "g"
+    unit, amount = in_package_unit("spinach", "ml", 236.588)
+    assert unit == "g"
+    assert amount == pytest.approx(30.0)
+    assert in_package_unit("sweet_potato", "ml", 100.0) == ("ml", 100.0)
@@ -0,0 +1,47 @@
+import pytest
+
+from meal_agent.similarity import MealIndex, dish_key, exclusion_signature, name_tokens
+
+
+def test_names_are_compared_without_filler_or_suffixes():
+    assert name_tokens("Easy Garlic Butter Chicken") == name_tokens("Buttery Garlic Chicken")
+
+
+@pytest.mark.parametrize(
+    ("planned", "candidate"),
+    [
+        ("Garlic Butter Chicken", "Buttery Garlic Chicken"),
+        ("Beef Tacos", "Easy Beef Taco"),
+        (
+            {"name": "Spaghetti Carbonara", "ingredients": {"spaghetti": {}, "eggs": {}, "bacon": {}, "parmesan": {}}},
+            {"name": "Classic Carbonara", "ingredients": [{"name": "spaghetti"}, {"name": "egg"}, {"name": "bacon"},
+                                                          {"name": "parmesan_cheese"}, {"name": "salt"}]},
+        ),
+    ],
+)
+def test_near_duplicates(planned, candidate):
+    assert MealIndex([planned]).duplicate_of(candidate) is not None
+
+
+@pytest.mark.parametrize(
+    ("planned", "candidate"),
+    [
+        ("Garlic Butter Chicken", "Garlic Butter Shrimp"),
+        ("Beef Tacos", "Fish Tacos with Slaw"),
+        ("Spaghetti Carbonara", "Classic Carbonara"),
+    ],
+)
+def test_different_dishes(planned, candidate):
+    assert MealIndex([planned]).duplicate_of(candidate) is None
+
+
+def test_dish_key():
+    assert dish_key("Easy Garlic Butter Chicken") == ("chicken", "garlic butter")
+    assert dish_key("Pork Chops with Green Beans") == ("chops", "pork")
+
+
+def test_exclusion_signature_groups_variations():
+    assert exclusion_signature(["Garlic Butter Chicken", "Lemon Herb Chicken", "Beef Tacos", "Chicken"]) == [
+        "chicken: garlic butter; lemon herb; plain",
+        "tacos: beef",
+    ]
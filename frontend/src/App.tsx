@@ -11,6 +11,7 @@ function App() {
   const {
     dayInputs,
     meals,
+    partialMeals,
     shoppingList,
     isLoading,
     currentDay,
@@ -53,6 +54,7 @@ function App() {
                 day={day}
                 input={dayInputs[day]}
                 meal={meals[day]}
+                partialMeal={partialMeals[day]}
                 isLoading={isLoading && currentDay === day}
                 onUpdate={(updates) => updateDay(day, updates)}
               />
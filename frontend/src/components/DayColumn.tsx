@@ -10,6 +10,7 @@ interface DayColumnProps {
   day: DayOfWeek;
   input: DayInput;
   meal?: MealInfo;
+  partialMeal?: Partial<MealInfo>; // recipe still being written
   isLoading: boolean;
   onUpdate: (updates: Partial<DayInput>) => void;
 }
@@ -38,11 +39,14 @@ export function DayColumn({
   day,
   input,
   meal,
+  partialMeal,
   isLoading,
   onUpdate,
 }: DayColumnProps) {
   const [isModalOpen, setIsModalOpen] = useState(false);
   const isActive = input.dinner;
+  const ingredientCount = Object.keys(partialMeal?.ingredients ?? {}).length;
+  const stepCount = partialMeal?.instructions?.length ?? 0;
 
   const handleColumnClick = () => {
     if (!meal && !isLoading) {
@@ -76,7 +80,21 @@ export function DayColumn({
 
       {/* Content area */}
       <div className="flex-1 p-3 overflow-y-auto flex flex-col">
-        {isLoading ? (
+        {!meal && partialMeal?.name ? (
+          <div className="flex-1 flex flex-col items-center justify-center text-center space-y-2">
+            <h4 className="font-semibold text-sm text-gray-900 leading-tight">
+              {partialMeal.name}
+            </h4>
+            <span className="flex items-center gap-1 text-xs text-gray-400">
+              <Loader2 className="w-3 h-3 animate-spin" />
+              {stepCount > 0
+                ? `${ingredientCount} ingredients, ${stepCount} steps`
+                : ingredientCount > 0
+                  ? `${ingredientCount} ingredients`
+                  : "Writing recipe..."}
+            </span>
+          </div>
+        ) : isLoading ? (
           <div className="flex-1 flex flex-col items-center justify-center space-y-2">
             <Loader2 className="w-5 h-5 text-gray-400 animate-spin" />
             <span className="text-xs text-gray-400">Finding recipe...</span>
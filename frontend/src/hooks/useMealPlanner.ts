@@ -1,9 +1,29 @@
-import { useState, useCallback } from "react";
+import { useState, useCallback, useRef } from "react";
 import { DAYS_OF_WEEK, DEFAULT_DAY_INPUT } from "../types";
-import type { DayInput, DayOfWeek, MealInfo, ShoppingListItem } from "../types";
+import type {
+  DayInput,
+  DayOfWeek,
+  DayResult,
+  MealInfo,
+  PartialMealEvent,
+  PreviousPlan,
+  ShoppingListItem,
+} from "../types";
 
 const API_URL = import.meta.env.VITE_API_URL || "http://localhost:2024";
 
+// Performance timeline entries for the time until the first recipe shows
+const SUBMIT_MARK = "meal-planner:submit";
+const FIRST_VISIBLE_MEASURE = "meal-planner:first-visible-recipe";
+
+// Log the time until the first recipe showed next to the backend's
+// first_visible_s, which leaves out the request and rendering
+function reportFirstVisible(clientMs: number | null, serverSeconds: number | null) {
+  if (clientMs === null) return;
+  const server = serverSeconds === null ? "n/a" : `${Math.round(serverSeconds * 1000)} ms`;
+  console.info(`[meal-planner] first recipe visible after ${clientMs} ms (backend first_visible_s: ${server})`);
+}
+
 type DayInputs = Record<DayOfWeek, DayInput>;
 
 function createInitialDayInputs(): DayInputs {
@@ -16,15 +36,41 @@ function createInitialDayInputs(): DayInputs {
   );
 }
 
+function sameDayInput(a: DayInput, b: DayInput | undefined): boolean {
+  return (
+    b !== undefined &&
+    a.dinner === b.dinner &&
+    a.dinner_leftovers === b.dinner_leftovers &&
+    a.dinner_time_limit === b.dinner_time_limit
+  );
+}
+
+// Days whose meal from the previous plan still fits their input; mirrors
+// kept_days in the backend
+function keptDays(dayInputs: DayInputs, plan: PreviousPlan | null): DayOfWeek[] {
+  if (!plan) return [];
+  return DAYS_OF_WEEK.filter(
+    (day) =>
+      dayInputs[day].dinner &&
+      sameDayInput(dayInputs[day], plan.meal_input[day]) &&
+      Object.keys(plan.meal_output[day]?.ingredients ?? {}).length > 0 &&
+      day in plan.day_results
+  );
+}
+
 export function useMealPlanner() {
   const [dayInputs, setDayInputs] = useState<DayInputs>(createInitialDayInputs);
   const [meals, setMeals] = useState<Record<string, MealInfo>>({});
+  // Recipes still being written, shown field by field until their meal arrives
+  const [partialMeals, setPartialMeals] = useState<Record<string, Partial<MealInfo>>>({});
   const [shoppingList, setShoppingList] = useState<Record<string, ShoppingListItem>>({});
   const [isShoppingListOpen, setIsShoppingListOpen] = useState(false);
   const [isInfoOpen, setIsInfoOpen] = useState(false);
   const [isLoading, setIsLoading] = useState(false);
   const [currentDay, setCurrentDay] = useState<DayOfWeek | null>(null);
   const [error, setError] = useState<string | null>(null);
+  // Last completed plan; the next submit only re-plans the days that changed
+  const previousPlan = useRef<PreviousPlan | null>(null);
 
   const updateDay = useCallback(
     (day: DayOfWeek, updates: Partial<DayInput>) => {
@@ -39,19 +85,50 @@ export function useMealPlanner() {
   const reset = useCallback(() => {
     setDayInputs(createInitialDayInputs());
     setMeals({});
+    setPartialMeals({});
     setShoppingList({});
     setError(null);
     setCurrentDay(null);
+    previousPlan.current = null;
   }, []);
 
   const submit = useCallback(async () => {
     setIsLoading(true);
     setError(null);
-    setMeals({});
-    setShoppingList({});
+    setPartialMeals({});
+
+    // Milliseconds from submit until the first recipe name was shown, and
+    // the backend's own measure of it from the streamed updates
+    let firstVisibleMs: number | null = null;
+    let serverFirstVisibleS: number | null = null;
+    // Days showing a partial recipe, so a retracted one can undo markVisible
+    const partialDays = new Set<string>();
+    const markVisible = () => {
+      if (firstVisibleMs !== null) return;
+      const measure = performance.measure(FIRST_VISIBLE_MEASURE, SUBMIT_MARK);
+      firstVisibleMs = Math.round(measure.duration);
+    };
+    performance.mark(SUBMIT_MARK);
+
+    // Keep the meals of unchanged days; only the other days are planned again
+    const plan = previousPlan.current;
+    const kept = keptDays(dayInputs, plan);
+    const planMeals: Record<string, MealInfo> = {};
+    const planDayResults: Record<string, DayResult> = {};
+    for (const day of kept) {
+      planMeals[day] = plan!.meal_output[day];
+      planDayResults[day] = plan!.day_results[day];
+    }
+    setMeals({ ...planMeals });
+    if (kept.length === 0) {
+      setShoppingList({});
+    }
 
     // Determine which days need processing to show loading states
-    const daysToProcess = DAYS_OF_WEEK.filter((day) => dayInputs[day].dinner);
+    const daysToProcess = DAYS_OF_WEEK.filter(
+      (day) => dayInputs[day].dinner && !kept.includes(day)
+    );
+    const completedDays = new Set<string>();
     if (daysToProcess.length > 0) {
       setCurrentDay(daysToProcess[0]);
     }
@@ -64,8 +141,11 @@ export function useMealPlanner() {
         },
         body: JSON.stringify({
           assistant_id: "meal_planner",
-          input: { meal_input: dayInputs },
-          stream_mode: ["updates"],
+          input: plan
+            ? { meal_input: dayInputs, previous_plan: plan }
+            : { meal_input: dayInputs },
+          stream_mode: ["updates", "custom"],
+          config: { configurable: { stream_partial_meals: true } },
         }),
       });
 
@@ -81,6 +161,8 @@ export function useMealPlanner() {
       }
 
       let buffer = "";
+      // SSE event name of the data lines that follow ("updates", "custom", ...)
+      let event = "";
 
       while (true) {
         const { done, value } = await reader.read();
@@ -93,6 +175,11 @@ export function useMealPlanner() {
         for (const line of lines) {
           if (!line.trim()) continue;
 
+          if (line.startsWith("event: ")) {
+            event = line.slice(7).trim();
+            continue;
+          }
+
           // Handle SSE format
           if (line.startsWith("data: ")) {
             try {
@@ -101,22 +188,70 @@ export function useMealPlanner() {
 
               const data = JSON.parse(jsonStr);
 
+              // Partial recipes arrive as custom events while being written
+              if (event === "custom") {
+                const partial = data as PartialMealEvent;
+                if (partial?.type === "partial_meal" && partial.meal === null) {
+                  // Rejected as a near-duplicate; the day is generated again
+                  partialDays.delete(partial.day);
+                  setPartialMeals((prev) => {
+                    const next = { ...prev };
+                    delete next[partial.day];
+                    return next;
+                  });
+                  if (partialDays.size === 0 && Object.keys(planMeals).length === 0) {
+                    firstVisibleMs = null;
+                  }
+                } else if (partial?.type === "partial_meal" && partial.meal?.name) {
+                  const meal = partial.meal;
+                  if (!completedDays.has(partial.day)) {
+                    partialDays.add(partial.day);
+                    setPartialMeals((prev) => ({ ...prev, [partial.day]: meal }));
+                  }
+                  markVisible();
+                }
+                continue;
+              }
+
               // LangGraph streams updates as {node_name: node_output}
               // We need to look inside each node's output for meal_output/shopping_list
               if (typeof data === "object" && data !== null) {
-                for (const nodeOutput of Object.values(data)) {
+                for (const [node, nodeOutput] of Object.entries(data)) {
                   const output = nodeOutput as Record<string, unknown>;
 
+                  const firstVisibleS = output?.first_visible_s;
+                  if (typeof firstVisibleS === "number") {
+                    serverFirstVisibleS = Math.min(serverFirstVisibleS ?? Infinity, firstVisibleS);
+                  }
+
+                  if (output?.day_results) {
+                    Object.assign(
+                      planDayResults,
+                      output.day_results as Record<string, DayResult>
+                    );
+                  }
+
                   // Update meals as they come in
                   if (output?.meal_output) {
                     const mealOutput = output.meal_output as Record<
                       string,
                       MealInfo
                     >;
+                    Object.assign(planMeals, mealOutput);
                     setMeals((prev) => ({ ...prev, ...mealOutput }));
+                    setPartialMeals((prev) => {
+                      const next = { ...prev };
+                      for (const day of Object.keys(mealOutput)) delete next[day];
+                      return next;
+                    });
+                    markVisible();
 
-                    // Update current day indicator
-                    const newDays = Object.keys(mealOutput);
+                    // Update current day indicator. Days already shown are
+                    // re-emitted later with their image, so skip those.
+                    const newDays = Object.keys(mealOutput).filter(
+                      (day) => !completedDays.has(day)
+                    );
+                    newDays.forEach((day) => completedDays.add(day));
                     if (newDays.length > 0) {
                       const completedDay = newDays[0] as DayOfWeek;
                       const completedIndex =
@@ -130,8 +265,13 @@ export function useMealPlanner() {
                     }
                   }
 
-                  // Update shopping list
-                  if (output?.shopping_list) {
+                  // Update shopping list; format_output sends the whole
+                  // list, which drops ingredients of days no longer planned
+                  if (output?.shopping_list && node === "format_output") {
+                    setShoppingList(
+                      output.shopping_list as Record<string, ShoppingListItem>
+                    );
+                  } else if (output?.shopping_list) {
                     setShoppingList((prev) => ({
                       ...prev,
                       ...(output.shopping_list as Record<string, ShoppingListItem>),
@@ -145,12 +285,21 @@ export function useMealPlanner() {
           }
         }
       }
+
+      previousPlan.current = {
+        meal_input: dayInputs,
+        meal_output: planMeals,
+        day_results: planDayResults,
+      };
+      reportFirstVisible(firstVisibleMs, serverFirstVisibleS);
     } catch (err) {
       console.error("Error generating meal plan:", err);
       setError(err instanceof Error ? err.message : "Unknown error occurred");
+      previousPlan.current = null;
     } finally {
       setIsLoading(false);
       setCurrentDay(null);
+      setPartialMeals({});
     }
   }, [dayInputs]);
 
@@ -179,6 +328,7 @@ export function useMealPlanner() {
   return {
     dayInputs,
     meals,
+    partialMeals,
     shoppingList,
     isLoading,
     currentDay,
@@ -67,16 +67,58 @@ export interface MealInfo {
   image_url?: string; // URL of a relevant food image
 }
 
+// Custom stream event with the finished fields of a recipe still being
+// written (see backend/meal_agent/streaming.py)
+export interface PartialMealEvent {
+  type: "partial_meal";
+  day: DayOfWeek;
+  meal: Partial<MealInfo> | null; // null when the recipe was rejected; clear the day
+  complete: boolean; // true once the whole recipe is known
+  seconds: number; // since the run started
+}
+
 // Shopping list item with category
 export interface ShoppingListItem {
   quantity: string;
   category: IngredientCategory;
 }
 
+// Numeric shopping and inventory contribution of one planned day
+export interface DayResult {
+  shopping_totals: Record<string, { amounts: Record<string, number>; category: string }>;
+  fresh_inventory: Record<string, number>;
+}
+
+// An earlier plan sent back so only the days whose input changed are re-planned
+export interface PreviousPlan {
+  meal_input: Record<DayOfWeek, DayInput>;
+  meal_output: Record<string, MealInfo>;
+  day_results: Record<string, DayResult>;
+}
+
+// Timing and token figures for a call target such as "llm:gpt-4o"
+export interface CallMetrics {
+  calls: number;
+  errors: number;
+  seconds: number;
+  input_tokens: number;
+  output_tokens: number;
+}
+
+// Per-node, per-call and per-day metrics streamed with each update
+export interface RunMetrics {
+  nodes?: Record<string, { calls: number; seconds: number }>;
+  calls?: Record<string, CallMetrics>;
+  days?: Record<string, { tool_iterations?: number; retries?: number }>;
+  retries?: Record<string, number>;
+}
+
 // Response from the meal planner
 export interface MealPlannerResponse {
   meal_output: Record<string, MealInfo>;
   shopping_list: Record<string, ShoppingListItem>;
+  metrics?: RunMetrics;
+  first_visible_s?: number; // seconds until the first meal or partial meal was shown
 }
 
 // Default values for a day's input